@@ -0,0 +1,106 @@
+"""
+Utilità condivise dagli script di benchmark: misure di sistema
+(RSS, CPU) e avvio di media_server.py in un sottoprocesso.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+
+# ============================================================================
+# MISURE DI SISTEMA
+# ============================================================================
+
+def current_rss() -> Optional[int]:
+    """RSS corrente del processo in byte (None se non misurabile)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss: picco dall'avvio (KB su Linux, byte su macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def thread_count() -> int:
+    """Thread Python attivi nel processo."""
+    return threading.active_count()
+
+
+class RSSSampler:
+    """Campiona l'RSS in background e ne tiene il picco."""
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.peak: Optional[int] = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="RSSSampler")
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self) -> "RSSSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def cpu_seconds() -> float:
+    """CPU user+system del processo e dei figli terminati."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+# ============================================================================
+# MEDIA SERVER
+# ============================================================================
+
+def start_media_server(*server_args: str) -> Tuple[subprocess.Popen, str, Set[str]]:
+    """
+    Avvia media_server.py in un sottoprocesso.
+
+    Args:
+        *server_args: Argomenti CLI di media_server.py
+
+    Returns:
+        (processo, base URL, path serviti)
+    """
+    cmd = [sys.executable, str(BENCH_DIR / "media_server.py"), *server_args]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().split()
+    if not line or line[0] != "READY":
+        proc.kill()
+        raise RuntimeError("media_server.py did not start")
+    return proc, line[1], set(line[2:])
+
+
+def server_stats(base_url: str) -> Dict[str, Any]:
+    """Contatori del media server (GET /_stats)."""
+    import urllib.request
+    with urllib.request.urlopen(f"{base_url}/_stats", timeout=5) as resp:
+        return json.load(resp)
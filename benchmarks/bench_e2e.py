@@ -0,0 +1,204 @@
+"""
+Benchmark end-to-end: download_video e DownloadQueue contro media_server.py.
+
+Per ogni combinazione di scenario (progressive/hls/dash),
+CONCURRENT_FRAGMENTS e HTTP_CHUNK_SIZE avvia una coda di N job verso il
+server locale (estrattore generico di yt-dlp) e misura:
+- wall time e throughput (byte scritti su disco / secondo)
+- CPU user+system del processo e dei figli (FFmpeg)
+- RSS di picco (psutil se installato, altrimenti /proc o getrusage)
+
+Il server gira in un sottoprocesso, così CPU e memoria misurate sono
+solo quelle del client.
+
+Esempi:
+    python benchmarks/bench_e2e.py --scenario progressive --fragments 1,4 --chunk-sizes 1M,10M
+    python benchmarks/bench_e2e.py --scenario hls,dash --jobs 4 --latency-ms 40 --bandwidth-kbps 20000
+    python benchmarks/bench_e2e.py --direct --error-rate 0.05 --output results.json
+"""
+
+import argparse
+import dataclasses
+import itertools
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from mvd import downloader  # noqa: E402
+from mvd.config import YTDLP_CONFIG  # noqa: E402
+from mvd.download_queue import DownloadQueue  # noqa: E402
+
+from _support import RSSSampler, cpu_seconds, server_stats, start_media_server  # noqa: E402
+
+SCENARIOS = {
+    "progressive": "/progressive.mp4",
+    "hls": "/hls/index.m3u8",
+    "dash": "/dash/manifest.mpd",
+}
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def start_server(args: argparse.Namespace) -> tuple:
+    """Avvia media_server.py con la rete simulata richiesta."""
+    return start_media_server(
+        "--latency-ms", str(args.latency_ms),
+        "--bandwidth-kbps", str(args.bandwidth_kbps),
+        "--error-rate", str(args.error_rate),
+        "--drop-rate", str(args.drop_rate),
+        "--duration", str(args.duration),
+    )
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def parse_size(value: str) -> int:
+    """'10M' -> 10485760, '512K' -> 524288."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper()
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file() and not p.name.endswith(".part"))
+
+
+def run_case(
+    base_url: str,
+    scenario: str,
+    fragments: int,
+    chunk_size: int,
+    args: argparse.Namespace,
+    workdir: Path,
+) -> Dict[str, Any]:
+    """Esegue un caso (N job) e ritorna le misure."""
+    downloader.YTDLP_CONFIG = dataclasses.replace(
+        YTDLP_CONFIG, CONCURRENT_FRAGMENTS=fragments, HTTP_CHUNK_SIZE=chunk_size
+    )
+
+    out_root = workdir / f"{scenario}-f{fragments}-c{chunk_size}"
+    urls = [f"{base_url}/j/{i}{SCENARIOS[scenario]}" for i in range(args.jobs)]
+    errors: List[str] = []
+
+    def on_event(kind: str, payload: Any) -> None:
+        if kind == "log" and isinstance(payload, tuple) and len(payload) > 1 and payload[1] >= logging.ERROR:
+            errors.append(payload[0])
+
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+
+    with RSSSampler() as rss:
+        if args.direct:
+            for i, url in enumerate(urls):
+                try:
+                    downloader.download_video(
+                        url=url, mode=args.mode, quality=args.quality,
+                        output_path=str(out_root / f"job-{i}"),
+                    )
+                except Exception as e:
+                    errors.append(str(e))
+        else:
+            queue = DownloadQueue(on_event)
+            for i, url in enumerate(urls):
+                queue.add(url, title=f"job-{i}", output_path=str(out_root / f"job-{i}"))
+            queue.start(mode=args.mode, quality=args.quality, output_path=str(out_root))
+            queue.wait()
+
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_before
+    written = dir_bytes(out_root) if out_root.exists() else 0
+
+    return {
+        "scenario": scenario,
+        "concurrent_fragments": fragments,
+        "http_chunk_size": chunk_size,
+        "jobs": args.jobs,
+        "failed": len(errors),
+        "wall_s": round(wall, 3),
+        "bytes": written,
+        "throughput_mib_s": round(written / wall / 1024 ** 2, 2) if wall > 0 else 0.0,
+        "cpu_s": round(cpu, 3),
+        "cpu_pct": round(cpu / wall * 100, 1) if wall > 0 else 0.0,
+        "peak_rss_mib": round(rss.peak / 1024 ** 2, 1) if rss.peak else None,
+        "errors": errors[:5],
+    }
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="progressive", help="progressive,hls,dash")
+    parser.add_argument("--fragments", default=str(YTDLP_CONFIG.CONCURRENT_FRAGMENTS), help="lista CONCURRENT_FRAGMENTS")
+    parser.add_argument("--chunk-sizes", default=str(YTDLP_CONFIG.HTTP_CHUNK_SIZE), help="lista HTTP_CHUNK_SIZE (es. 1M,10M)")
+    parser.add_argument("--jobs", type=int, default=3, help="job per caso")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--mode", default="video", choices=("video", "audio"))
+    parser.add_argument("--quality", default="best")
+    parser.add_argument("--direct", action="store_true", help="chiama download_video senza DownloadQueue")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--duration", type=int, default=20, help="durata media generata (s)")
+    parser.add_argument("--output", help="salva i risultati in JSON")
+    parser.add_argument("--keep", action="store_true", help="non cancellare i file scaricati")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    scenarios = [s.strip() for s in args.scenario.split(",") if s.strip()]
+    fragments = [int(v) for v in args.fragments.split(",")]
+    chunk_sizes = [parse_size(v) for v in args.chunk_sizes.split(",")]
+
+    proc, base_url, paths = start_server(args)
+    workdir = Path(tempfile.mkdtemp(prefix="mvd-bench-"))
+    results: List[Dict[str, Any]] = []
+
+    try:
+        for scenario in scenarios:
+            if SCENARIOS.get(scenario) not in paths:
+                print(f"skip {scenario}: not served (FFmpeg unavailable?)", file=sys.stderr)
+                continue
+
+            for frag, chunk, run in itertools.product(fragments, chunk_sizes, range(args.repeat)):
+                result = run_case(base_url, scenario, frag, chunk, args, workdir / f"run{run}")
+                results.append(result)
+                print(
+                    f"{scenario:<12} frag={frag:<3} chunk={chunk:>10} "
+                    f"ok={result['jobs'] - result['failed']}/{result['jobs']} "
+                    f"wall={result['wall_s']:>7.2f}s {result['throughput_mib_s']:>7.2f} MiB/s "
+                    f"cpu={result['cpu_pct']:>5.1f}% rss={result['peak_rss_mib']} MiB"
+                )
+
+        report = {"server": server_stats(base_url), "args": vars(args), "results": results}
+        if args.output:
+            Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+            print(f"Results written to {args.output}")
+
+    finally:
+        proc.terminate()
+        proc.wait()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return 0 if all(r["failed"] == 0 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Latenza di cancellazione della DownloadQueue (cancel -> worker fermo).
+
+Per ogni fase avvia un job verso l'estrattore finto mvd_fake
+(benchmarks/plugins), chiama DownloadQueue.cancel() quando il job è
+nella fase voluta e misura il tempo fino all'evento "done":
+- extract: estrazione lenta (delay_ms dell'estrattore)
+- transfer: trasferimento limitato da media_server.py --bandwidth-kbps
+
+Controlla anche che dopo la cancellazione non restino file parziali
+nella cartella di output (policy "delete"). Exit code 1 se una latenza
+supera --max-ms o restano file.
+
+Esempi:
+    python benchmarks/cancel_latency.py
+    python benchmarks/cancel_latency.py --repeat 10 --max-ms 500 --output cancel.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+sys.path.insert(0, str(BENCH_DIR / "plugins"))  # yt_dlp_plugins.extractor.mvd_fake
+
+from mvd.download_queue import DownloadQueue  # noqa: E402
+
+from _support import start_media_server  # noqa: E402
+
+MEDIA_SIZE = 64 * 1024 * 1024
+
+
+def _in_transfer(output_dir: str) -> bool:
+    return any(name.endswith(".part") for name in os.listdir(output_dir))
+
+
+# Fase -> URL del job i-esimo
+SCENARIOS: Dict[str, Callable[[int], str]] = {
+    "extract": lambda i: f"mvdfake://extract{i}?delay_ms=30000&formats=1&size=4096",
+    "transfer": lambda i: f"mvdfake://transfer{i}?formats=1&size={MEDIA_SIZE}",
+}
+
+
+def measure_once(name: str, index: int, settle: float) -> Dict[str, Any]:
+    """Un job, una cancellazione: latenza in ms e file rimasti."""
+    output_dir = tempfile.mkdtemp(prefix=f"mvd_cancel_{name}_")
+    done = threading.Event()
+    dq = DownloadQueue(lambda kind, payload: done.set() if kind == "done" else None)
+    dq.add(SCENARIOS[name](index), mode="video", quality="best")
+
+    try:
+        dq.start(mode="video", quality="best", output_path=output_dir)
+        if name == "transfer":
+            deadline = time.monotonic() + 10
+            while not _in_transfer(output_dir) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        time.sleep(settle)
+
+        started = time.perf_counter()
+        dq.cancel()
+        if not done.wait(10):
+            raise RuntimeError(f"{name}: worker still running 10 s after cancel")
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        # Il thread yt-dlp orfano rilascia e rimuove i parziali poco dopo
+        deadline = time.monotonic() + 5
+        leftovers: List[str] = os.listdir(output_dir)
+        while leftovers and time.monotonic() < deadline:
+            time.sleep(0.05)
+            leftovers = os.listdir(output_dir)
+        return {"latency_ms": latency_ms, "leftovers": leftovers}
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("phases", nargs="*", help="fasi da misurare (default: tutte)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--settle", type=float, default=0.3, help="secondi nella fase prima di annullare")
+    parser.add_argument("--bandwidth-kbps", type=int, default=2048, help="banda del media server (fase transfer)")
+    parser.add_argument("--max-ms", type=float, default=1000.0, help="latenza massima ammessa")
+    parser.add_argument("--output", help="salva i risultati in JSON")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.phases) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown phases: {', '.join(sorted(unknown))}")
+
+    proc, base_url, _ = start_media_server("--bytes-only", "--bandwidth-kbps", str(args.bandwidth_kbps))
+    os.environ["MVD_FAKE_MEDIA_URL"] = base_url
+    results: Dict[str, Dict[str, Any]] = {}
+    failures = []
+
+    try:
+        for name in args.phases or list(SCENARIOS):
+            runs = [measure_once(name, i, args.settle) for i in range(args.repeat)]
+            latencies = [r["latency_ms"] for r in runs]
+            leftovers = sorted({f for r in runs for f in r["leftovers"]})
+            results[name] = {
+                "median_ms": round(statistics.median(latencies), 1),
+                "max_ms": round(max(latencies), 1),
+                "leftovers": leftovers,
+            }
+            print(
+                f"{name:<10} median={results[name]['median_ms']:>7.1f} ms  "
+                f"max={results[name]['max_ms']:>7.1f} ms  leftovers={len(leftovers)}"
+            )
+            if max(latencies) > args.max_ms:
+                failures.append(f"{name}: cancel took {max(latencies):.0f} ms (max {args.max_ms:.0f})")
+            if leftovers:
+                failures.append(f"{name}: partial files left: {', '.join(leftovers)}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
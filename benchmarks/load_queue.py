@@ -0,0 +1,334 @@
+"""
+Load test dello scheduler della coda (DownloadQueue) senza rete.
+
+Accoda N job (10k-100k) verso l'estrattore finto mvd_fake
+(benchmarks/plugins), con i byte serviti da media_server.py --bytes-only,
+e li esegue tramite DownloadQueue come farebbe la GUI. Un thread
+simula il main thread Tk: drena gli eventi ogni UI_POLL_INTERVAL_MS e
+a ogni "queue_changed" esegue lo stesso snapshot di _render_queue.
+
+Riporta:
+- overhead dello scheduler per job (wall meno il tempo dentro download_video)
+- contesa sul lock della coda (acquisizioni contese, attesa media/max, hold max)
+- memoria: byte per job in coda (tracemalloc), RSS di picco e crescita
+  residua dopo l'esecuzione (--trace-run per il dettaglio tracemalloc)
+
+Esempi:
+    python benchmarks/load_queue.py --jobs 10000
+    python benchmarks/load_queue.py --jobs 100000 --dry
+    python benchmarks/load_queue.py --jobs 10000 --extract-delay-ms 2 --add-rate 50 --output load.json
+    python benchmarks/load_queue.py --jobs 10000 --dry --store   # con la persistenza SQLite dei job
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+sys.path.insert(0, str(BENCH_DIR / "plugins"))  # yt_dlp_plugins.extractor.mvd_fake
+
+from mvd import job_runner  # noqa: E402
+from mvd.config import PERFORMANCE_CONFIG  # noqa: E402
+from mvd.download_queue import DownloadQueue  # noqa: E402
+from mvd.job_store import JobStore  # noqa: E402
+
+from _support import RSSSampler, current_rss, start_media_server  # noqa: E402
+
+
+# ============================================================================
+# LOCK STRUMENTATO
+# ============================================================================
+
+class InstrumentedLock:
+    """
+    Lock che misura contesa e tempi di attesa/possesso.
+
+    Sostituisce DownloadQueue._lock durante il test: un'acquisizione è
+    "contesa" quando il tentativo non bloccante fallisce.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.acquires = 0
+        self.contended = 0
+        self.wait_ns = 0
+        self.max_wait_ns = 0
+        self.max_hold_ns = 0
+        self._acquired_at = 0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        waited = 0
+        if not self._lock.acquire(False):
+            if not blocking:
+                return False
+            started = time.perf_counter_ns()
+            if not self._lock.acquire(True, timeout):
+                return False
+            waited = time.perf_counter_ns() - started
+
+        self._acquired_at = time.perf_counter_ns()
+        with self._stats_lock:
+            self.acquires += 1
+            if waited:
+                self.contended += 1
+                self.wait_ns += waited
+                self.max_wait_ns = max(self.max_wait_ns, waited)
+        return True
+
+    def release(self) -> None:
+        held = time.perf_counter_ns() - self._acquired_at
+        self._lock.release()
+        with self._stats_lock:
+            self.max_hold_ns = max(self.max_hold_ns, held)
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "acquires": self.acquires,
+                "contended": self.contended,
+                "contended_pct": round(self.contended / self.acquires * 100, 3) if self.acquires else 0.0,
+                "mean_wait_us": round(self.wait_ns / self.contended / 1000, 2) if self.contended else 0.0,
+                "max_wait_us": round(self.max_wait_ns / 1000, 2),
+                "max_hold_us": round(self.max_hold_ns / 1000, 2),
+            }
+
+
+# ============================================================================
+# SIMULAZIONE MAIN THREAD
+# ============================================================================
+
+class UISimulator:
+    """Drena gli eventi come _drain_ui_queue e ridisegna la coda come _render_queue."""
+
+    def __init__(self, dq: DownloadQueue, events: "queue.Queue", render_limit: int) -> None:
+        self.dq = dq
+        self.events = events
+        self.render_limit = render_limit
+        self.ticks = 0
+        self.handled = 0
+        self.renders = 0
+        self.max_tick_ms = 0.0
+        self.finished = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="UISimulator")
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _loop(self) -> None:
+        interval = PERFORMANCE_CONFIG.UI_POLL_INTERVAL_MS / 1000
+        while not self.finished.is_set():
+            started = time.perf_counter()
+            queue_changed = False
+            try:
+                while True:
+                    kind, _ = self.events.get_nowait()
+                    self.handled += 1
+                    if kind == "queue_changed":
+                        queue_changed = True
+                    elif kind == "done":
+                        self.finished.set()
+            except queue.Empty:
+                pass
+            if queue_changed:
+                self.dq.snapshot(limit=self.render_limit)
+                len(self.dq)
+                self.renders += 1
+            self.ticks += 1
+            self.max_tick_ms = max(self.max_tick_ms, (time.perf_counter() - started) * 1000)
+            time.sleep(interval)
+
+
+# ============================================================================
+# LOAD TEST
+# ============================================================================
+
+def job_url(index: int, args: argparse.Namespace) -> str:
+    return (
+        f"mvdfake://job-{index}?delay_ms={args.extract_delay_ms}"
+        f"&formats={args.formats}&size={args.size}"
+    )
+
+
+def run(args: argparse.Namespace, out_dir: Path) -> Dict[str, Any]:
+    events: "queue.Queue" = queue.Queue()
+    errors: List[str] = []
+
+    def on_event(kind: str, payload: Any) -> None:
+        if kind == "log" and isinstance(payload, tuple) and len(payload) > 1 and payload[1] >= logging.ERROR:
+            errors.append(payload[0])
+        events.put((kind, payload))
+
+    store = JobStore(str(out_dir / "jobs.sqlite3")) if args.store else None
+    dq = DownloadQueue(on_event, store=store)
+    lock = InstrumentedLock()
+    dq._lock = lock
+
+    # Tempo speso dentro download_video (il resto è overhead dello scheduler)
+    download_ns = [0]
+    real_download = job_runner.download_video
+
+    def dry_download(**kwargs: Any) -> None:
+        # Solo il ritardo di estrazione: isola lo scheduler da yt-dlp
+        if args.extract_delay_ms:
+            time.sleep(args.extract_delay_ms / 1000)
+
+    inner_download = dry_download if args.dry else real_download
+
+    def timed_download(**kwargs: Any) -> None:
+        started = time.perf_counter_ns()
+        try:
+            inner_download(**kwargs)
+        finally:
+            download_ns[0] += time.perf_counter_ns() - started
+
+    job_runner.download_video = timed_download
+
+    # Memoria per job in coda: tracemalloc solo durante l'accodamento
+    # (tracciare l'intera esecuzione rallenta yt-dlp di un ordine di grandezza)
+    tracemalloc.start(1)
+    traced_base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for i in range(args.jobs):
+        dq.add(job_url(i, args), title=f"job-{i}")
+    enqueue_s = time.perf_counter() - started
+    traced_queued = tracemalloc.get_traced_memory()[0]
+    if not args.trace_run:
+        tracemalloc.stop()
+
+    # Produttore opzionale durante l'esecuzione (utente che aggiunge URL)
+    added_during_run = [0]
+
+    def producer() -> None:
+        interval = 1 / args.add_rate
+        while added_during_run[0] < args.add_jobs and dq.is_running:
+            time.sleep(interval)
+            dq.add(job_url(args.jobs + added_during_run[0], args))
+            added_during_run[0] += 1
+
+    ui = UISimulator(dq, events, args.render_limit)
+    ui.start()
+    rss_queued = current_rss()
+
+    with RSSSampler() as rss:
+        started = time.perf_counter()
+        dq.start(mode="video", quality="best", output_path=str(out_dir))
+        if args.add_rate > 0 and args.add_jobs > 0:
+            threading.Thread(target=producer, daemon=True, name="Producer").start()
+        dq.wait()
+        run_s = time.perf_counter() - started
+
+    ui.join()
+    job_runner.download_video = real_download
+    if store is not None:
+        store.close()
+    gc.collect()
+
+    total_jobs = args.jobs + added_during_run[0]
+    mib = 1024 ** 2
+    memory: Dict[str, Any] = {
+        "bytes_per_queued_job": round((traced_queued - traced_base) / args.jobs, 1),
+        "rss_queued_mib": round(rss_queued / mib, 1) if rss_queued else None,
+        "rss_peak_mib": round(rss.peak / mib, 1) if rss.peak else None,
+        "rss_growth_mib": round((current_rss() - rss_queued) / mib, 1) if rss_queued else None,
+    }
+    if args.trace_run:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory.update({
+            "traced_peak_mib": round(peak / mib, 2),
+            "traced_residual_mib": round((current - traced_base) / mib, 2),
+        })
+
+    scheduler_s = run_s - download_ns[0] / 1e9
+    return {
+        "jobs": total_jobs,
+        "added_during_run": added_during_run[0],
+        "failed": len(errors),
+        "enqueue_us_per_job": round(enqueue_s / args.jobs * 1e6, 2),
+        "run_s": round(run_s, 3),
+        "download_s": round(download_ns[0] / 1e9, 3),
+        "scheduler_overhead_us_per_job": round(scheduler_s / total_jobs * 1e6, 2),
+        "lock": lock.to_dict(),
+        "ui": {
+            "ticks": ui.ticks,
+            "events": ui.handled,
+            "renders": ui.renders,
+            "max_tick_ms": round(ui.max_tick_ms, 2),
+        },
+        "memory": memory,
+        "errors": errors[:5],
+    }
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--extract-delay-ms", type=float, default=0.0, help="ritardo estrazione finto")
+    parser.add_argument("--formats", type=int, default=3, help="formati per info dict")
+    parser.add_argument("--size", type=int, default=4096, help="byte per download")
+    parser.add_argument("--add-rate", type=float, default=0.0, help="job/s aggiunti durante l'esecuzione")
+    parser.add_argument("--add-jobs", type=int, default=100, help="job aggiunti al massimo durante l'esecuzione")
+    parser.add_argument("--render-limit", type=int, default=PERFORMANCE_CONFIG.QUEUE_RENDER_LIMIT,
+                        help="job copiati per render (0 = tutti, come prima del limite)")
+    parser.add_argument("--dry", action="store_true",
+                        help="non chiama yt-dlp: misura solo lo scheduler (utile con 100k job)")
+    parser.add_argument("--store", action="store_true",
+                        help="salva i job su SQLite come la GUI (JobStore nella cartella temporanea)")
+    parser.add_argument("--trace-run", action="store_true",
+                        help="tracemalloc anche durante l'esecuzione (lento; crescita residua esatta)")
+    parser.add_argument("--output", help="salva i risultati in JSON")
+    args = parser.parse_args(argv)
+    if args.render_limit == 0:
+        args.render_limit = None
+    return args
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    proc = None
+    if not args.dry:
+        proc, base_url, _ = start_media_server("--bytes-only")
+        os.environ["MVD_FAKE_MEDIA_URL"] = base_url
+    out_dir = Path(tempfile.mkdtemp(prefix="mvd-load-"))
+
+    try:
+        result = run(args, out_dir)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps({"args": vars(args), "result": result}, indent=2), encoding="utf-8")
+
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+"""
+Server HTTP locale che simula un sito video per i benchmark.
+
+Serve, in memoria:
+- /progressive.mp4          MP4 progressivo (download diretto)
+- /hls/index.m3u8 + segmenti  playlist HLS VOD
+- /dash/manifest.mpd + segmenti  manifest DASH (video e audio separati)
+- /bytes/<n>                n byte sintetici (usato dal plugin mvd_fake)
+
+I contenuti vengono generati con FFmpeg (testsrc + sine) se disponibile;
+altrimenti solo /progressive.mp4 è servito, con byte casuali (misura del
+solo trasferimento, senza post-processing).
+
+Ogni richiesta può subire latenza, limite di banda e errori iniettati
+(HTTP 503 o connessione chiusa a metà body). GET /_stats restituisce i
+contatori in JSON. Gli URL sono consumabili dall'estrattore generico di
+yt-dlp (Range supportato).
+
+Uso standalone:
+    python benchmarks/media_server.py --latency-ms 50 --bandwidth-kbps 8000 --error-rate 0.02
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CONTENT_TYPES = {
+    ".mp4": "video/mp4",
+    ".m4s": "video/iso.segment",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".mpd": "application/dash+xml",
+}
+
+SEND_CHUNK = 64 * 1024
+
+
+# ============================================================================
+# CONFIGURAZIONE
+# ============================================================================
+
+@dataclass(frozen=True)
+class MediaServerConfig:
+    """Parametri del server (rete simulata e contenuti)."""
+
+    host: str = "127.0.0.1"
+    port: int = 0  # 0 = porta libera scelta dal sistema
+    latency_ms: float = 0.0  # Ritardo prima di ogni risposta
+    bandwidth_kbps: float = 0.0  # Banda per connessione (0 = illimitata)
+    error_rate: float = 0.0  # Probabilità di HTTP 503 per richiesta
+    drop_rate: float = 0.0  # Probabilità di chiudere la connessione a metà body
+    seed: int = 1234
+    duration: int = 20  # Durata media generata (secondi)
+    video_bitrate: str = "2M"
+    segment_seconds: int = 2
+    cache_dir: Optional[str] = None  # Cache dei media generati (default: tempdir)
+    bytes_only: bool = False  # Solo /bytes/<n>, senza generare media
+
+
+# ============================================================================
+# GENERAZIONE CONTENUTI
+# ============================================================================
+
+def find_ffmpeg() -> Optional[str]:
+    """FFmpeg del repository (ffmpeg/bin) oppure dal PATH."""
+    for name in ("ffmpeg.exe", "ffmpeg"):
+        candidate = REPO_ROOT / "ffmpeg" / "bin" / name
+        if candidate.exists():
+            return str(candidate)
+    return shutil.which("ffmpeg")
+
+
+def _run_ffmpeg(ffmpeg: str, args: list, cwd: Path) -> bool:
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(f"[media_server] ffmpeg failed: {result.stderr.strip()[:500]}", file=sys.stderr)
+    return result.returncode == 0
+
+
+def generate_media(config: MediaServerConfig) -> Dict[str, bytes]:
+    """
+    Genera (o carica dalla cache) i file serviti dal server.
+
+    Returns:
+        Mappa path URL -> contenuto
+    """
+    if config.bytes_only:
+        return {}
+
+    key = f"media-{config.duration}s-{config.video_bitrate}-{config.segment_seconds}"
+    root = Path(config.cache_dir or tempfile.gettempdir()) / "mvd-bench" / key
+    ffmpeg = find_ffmpeg()
+
+    source = root / "progressive.mp4"
+    if ffmpeg and not source.exists():
+        root.mkdir(parents=True, exist_ok=True)
+        ok = _run_ffmpeg(ffmpeg, [
+            "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={config.duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={config.duration}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-b:v", config.video_bitrate,
+            "-g", str(30 * config.segment_seconds),
+            "-c:a", "aac", "-b:a", "128k",
+            "-movflags", "+faststart", "-shortest", str(source),
+        ], root)
+        if ok:
+            (root / "hls").mkdir(exist_ok=True)
+            _run_ffmpeg(ffmpeg, [
+                "-i", str(source), "-c", "copy", "-f", "hls",
+                "-hls_time", str(config.segment_seconds), "-hls_playlist_type", "vod",
+                "hls/index.m3u8",
+            ], root)
+            (root / "dash").mkdir(exist_ok=True)
+            _run_ffmpeg(ffmpeg, [
+                "-i", str(source), "-map", "0:v", "-map", "0:a", "-c", "copy", "-f", "dash",
+                "-seg_duration", str(config.segment_seconds), "-use_template", "1",
+                "-use_timeline", "0", "dash/manifest.mpd",
+            ], root)
+
+    files: Dict[str, bytes] = {}
+    if source.exists():
+        for path in root.rglob("*"):
+            if path.is_file():
+                files["/" + path.relative_to(root).as_posix()] = path.read_bytes()
+    else:
+        # Nessun FFmpeg reale: payload casuale, utile solo per il trasferimento
+        rng = random.Random(config.seed)
+        size = config.duration * 256 * 1024
+        files["/progressive.mp4"] = rng.randbytes(size)
+        print("[media_server] ffmpeg unavailable: serving random progressive payload only", file=sys.stderr)
+
+    return files
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+class _Stats:
+    """Contatori condivisi tra i thread del server."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.errors_injected = 0
+        self.drops_injected = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "errors_injected": self.errors_injected,
+                "drops_injected": self.drops_injected,
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MediaHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self._serve(head=True)
+
+    def do_GET(self) -> None:
+        self._serve(head=False)
+
+    def _parse_range(self, size: int) -> Optional[Tuple[int, int]]:
+        header = self.headers.get("Range", "")
+        if not header.startswith("bytes="):
+            return None
+        start_s, _, end_s = header[len("bytes="):].split(",")[0].partition("-")
+        if not start_s:
+            start = max(0, size - int(end_s))
+            end = size - 1
+        else:
+            start = int(start_s)
+            end = min(int(end_s), size - 1) if end_s else size - 1
+        return start, end
+
+    def _serve(self, head: bool) -> None:
+        srv = self.server
+        config = srv.config
+        path = self.path.split("?", 1)[0]
+
+        with srv.stats.lock:
+            srv.stats.requests += 1
+
+        if path == "/_stats":
+            body = json.dumps(srv.stats.to_dict()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000)
+
+        # Path per-job (es. /j/17/progressive.mp4) -> stesso contenuto
+        if path.startswith("/j/"):
+            path = "/" + path.split("/", 3)[-1]
+
+        data = srv.files.get(path)
+        if data is None and path.startswith("/bytes/"):
+            data = srv.synthetic_bytes(path[len("/bytes/"):])
+        if data is None:
+            self.send_error(404)
+            return
+
+        if srv.rng_chance(config.error_rate):
+            with srv.stats.lock:
+                srv.stats.errors_injected += 1
+            self.send_error(503, "Injected error")
+            return
+
+        byte_range = self._parse_range(len(data))
+        if byte_range is not None:
+            start, end = byte_range
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            start, end = 0, len(data) - 1
+            self.send_response(200)
+
+        body = memoryview(data)[start:end + 1]
+        suffix = os.path.splitext(path)[1]
+        self.send_header("Content-Type", CONTENT_TYPES.get(suffix, "application/octet-stream"))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        if head:
+            return
+
+        drop_at = len(body) // 2 if srv.rng_chance(config.drop_rate) else None
+        self._send_throttled(body, drop_at)
+
+    def _send_throttled(self, body: memoryview, drop_at: Optional[int]) -> None:
+        config = self.server.config
+        bytes_per_sec = config.bandwidth_kbps * 1000 / 8
+        started = time.perf_counter()
+        sent = 0
+
+        try:
+            while sent < len(body):
+                if drop_at is not None and sent >= drop_at:
+                    with self.server.stats.lock:
+                        self.server.stats.drops_injected += 1
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+
+                chunk = body[sent:sent + SEND_CHUNK]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                with self.server.stats.lock:
+                    self.server.stats.bytes_sent += len(chunk)
+
+                if bytes_per_sec > 0:
+                    ahead = sent / bytes_per_sec - (time.perf_counter() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class MediaHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer con contenuti, configurazione e contatori."""
+
+    daemon_threads = True
+
+    def __init__(self, config: MediaServerConfig, files: Dict[str, bytes]) -> None:
+        super().__init__((config.host, config.port), _Handler)
+        self.config = config
+        self.files = files
+        self.stats = _Stats()
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._synthetic: Dict[str, bytes] = {}
+
+    def synthetic_bytes(self, size: str) -> Optional[bytes]:
+        """Payload di `size` byte (cache per dimensione)."""
+        if not size.isdigit() or int(size) > 1 << 30:
+            return None
+        data = self._synthetic.get(size)
+        if data is None:
+            data = self._synthetic[size] = bytes(int(size))
+        return data
+
+    def rng_chance(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < probability
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class MediaServer:
+    """
+    Server in un thread di background (context manager).
+
+    Examples:
+        >>> with MediaServer(MediaServerConfig(latency_ms=20)) as server:
+        ...     url = server.url("/progressive.mp4")
+    """
+
+    def __init__(self, config: MediaServerConfig = MediaServerConfig()) -> None:
+        self.config = config
+        self.httpd = MediaHTTPServer(config, generate_media(config))
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True, name="MediaServerThread"
+        )
+
+    def url(self, path: str) -> str:
+        return self.httpd.base_url + path
+
+    @property
+    def paths(self) -> list:
+        return sorted(self.httpd.files)
+
+    def __enter__(self) -> "MediaServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def parse_config(argv: Optional[list] = None) -> MediaServerConfig:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-kbps", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--duration", type=int, default=20)
+    parser.add_argument("--video-bitrate", default="2M")
+    parser.add_argument("--segment-seconds", type=int, default=2)
+    parser.add_argument("--cache-dir")
+    parser.add_argument("--bytes-only", action="store_true", help="serve solo /bytes/<n>")
+    args = parser.parse_args(argv)
+    return MediaServerConfig(**{k: v for k, v in vars(args).items()})
+
+
+def main(argv: Optional[list] = None) -> None:
+    config = parse_config(argv)
+    server = MediaServer(config)
+
+    # Prima riga su stdout: letta da bench_e2e.py per trovare la porta
+    print(f"READY {server.httpd.base_url} {' '.join(server.paths)}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Micro-benchmark dei percorsi caldi eseguiti a ogni tick di progresso o per job.
+
+Casi misurati (input realistici):
+- build_progress_data   (lavoro del progress_hook a ogni tick non filtrato)
+- format_bytes / format_time
+- get_status_color
+- sanitize_filename / sanitize_filenames (singolo e batch)
+- quality_to_ydl_format
+- archive_lookup        (controllo duplicati all'aggiunta, archivio da 10k voci)
+- canonicalize_url      (chiave di deduplicazione, senza la cache LRU)
+- bandwidth_tick        (consumo nei token bucket dal progress hook, senza attese)
+
+I tempi (ns per chiamata, minimo su più ripetizioni) vengono normalizzati
+rispetto a un caso di calibrazione in puro Python, così la baseline salvata
+resta confrontabile tra macchine diverse.
+
+Esempi:
+    python benchmarks/micro.py                         # stampa i risultati
+    python benchmarks/micro.py --save                  # aggiorna la baseline
+    python benchmarks/micro.py --compare --tolerance 0.25
+        # exit code 1 se un caso è più lento del 25% rispetto alla baseline
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from mvd.archive import DownloadArchive  # noqa: E402
+from mvd.bandwidth import BandwidthGovernor  # noqa: E402
+from mvd.canonical import canonicalize_url  # noqa: E402
+from mvd.config import QUALITY_PRESETS, UI_MSG, get_status_color, quality_to_ydl_format  # noqa: E402
+from mvd.downloader import build_progress_data  # noqa: E402
+from mvd.utils import format_bytes, format_time, sanitize_filename, sanitize_filenames  # noqa: E402
+
+BASELINE_PATH = BENCH_DIR / "baseline_micro.json"
+CALIBRATION = "calibration"
+
+
+# ============================================================================
+# INPUT REALISTICI
+# ============================================================================
+
+PROGRESS_TICKS: List[Dict[str, Any]] = [
+    {"status": "downloading", "downloaded_bytes": 1_048_576, "total_bytes": 734_003_200,
+     "speed": 5_242_880.0, "eta": 140},
+    {"status": "downloading", "downloaded_bytes": 367_001_600, "total_bytes_estimate": 734_003_200,
+     "speed": 12_582_912.5, "eta": 29, "fragment_index": 120, "fragment_count": 240},
+    {"status": "downloading", "downloaded_bytes": 52_428, "total_bytes": None,
+     "speed": None, "eta": None},
+]
+
+BYTE_SIZES: List[int] = [0, 512, 1536, 5_452_595, 734_003_200, 3_650_722_201]
+SECONDS: List[int] = [0, 7, 59, 754, 3_599, 7_322]
+
+STATUSES: List[str] = [
+    UI_MSG.STATUS_READY,
+    UI_MSG.STATUS_DOWNLOADING,
+    UI_MSG.STATUS_PROCESSING,
+    UI_MSG.STATUS_COMPLETE,
+    UI_MSG.STATUS_CANCELLED,
+    UI_MSG.STATUS_ERROR.format("HTTP Error 403: Forbidden"),
+]
+
+TITLES: List[str] = [
+    "Rick Astley - Never Gonna Give You Up (Official Music Video)",
+    'Lo-fi beats: "study / relax" | 24/7 live? <remastered>',
+    "🎵 Концерт — 東京 2024 ✨ Full HD",
+    "   ..trailing dots and spaces..   ",
+    "Very long title " * 20 + ".mp4",
+]
+
+
+# Archivio in memoria con 10k video; metà degli URL già scaricati
+ARCHIVE = DownloadArchive(":memory:")
+ARCHIVE.add_many(("youtube", f"vid{i:08d}", None, None) for i in range(10_000))
+ARCHIVE_URLS: List[str] = [
+    "https://www.youtube.com/watch?v=vid00000042",
+    "https://youtu.be/vid00009999?t=30",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123",
+    "https://vimeo.com/76979871",
+    "https://example.com/media/video.mp4",
+    "https://m.youtube.com/shorts/vid00001234",
+]
+
+
+# Limiti totale, per host e per job così alti da non attendere mai: si
+# misura solo il costo aggiunto a ogni tick del progress hook
+BANDWIDTH_JOB = BandwidthGovernor(total=1 << 40, per_host=1 << 40, per_job=1 << 40).open_job("micro", "youtube.com")
+BANDWIDTH_BYTES = itertools.count(0, 64 * 1024)
+
+
+# ============================================================================
+# CASI
+# ============================================================================
+
+def _bandwidth_ticks() -> None:
+    for _ in range(5):
+        BANDWIDTH_JOB.on_progress({"downloaded_bytes": next(BANDWIDTH_BYTES), "filename": "video.mp4"})
+
+
+def _calibration() -> None:
+    # Mix simile ai casi reali: aritmetica, dict, formattazione stringhe
+    for i in range(5):
+        d = {"a": i * 1.5, "b": i // 3}
+        f"{d['a']:.2f} {d['b']:02d}".strip().lower()
+
+
+CASES: Dict[str, Callable[[], Any]] = {
+    CALIBRATION: _calibration,
+    "build_progress_data": lambda: [build_progress_data(d) for d in PROGRESS_TICKS],
+    "format_bytes": lambda: [format_bytes(n) for n in BYTE_SIZES],
+    "format_time": lambda: [format_time(s) for s in SECONDS],
+    "get_status_color": lambda: [get_status_color(s) for s in STATUSES],
+    "sanitize_filename": lambda: [sanitize_filename(t) for t in TITLES],
+    "sanitize_filenames": lambda: sanitize_filenames(TITLES),
+    "quality_to_ydl_format": lambda: [quality_to_ydl_format(p) for p in QUALITY_PRESETS],
+    "archive_lookup": lambda: [ARCHIVE.contains_url(u) for u in ARCHIVE_URLS],
+    "canonicalize_url": lambda: [canonicalize_url.__wrapped__(u) for u in ARCHIVE_URLS],
+    "bandwidth_tick": _bandwidth_ticks,
+}
+
+
+def _loops(timer: timeit.Timer, min_time: float) -> int:
+    number, elapsed = timer.autorange()
+    return max(number, int(number * min_time / max(elapsed, 1e-9)))
+
+
+_calibration_cache: Dict[float, int] = {}
+
+
+def _calibration_loops(timer: timeit.Timer, min_time: float) -> int:
+    if min_time not in _calibration_cache:
+        _calibration_cache[min_time] = _loops(timer, min_time)
+    return _calibration_cache[min_time]
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    Nanosecondi per chiamata del caso e della calibrazione.
+
+    Le ripetizioni dei due casi sono alternate, così variazioni di
+    frequenza o carico della macchina pesano allo stesso modo su entrambi.
+    Si tiene il minimo di ciascuno.
+    """
+    case_timer = timeit.Timer(func)
+    calibration_timer = timeit.Timer(CASES[CALIBRATION])
+    case_loops = _loops(case_timer, min_time)
+    calibration_loops = _calibration_loops(calibration_timer, min_time)
+
+    case_best = calibration_best = float("inf")
+    for _ in range(repeat):
+        calibration_best = min(calibration_best, calibration_timer.timeit(calibration_loops) / calibration_loops)
+        case_best = min(case_best, case_timer.timeit(case_loops) / case_loops)
+
+    return {"ns": round(case_best * 1e9, 1), "relative": round(case_best / calibration_best, 4)}
+
+
+def run(names: Sequence[str], repeat: int, min_time: float) -> Dict[str, Dict[str, float]]:
+    """Esegue i casi richiesti (calibrazione sempre inclusa)."""
+    results = {CALIBRATION: measure(CASES[CALIBRATION], repeat, min_time)}
+    results[CALIBRATION]["relative"] = 1.0
+
+    for name in names:
+        if name != CALIBRATION:
+            results[name] = measure(CASES[name], repeat, min_time)
+
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Confronta i tempi relativi con la baseline.
+
+    Returns:
+        Elenco dei casi più lenti della tolleranza
+    """
+    regressions = []
+    for name, result in results.items():
+        if name == CALIBRATION or name not in baseline:
+            continue
+        ratio = result["relative"] / baseline[name]["relative"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"  {name:<24} {ratio:>6.2f}x baseline  {flag}")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="*", help="casi da eseguire (default: tutti)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="secondi minimi per ripetizione")
+    parser.add_argument("--save", action="store_true", help="salva i risultati come baseline")
+    parser.add_argument("--compare", action="store_true", help="confronta con la baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="rallentamento ammesso (0.25 = +25%%)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    args = parser.parse_args(argv)
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    results = run(args.cases or list(CASES), args.repeat, args.min_time)
+    for name, result in results.items():
+        print(f"{name:<24} {result['ns']:>10.1f} ns/call  {result['relative']:>8.3f}x calibration")
+
+    baseline_path = Path(args.baseline)
+
+    if args.save:
+        baseline_path.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {baseline_path}")
+
+    if args.compare:
+        if not baseline_path.exists():
+            print(f"No baseline at {baseline_path}; run with --save first", file=sys.stderr)
+            return 2
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+        print(f"Comparison (tolerance +{args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Slower than baseline: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
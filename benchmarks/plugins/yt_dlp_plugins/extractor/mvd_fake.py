@@ -0,0 +1,62 @@
+"""
+Estrattore yt-dlp finto per i load test (nessun accesso alla rete esterna).
+
+URL: mvdfake://<id>?delay_ms=5&formats=3&size=4096&title=Clip
+
+- delay_ms: ritardo simulato di estrazione (millisecondi)
+- formats: numero di formati MP4 progressivi nella info dict
+- size: byte di ogni formato, serviti da media_server.py (/bytes/<size>)
+- title: titolo del video (default "Fake video <id>"; uguale per più id
+  per provare le collisioni dei nomi di output)
+
+Il base URL del server va in MVD_FAKE_MEDIA_URL (default http://127.0.0.1:8765).
+Caricato da yt-dlp quando benchmarks/plugins è in sys.path.
+"""
+
+import os
+import time
+from urllib.parse import parse_qs, urlparse
+
+from yt_dlp.extractor.common import InfoExtractor
+
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+
+
+class MVDFakeIE(InfoExtractor):
+    IE_NAME = "mvdfake"
+    IE_DESC = "Synthetic extractor for MVD load tests"
+    _VALID_URL = r"mvdfake://(?P<id>[\w-]+)"
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        query = {k: v[-1] for k, v in parse_qs(urlparse(url).query).items()}
+
+        delay_ms = float(query.get("delay_ms", 0))
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+        base = os.getenv("MVD_FAKE_MEDIA_URL", "http://127.0.0.1:8765").rstrip("/")
+        size = int(query.get("size", 4096))
+        count = max(1, min(int(query.get("formats", 3)), len(HEIGHTS)))
+
+        formats = [
+            {
+                "format_id": f"{height}p",
+                "url": f"{base}/bytes/{size}?id={video_id}&f={height}",
+                "ext": "mp4",
+                "height": height,
+                "width": height * 16 // 9,
+                "vcodec": "avc1.64001F",
+                "acodec": "mp4a.40.2",
+                "filesize": size,
+                "protocol": "http",
+            }
+            for height in HEIGHTS[:count]
+        ]
+
+        return {
+            "id": video_id,
+            "title": query.get("title", f"Fake video {video_id}"),
+            "duration": 60,
+            "formats": formats,
+        }
@@ -0,0 +1,250 @@
+"""
+Soak test: migliaia di download in cicli, con rilevamento di leak.
+
+Ogni ciclo accoda N job mvdfake:// (estrattore finto in benchmarks/plugins,
+byte da media_server.py --bytes-only), ne recupera i titoli come fa la GUI
+(fetch_title_async), esegue la coda e passa gli eventi a un LogBuffer come
+_log. Dopo i cicli di warm-up (import e cache di yt-dlp) prende snapshot
+tracemalloc periodici e conta thread e RSS.
+
+Fallisce (exit code 1) se la memoria trattenuta cresce oltre --max-growth-mib
+o se il picco di thread vivi supera quello iniziale di più di
+--max-thread-growth; riporta sempre le righe di codice con la crescita
+maggiore.
+
+Esempi:
+    python benchmarks/soak.py --cycles 100 --jobs-per-cycle 20
+    python benchmarks/soak.py --cycles 1000 --sample-every 50 --max-growth-mib 4 --output soak.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+sys.path.insert(0, str(BENCH_DIR / "plugins"))  # yt_dlp_plugins.extractor.mvd_fake
+
+from mvd.config import PERFORMANCE_CONFIG, UI_MSG  # noqa: E402
+from mvd.download_queue import DownloadQueue  # noqa: E402
+from mvd.log_view import LogBuffer  # noqa: E402
+
+from _support import current_rss, start_media_server, thread_count  # noqa: E402
+
+MIB = 1024 ** 2
+
+
+# ============================================================================
+# CICLO
+# ============================================================================
+
+class SoakRunner:
+    """Esegue i cicli coda + titoli + log come la GUI, senza Tk."""
+
+    def __init__(self, args: argparse.Namespace, out_dir: Path) -> None:
+        self.args = args
+        self.out_dir = out_dir
+        self.events: "queue.Queue" = queue.Queue()
+        self.dq = DownloadQueue(lambda kind, payload: self.events.put((kind, payload)))
+        self.log_buffer = LogBuffer()
+        self.job_labels: Dict[str, str] = {}
+        self.jobs_done = 0
+        self.peak_threads = thread_count()
+        self.errors: List[str] = []
+
+    def cycle(self, index: int) -> None:
+        args = self.args
+        jobs = [
+            self.dq.add(
+                f"mvdfake://soak-{index}-{i}?delay_ms={args.extract_delay_ms}"
+                f"&formats={args.formats}&size={args.size}"
+            )
+            for i in range(args.jobs_per_cycle)
+        ]
+
+        if args.fetch_titles:
+            for job in jobs:
+                self.dq.fetch_title_async(job)
+            deadline = time.monotonic() + 60
+            while any(job.title == UI_MSG.TITLE_LOADING for job in jobs) and time.monotonic() < deadline:
+                time.sleep(0.01)
+                self.drain()
+
+        del jobs
+        self.dq.start(mode="video", quality="best", output_path=str(self.out_dir))
+        while not self.dq.wait(timeout=0.1):
+            self.drain()
+        self.drain()
+        self.jobs_done += args.jobs_per_cycle
+
+        # I file scaricati non contano: svuota la cartella a ogni ciclo
+        for path in self.out_dir.iterdir():
+            path.unlink()
+
+    def drain(self) -> None:
+        """Come _drain_ui_queue: righe di log nel ring buffer, resto scartato."""
+        self.peak_threads = max(self.peak_threads, thread_count())
+        try:
+            while True:
+                kind, payload = self.events.get_nowait()
+                if kind != "log":
+                    continue
+                # Stessa firma di _log(msg, level, job, job_label)
+                if not isinstance(payload, tuple):
+                    payload = (payload,)
+                msg, level, job, label = payload + (logging.INFO, None, None)[len(payload) - 1:]
+                known = job is None or job in self.job_labels
+                self.log_buffer.append(msg, level=level, job=job, job_label=label)
+                if not known:
+                    self.job_labels = self.log_buffer.jobs()
+                if level >= logging.ERROR and len(self.errors) < 5:
+                    self.errors.append(msg)
+        except queue.Empty:
+            pass
+
+
+# ============================================================================
+# CAMPIONI
+# ============================================================================
+
+def sample(cycle: int, runner: SoakRunner, baseline_traced: int) -> Dict[str, Any]:
+    gc.collect()
+    traced, peak = tracemalloc.get_traced_memory()
+    rss = current_rss()
+    peak_threads, runner.peak_threads = runner.peak_threads, thread_count()
+    return {
+        "cycle": cycle,
+        "jobs": runner.jobs_done,
+        "threads": thread_count(),
+        "peak_threads": peak_threads,
+        "traced_growth_mib": round((traced - baseline_traced) / MIB, 3),
+        "traced_peak_mib": round(peak / MIB, 2),
+        "rss_mib": round(rss / MIB, 1) if rss else None,
+        "gc_objects": len(gc.get_objects()),
+    }
+
+
+def top_growth(baseline: tracemalloc.Snapshot, limit: int) -> List[str]:
+    """Righe di codice con la maggiore crescita rispetto alla baseline."""
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    stats = snapshot.compare_to(baseline, "traceback")
+    return [
+        f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks) {stat.traceback.format()[-1].strip()}"
+        for stat in stats[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def run(args: argparse.Namespace, out_dir: Path) -> Dict[str, Any]:
+    runner = SoakRunner(args, out_dir)
+    baseline_threads = thread_count()
+
+    for cycle in range(args.warmup):
+        runner.cycle(-cycle - 1)
+    runner.jobs_done = 0
+
+    gc.collect()
+    tracemalloc.start(args.frames)
+    baseline = tracemalloc.take_snapshot()
+    baseline_traced = tracemalloc.get_traced_memory()[0]
+    samples = [sample(0, runner, baseline_traced)]
+
+    started = time.perf_counter()
+    for cycle in range(1, args.cycles + 1):
+        runner.cycle(cycle)
+        if cycle % args.sample_every == 0 or cycle == args.cycles:
+            samples.append(sample(cycle, runner, baseline_traced))
+            s = samples[-1]
+            print(
+                f"cycle {cycle:>5} jobs={s['jobs']:>6} threads={s['threads']:>3} (peak {s['peak_threads']}) "
+                f"retained={s['traced_growth_mib']:+.3f} MiB rss={s['rss_mib']} MiB "
+                f"objects={s['gc_objects']}",
+                file=sys.stderr,
+            )
+    elapsed = time.perf_counter() - started
+
+    growth = top_growth(baseline, args.top)
+    tracemalloc.stop()
+
+    final = samples[-1]
+    failures = []
+    if final["traced_growth_mib"] > args.max_growth_mib:
+        failures.append(f"retained memory +{final['traced_growth_mib']} MiB > {args.max_growth_mib} MiB")
+    thread_limit = baseline_threads + args.max_thread_growth
+    peak_threads = max(s["peak_threads"] for s in samples)
+    if peak_threads > thread_limit:
+        failures.append(f"peak threads {peak_threads} > {thread_limit}")
+    if len(runner.log_buffer) > runner.log_buffer.max_lines:
+        failures.append(f"log buffer {len(runner.log_buffer)} lines > {runner.log_buffer.max_lines}")
+
+    return {
+        "cycles": args.cycles,
+        "jobs": runner.jobs_done,
+        "elapsed_s": round(elapsed, 1),
+        "baseline_threads": baseline_threads,
+        "retained_bytes_per_job": round(final["traced_growth_mib"] * MIB / max(runner.jobs_done, 1), 1),
+        "samples": samples,
+        "top_growth": growth,
+        "download_errors": runner.errors,
+        "failures": failures,
+    }
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=100)
+    parser.add_argument("--jobs-per-cycle", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3, help="cicli prima della baseline")
+    parser.add_argument("--sample-every", type=int, default=10, help="cicli tra due snapshot")
+    parser.add_argument("--extract-delay-ms", type=float, default=0.0)
+    parser.add_argument("--formats", type=int, default=3)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--no-fetch-titles", dest="fetch_titles", action="store_false")
+    parser.add_argument("--max-growth-mib", type=float, default=8.0, help="memoria trattenuta ammessa")
+    parser.add_argument("--max-thread-growth", type=int, default=PERFORMANCE_CONFIG.TITLE_FETCH_WORKERS + 2,
+                        help="thread in più ammessi rispetto all'avvio (worker coda + worker titoli)")
+    parser.add_argument("--frames", type=int, default=5, help="frame tracemalloc per allocazione")
+    parser.add_argument("--top", type=int, default=10, help="righe di crescita da riportare")
+    parser.add_argument("--output", help="salva i risultati in JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    proc, base_url, _ = start_media_server("--bytes-only")
+    os.environ["MVD_FAKE_MEDIA_URL"] = base_url
+    out_dir = Path(tempfile.mkdtemp(prefix="mvd-soak-"))
+
+    try:
+        result = run(args, out_dir)
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(json.dumps({k: v for k, v in result.items() if k != "samples"}, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps({"args": vars(args), "result": result}, indent=2), encoding="utf-8")
+
+    for failure in result["failures"]:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
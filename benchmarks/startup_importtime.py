@@ -0,0 +1,262 @@
+"""
+Profilo di avvio basato su python -X importtime.
+
+Per ogni target (import della GUI, di mvd.main, della CLI, del percorso di
+inoltro a un'istanza già aperta) avvia un interprete pulito con
+-X importtime, somma il tempo cumulativo degli import di primo livello e
+riporta i moduli più costosi. Il minimo su più ripetizioni viene
+normalizzato su un import di calibrazione della sola libreria standard,
+come in micro.py, così la baseline resta confrontabile tra macchine.
+
+Controlla anche che i moduli differiti (yt-dlp, updater, pyperclip) non
+vengano importati prima della finestra: exit code 1 se succede.
+
+Esempi:
+    python benchmarks/startup_importtime.py                 # tutti i target
+    python benchmarks/startup_importtime.py gui --top 20
+    python benchmarks/startup_importtime.py --save          # aggiorna la baseline
+    python benchmarks/startup_importtime.py --compare --tolerance 0.3
+    python benchmarks/startup_importtime.py --window        # anche tempo al primo disegno (serve un display)
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+
+BASELINE_PATH = BENCH_DIR / "baseline_startup.json"
+CALIBRATION = "calibration"
+
+# Target: codice eseguito dall'interprete pulito
+TARGETS: Dict[str, str] = {
+    CALIBRATION: "import asyncio, http.client, email.parser",
+    "gui": "import mvd.gui",
+    "main": "import mvd.main",
+    "cli": "import mvd.cli",
+    "forward": "import mvd.single_instance",
+}
+
+# Moduli che non devono comparire prima del primo disegno della finestra
+DEFERRED_MODULES: Dict[str, Tuple[str, ...]] = {
+    "gui": ("yt_dlp", "mvd.updater", "pyperclip"),
+    "main": ("yt_dlp", "customtkinter", "mvd.updater", "pyperclip"),
+    "forward": ("yt_dlp", "customtkinter"),
+}
+
+WINDOW_SCRIPT = """
+import time
+started = time.perf_counter()
+from mvd.gui import VideoDownloaderGUI
+app = VideoDownloaderGUI()
+app.update()
+print((time.perf_counter() - started) * 1000)
+app.destroy()
+"""
+
+
+# ============================================================================
+# MISURA
+# ============================================================================
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Righe di -X importtime in dizionari (self/cumulativo in µs, profondità).
+
+    Examples:
+        >>> parse_importtime("import time: self [us] | cumulative | imported package\\n"
+        ...                  "import time:       120 |        300 |   json.decoder\\n")
+        [{'module': 'json.decoder', 'self_us': 120, 'cumulative_us': 300, 'depth': 1}]
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # intestazione
+        name = fields[2].rstrip()
+        stripped = name.lstrip(" ")
+        entries.append({
+            "module": stripped,
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+            "depth": (len(name) - len(stripped) - 1) // 2,
+        })
+    return entries
+
+
+def run_target(code: str) -> Tuple[List[Dict[str, Any]], float]:
+    """Esegue il target in un interprete pulito; ritorna (import, wall ms)."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True, check=False,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{code!r} failed: {proc.stderr.strip().splitlines()[-1:]}")
+    return parse_importtime(proc.stderr), wall_ms
+
+
+def startup_modules() -> frozenset:
+    """Moduli importati dall'interprete prima del codice (-c pass)."""
+    entries, _ = run_target("pass")
+    return frozenset(e["module"] for e in entries)
+
+
+def measure(name: str, repeat: int, top: int, skip: frozenset = frozenset()) -> Dict[str, Any]:
+    """
+    Minimo su repeat esecuzioni; moduli più costosi della migliore.
+
+    Gli import di primo livello in skip (site, encodings...) sono uguali per
+    tutti i target e non vengono sommati.
+    """
+    best: Optional[List[Dict[str, Any]]] = None
+    best_us = None
+    best_wall = None
+    for _ in range(repeat):
+        entries, wall_ms = run_target(TARGETS[name])
+        total_us = sum(e["cumulative_us"] for e in entries if e["depth"] == 0 and e["module"] not in skip)
+        if best_us is None or total_us < best_us:
+            best, best_us = entries, total_us
+        best_wall = wall_ms if best_wall is None else min(best_wall, wall_ms)
+
+    modules = {e["module"] for e in best}
+    heaviest = sorted(best, key=lambda e: e["self_us"], reverse=True)[:top]
+    return {
+        "import_ms": round(best_us / 1000, 2),
+        "wall_ms": round(best_wall, 1),
+        "modules": len(modules),
+        "deferred_loaded": [m for m in DEFERRED_MODULES.get(name, ()) if m in modules],
+        "top_self": [{"module": e["module"], "self_ms": round(e["self_us"] / 1000, 2)} for e in heaviest],
+    }
+
+
+def measure_window(repeat: int) -> Optional[float]:
+    """Millisecondi fino al primo update() della finestra; None senza display."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR), MVD_MULTI_INSTANCE="1")
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", WINDOW_SCRIPT], env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"window: skipped ({proc.stderr.strip().splitlines()[-1:]})", file=sys.stderr)
+            return None
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return round(min(samples), 1)
+
+
+def run(names: Sequence[str], repeat: int, top: int) -> Dict[str, Dict[str, Any]]:
+    skip = startup_modules()
+    results = {}
+    for name in [CALIBRATION, *[n for n in names if n != CALIBRATION]]:
+        results[name] = measure(name, repeat, top, skip)
+    calibration_ms = results[CALIBRATION]["import_ms"] or 1.0
+    for result in results.values():
+        result["relative"] = round(result["import_ms"] / calibration_ms, 3)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Confronta i tempi di import relativi con la baseline.
+
+    Returns:
+        Elenco dei target più lenti della tolleranza
+    """
+    regressions = []
+    for name, result in results.items():
+        if name == CALIBRATION or name not in baseline:
+            continue
+        ratio = result["relative"] / baseline[name]["relative"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"  {name:<10} {ratio:>6.2f}x baseline  {flag}")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", help="target da misurare (default: tutti)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="moduli più costosi da riportare")
+    parser.add_argument("--window", action="store_true", help="misura anche il tempo al primo disegno")
+    parser.add_argument("--save", action="store_true", help="salva i risultati come baseline")
+    parser.add_argument("--compare", action="store_true", help="confronta con la baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="rallentamento ammesso (0.3 = +30%%)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--output", help="salva i risultati (con i moduli più costosi) in JSON")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    results = run(args.targets or list(TARGETS), args.repeat, args.top)
+    for name, result in results.items():
+        print(
+            f"{name:<12} import={result['import_ms']:>8.1f} ms  wall={result['wall_ms']:>7.1f} ms  "
+            f"modules={result['modules']:>4}  {result['relative']:>6.2f}x calibration"
+        )
+        if name != CALIBRATION and args.targets:
+            for entry in result["top_self"]:
+                print(f"    {entry['self_ms']:>8.2f} ms  {entry['module']}")
+
+    if args.window:
+        window_ms = measure_window(args.repeat)
+        if window_ms is not None:
+            print(f"{'window':<12} first paint={window_ms:>8.1f} ms")
+            results["window"] = {"first_paint_ms": window_ms}
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    failures = [
+        f"{name}: {', '.join(result['deferred_loaded'])} imported at startup"
+        for name, result in results.items()
+        if result.get("deferred_loaded")
+    ]
+
+    baseline_path = Path(args.baseline)
+
+    if args.save:
+        baseline_path.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": {
+                name: {"import_ms": r["import_ms"], "relative": r["relative"]}
+                for name, r in results.items() if "relative" in r
+            },
+        }, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {baseline_path}")
+
+    if args.compare:
+        if not baseline_path.exists():
+            print(f"No baseline at {baseline_path}; run with --save first", file=sys.stderr)
+            return 2
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+        print(f"Comparison (tolerance +{args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            failures.append(f"slower than baseline: {', '.join(regressions)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,26 @@
+import os
 import sys
 from pathlib import Path
 
+# Diagnostica dei percorsi solo su richiesta (MVD_RUN_VERBOSE=1): all'avvio
+# normale non deve ritardare la comparsa della finestra
+VERBOSE = os.getenv("MVD_RUN_VERBOSE", "").strip().lower() in ("1", "true", "yes", "on")
+
+def log(*args):
+    # stderr: stdout è riservato all'output JSON-lines della modalità cli
+    if VERBOSE:
+        print(*args, file=sys.stderr)
+
 def setup_paths_or_die():
     base_dir = Path(__file__).resolve().parent
     src_dir = base_dir / "src"
     pkg_dir = src_dir / "mvd"
 
-    print("[run.py] FILE :", Path(__file__).resolve())
-    print("[run.py] CWD  :", Path.cwd())
-    print("[run.py] BASE :", base_dir)
-    print("[run.py] SRC  :", src_dir, "exists=", src_dir.exists())
-    print("[run.py] MVD  :", pkg_dir, "exists=", pkg_dir.exists())
+    log("[run.py] FILE :", Path(__file__).resolve())
+    log("[run.py] CWD  :", Path.cwd())
+    log("[run.py] BASE :", base_dir)
+    log("[run.py] SRC  :", src_dir, "exists=", src_dir.exists())
+    log("[run.py] MVD  :", pkg_dir, "exists=", pkg_dir.exists())
 
     if not src_dir.exists():
         raise RuntimeError(f"ERRORE: cartella 'src' non trovata in: {src_dir}")
@@ -21,7 +31,7 @@ def setup_paths_or_die():
     if str(src_dir) not in sys.path:
         sys.path.insert(0, str(src_dir))
 
-    print("[run.py] sys.path[0] =", sys.path[0])
+    log("[run.py] sys.path[0] =", sys.path[0])
 
 def main():
     setup_paths_or_die()
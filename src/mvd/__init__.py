@@ -1,4 +1,4 @@
 """Modern Video Downloader package."""
 
-__all__ = ["main", "gui", "downloader", "utils"]
+__all__ = ["main", "gui", "cli", "daemon", "downloader", "utils"]
 __version__ = "0.5.0"
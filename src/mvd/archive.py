@@ -0,0 +1,596 @@
+"""
+Archivio dei download completati per Modern Video Downloader.
+
+Ogni video scaricato viene registrato per (estrattore, id video), con la
+stessa chiave dell'archivio di yt-dlp ("youtube dQw4w9WgXcQ"), in una
+tabella SQLite indicizzata nella cartella dati dell'applicazione. Davanti
+al database c'è un bloom filter in memoria: per un URL mai scaricato (il
+caso comune) la risposta arriva senza toccare SQLite.
+
+L'archivio viene consultato in tre punti, sempre prima di qualsiasi
+accesso alla rete:
+- all'aggiunta di un URL (GUI, URL inoltrati, batch CLI e daemon), con la
+  chiave ricavata dall'URL per i siti più comuni (vedi mvd.canonical)
+- dal worker della coda, subito prima di avviare il job
+- da yt-dlp stesso (download_archive), che per gli altri siti ricava
+  l'id dall'URL con l'estrattore prima dell'estrazione
+
+Ogni download registra inoltre (estrattore, id, titolo, file) in un
+piccolo manifest accanto ai file (ARCHIVE_CONFIG.MANIFEST_FILE_NAME, una
+riga JSON per download): il nome del file viene dal titolo e non contiene
+l'id, quindi senza manifest un archivio perso non sarebbe ricostruibile.
+Un archivio perso o una cartella riempita da altri strumenti si
+ricostruisce con:
+    python run.py archive rebuild [CARTELLA]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .canonical import canonicalize_url
+from .config import ARCHIVE_CONFIG, DEFAULT_DOWNLOAD_PATH
+from .utils import get_app_data_dir
+
+# (estrattore, id video)
+ArchiveKey = Tuple[str, str]
+
+SOURCE_DOWNLOAD = "download"
+SOURCE_REBUILD = "rebuild"
+SOURCE_IMPORT = "import"
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    extractor TEXT NOT NULL,
+    video_id  TEXT NOT NULL,
+    title     TEXT,
+    filepath  TEXT,
+    source    TEXT NOT NULL,
+    added_at  REAL NOT NULL,
+    PRIMARY KEY (extractor, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS archive_filepath ON archive (filepath);
+"""
+
+# "Titolo [dQw4w9WgXcQ].mp4": template di default di yt-dlp (solo con youtube_ids)
+_FILENAME_ID = re.compile(r"\[([0-9A-Za-z_-]{11})\]\.[0-9A-Za-z]+$")
+_INFO_JSON_SUFFIX = ".info.json"
+_SKIPPED_SUFFIXES = (".part", ".ytdl", ".tmp")
+
+# Voce ricavata da un file: (estrattore, id, titolo, file)
+_Entry = Tuple[str, str, Optional[str], Optional[str]]
+
+_manifest_lock = threading.Lock()
+
+
+def archive_key_for_url(url: str) -> Optional[ArchiveKey]:
+    """
+    Chiave d'archivio ricavata dal solo URL (nessun accesso alla rete).
+
+    Returns:
+        (estrattore, id) oppure None se il sito non è riconosciuto
+
+    Examples:
+        >>> archive_key_for_url("https://youtu.be/dQw4w9WgXcQ?t=42")
+        ('youtube', 'dQw4w9WgXcQ')
+        >>> archive_key_for_url("https://vimeo.com/76979871")
+        ('vimeo', '76979871')
+        >>> archive_key_for_url("https://example.com/video.mp4") is None
+        True
+    """
+    canonical = canonicalize_url(url)
+    if canonical.extractor and canonical.video_id:
+        return canonical.extractor, canonical.video_id
+    return None
+
+
+def default_db_path() -> str:
+    """Percorso del database nella cartella dati dell'applicazione."""
+    return os.path.join(get_app_data_dir(), ARCHIVE_CONFIG.DB_FILE_NAME)
+
+
+# ============================================================================
+# BLOOM FILTER
+# ============================================================================
+
+class BloomFilter:
+    """
+    Bloom filter su bytearray (nessun falso negativo).
+
+    Args:
+        capacity: Elementi previsti
+        error_rate: Probabilità di falso positivo alla capacità prevista
+
+    Examples:
+        >>> bloom = BloomFilter(1000)
+        >>> bloom.add("youtube dQw4w9WgXcQ")
+        >>> "youtube dQw4w9WgXcQ" in bloom
+        True
+        >>> "youtube aaaaaaaaaaa" in bloom
+        False
+    """
+
+    def __init__(self, capacity: int, error_rate: float = ARCHIVE_CONFIG.BLOOM_ERROR_RATE) -> None:
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Double hashing (Kirsch-Mitzenmacher) da un solo digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def _bloom_key(extractor: str, video_id: str) -> str:
+    return f"{extractor} {video_id}"
+
+
+# ============================================================================
+# ARCHIVIO
+# ============================================================================
+
+class DownloadArchive:
+    """
+    Archivio dei video scaricati, condiviso tra GUI e worker (thread-safe).
+
+    Args:
+        path: File del database (":memory:" per i test)
+
+    Examples:
+        >>> archive = DownloadArchive(":memory:")
+        >>> archive.contains_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        False
+        >>> archive.add("youtube", "dQw4w9WgXcQ", title="Video")
+        >>> archive.contains_url("https://youtu.be/dQw4w9WgXcQ")
+        True
+        >>> len(archive)
+        1
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=ARCHIVE_CONFIG.BUSY_TIMEOUT,
+            check_same_thread=False,
+            isolation_level=None,  # transazioni esplicite
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._count = 0
+        self._bloom = BloomFilter(ARCHIVE_CONFIG.BLOOM_CAPACITY)
+        self._load_bloom()
+
+    @classmethod
+    def open_default(cls) -> Optional["DownloadArchive"]:
+        """
+        Apre l'archivio nella cartella dati dell'applicazione.
+
+        Returns:
+            None se disattivato da config o se il database non è utilizzabile
+            (i download funzionano comunque, senza controllo dei duplicati)
+        """
+        if not ARCHIVE_CONFIG.ENABLED:
+            return None
+        path = default_db_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return cls(path)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Download archive not available ({path}): {e}")
+            return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _load_bloom(self) -> None:
+        """Ricostruisce il bloom filter dal database (all'apertura, dopo rebuild o crescita)."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+            capacity = max(ARCHIVE_CONFIG.BLOOM_CAPACITY, count * 2)
+            bloom = BloomFilter(capacity)
+            for extractor, video_id in self._conn.execute("SELECT extractor, video_id FROM archive"):
+                bloom.add(_bloom_key(extractor, video_id))
+            self._bloom = bloom
+            self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ------------------------------------------------------------------
+    # Letture
+    # ------------------------------------------------------------------
+
+    def contains(self, extractor: str, video_id: str) -> bool:
+        """True se il video è già stato scaricato."""
+        if _bloom_key(extractor, video_id) not in self._bloom:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM archive WHERE extractor = ? AND video_id = ?", (extractor, video_id)
+            ).fetchone()
+        return row is not None
+
+    def contains_url(self, url: str) -> bool:
+        """True se l'URL punta a un video già scaricato (solo siti riconosciuti dall'URL)."""
+        key = archive_key_for_url(url)
+        return key is not None and self.contains(*key)
+
+    def stats(self) -> Dict[str, int]:
+        """Numero di voci per estrattore."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT extractor, COUNT(*) FROM archive GROUP BY extractor ORDER BY 2 DESC"
+            ).fetchall()
+        return dict(rows)
+
+    def get(self, extractor: str, video_id: str) -> Optional[Dict[str, Any]]:
+        """Voce d'archivio (titolo, file, origine, data) oppure None."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT extractor, video_id, title, filepath, source, added_at FROM archive "
+                "WHERE extractor = ? AND video_id = ?", (extractor, video_id)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip((col[0] for col in cursor.description), row))
+
+    # ------------------------------------------------------------------
+    # Scritture
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        extractor: str,
+        video_id: str,
+        title: Optional[str] = None,
+        filepath: Optional[str] = None,
+        source: str = SOURCE_DOWNLOAD,
+    ) -> None:
+        """Registra un video scaricato (titolo e file aggiornati se già presente)."""
+        self.add_many([(extractor, video_id, title, filepath)], source=source)
+
+    def record_download(self, extractor: str, video_id: str, title: Optional[str], filepath: str) -> None:
+        """Registra un download completato nell'archivio e nel manifest della sua cartella."""
+        self.add(extractor, video_id, title=title, filepath=filepath)
+        append_manifest(filepath, extractor, video_id, title)
+
+    def add_many(
+        self,
+        entries: Iterable[_Entry],
+        source: str = SOURCE_DOWNLOAD,
+    ) -> int:
+        """
+        Registra più video in una transazione.
+
+        Args:
+            entries: (estrattore, id, titolo, file)
+
+        Returns:
+            Numero di voci nuove
+        """
+        now = time.time()
+        rows = [(extractor, video_id, title, filepath, source, now) for extractor, video_id, title, filepath in entries]
+        if not rows:
+            return 0
+
+        with self._lock:
+            try:
+                before = self._conn.total_changes
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT INTO archive (extractor, video_id, title, filepath, source, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (extractor, video_id) DO NOTHING",
+                    rows,
+                )
+                added = self._conn.total_changes - before
+                # Titolo/file noti solo dopo il download: completano la voce esistente
+                self._conn.executemany(
+                    "UPDATE archive SET title = COALESCE(?, title), filepath = COALESCE(?, filepath) "
+                    "WHERE extractor = ? AND video_id = ? AND (? IS NOT NULL OR ? IS NOT NULL)",
+                    [(r[2], r[3], r[0], r[1], r[2], r[3]) for r in rows],
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                logging.warning(f"Download archive write failed: {e}")
+                try:
+                    self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                return 0
+
+            for extractor, video_id, *_ in rows:
+                self._bloom.add(_bloom_key(extractor, video_id))
+            self._count += added
+            grow = self._count > self._bloom.capacity
+
+        if grow:
+            self._load_bloom()
+        return added
+
+    def remove(self, keys: Iterable[ArchiveKey]) -> None:
+        """Elimina voci (il video potrà essere scaricato di nuovo)."""
+        keys = list(keys)
+        if not keys:
+            return
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany("DELETE FROM archive WHERE extractor = ? AND video_id = ?", keys)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                logging.warning(f"Download archive write failed: {e}")
+                try:
+                    self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+        # Il bloom filter non supporta rimozioni: va ricostruito
+        self._load_bloom()
+
+    # ------------------------------------------------------------------
+    # Ricostruzione da cartella
+    # ------------------------------------------------------------------
+
+    def rebuild(self, directory: str, prune_missing: bool = True, youtube_ids: bool = False) -> Dict[str, int]:
+        """
+        Allinea l'archivio ai file presenti in una cartella.
+
+        Aggiunge i video riconoscibili dai file: manifest scritti dai
+        download dell'applicazione (solo le voci il cui file esiste ancora)
+        e .info.json di yt-dlp. Con prune_missing elimina le voci con un
+        file in quella cartella che non esiste più.
+
+        Args:
+            directory: Cartella da esaminare (ricorsivamente)
+            prune_missing: Elimina le voci con file scomparsi
+            youtube_ids: Tratta "Titolo [id].ext" con id di 11 caratteri come
+                video YouTube (template di default di yt-dlp). Solo per
+                cartelle di cui si sa che contengono video YouTube: il nome
+                da solo non dice da che sito viene il file.
+
+        Returns:
+            Conteggi: file esaminati, voci aggiunte, voci eliminate
+        """
+        directory = os.path.abspath(directory)
+        scanned = 0
+        found: List[_Entry] = []
+        for path in _walk_files(directory):
+            scanned += 1
+            found.extend(_entries_from_file(path, youtube_ids))
+
+        missing: List[ArchiveKey] = []
+        if prune_missing:
+            prefix = directory.rstrip(os.sep) + os.sep
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT extractor, video_id, filepath FROM archive WHERE filepath >= ? AND filepath < ?",
+                    (prefix, prefix[:-1] + chr(ord(os.sep) + 1)),
+                ).fetchall()
+            missing = [(extractor, video_id) for extractor, video_id, filepath in rows if not os.path.exists(filepath)]
+
+        self.remove(missing)
+        added = self.add_many(found, source=SOURCE_REBUILD)
+        logging.info(f"Archive rebuilt from {directory}: {scanned} files, {added} added, {len(missing)} removed")
+        return {"scanned": scanned, "added": added, "removed": len(missing)}
+
+    def import_ytdlp_archive(self, path: str) -> int:
+        """Importa un file --download-archive di yt-dlp (righe "estrattore id")."""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                extractor, _, video_id = line.strip().partition(" ")
+                if extractor and video_id:
+                    entries.append((extractor, video_id, None, None))
+        return self.add_many(entries, source=SOURCE_IMPORT)
+
+    # ------------------------------------------------------------------
+    # yt-dlp
+    # ------------------------------------------------------------------
+
+    def ydl_archive(self) -> "YDLArchiveView":
+        """Oggetto da passare come download_archive nelle opzioni di yt-dlp."""
+        return YDLArchiveView(self)
+
+
+class YDLArchiveView:
+    """
+    Vista dell'archivio con l'interfaccia attesa da yt-dlp (in/add su
+    stringhe "estrattore id"), per un singolo download.
+
+    hits raccoglie le chiavi che yt-dlp ha trovato già archiviate.
+    """
+
+    def __init__(self, archive: DownloadArchive) -> None:
+        self._archive = archive
+        self.hits: List[str] = []
+
+    def __bool__(self) -> bool:
+        # yt-dlp non consulta un archivio vuoto
+        return len(self._archive) > 0
+
+    def __contains__(self, archive_id: str) -> bool:
+        extractor, _, video_id = archive_id.partition(" ")
+        found = self._archive.contains(extractor, video_id)
+        if found:
+            self.hits.append(archive_id)
+        return found
+
+    def add(self, archive_id: str) -> None:
+        extractor, _, video_id = archive_id.partition(" ")
+        self._archive.add(extractor, video_id)
+
+
+# ============================================================================
+# SCANSIONE FILE
+# ============================================================================
+
+def _walk_files(directory: str) -> Iterator[str]:
+    """File sotto directory (ricorsivo, con os.scandir)."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and not entry.name.endswith(_SKIPPED_SUFFIXES):
+                        yield entry.path
+        except OSError as e:
+            logging.warning(f"Cannot scan {current}: {e}")
+
+
+def append_manifest(filepath: str, extractor: str, video_id: str, title: Optional[str] = None) -> None:
+    """
+    Aggiunge un download al manifest della cartella del file.
+
+    Errori di scrittura (cartella di sola lettura, disco pieno) vengono
+    solo loggati: il download è comunque riuscito.
+    """
+    directory, name = os.path.split(os.path.abspath(filepath))
+    line = json.dumps({"extractor": extractor, "id": video_id, "title": title, "file": name}, ensure_ascii=False)
+    manifest = os.path.join(directory, ARCHIVE_CONFIG.MANIFEST_FILE_NAME)
+    try:
+        with _manifest_lock, open(manifest, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logging.warning(f"Cannot update archive manifest {manifest}: {e}")
+
+
+def _entries_from_manifest(path: str) -> List[_Entry]:
+    """Voci di un manifest i cui file esistono ancora (righe illeggibili ignorate)."""
+    directory = os.path.dirname(path)
+    entries: List[_Entry] = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    filepath = os.path.join(directory, record["file"])
+                    extractor, video_id = str(record["extractor"]), str(record["id"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if extractor and video_id and os.path.exists(filepath):
+                    entries.append((extractor, video_id, record.get("title"), filepath))
+    except OSError as e:
+        logging.warning(f"Cannot read archive manifest {path}: {e}")
+    return entries
+
+
+def _entries_from_file(path: str, youtube_ids: bool = False) -> List[_Entry]:
+    """Voci (estrattore, id, titolo, file) ricavate da un file, se possibile."""
+    name = os.path.basename(path)
+
+    if name == ARCHIVE_CONFIG.MANIFEST_FILE_NAME:
+        return _entries_from_manifest(path)
+
+    if name.endswith(_INFO_JSON_SUFFIX):
+        try:
+            with open(path, encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return []
+        extractor = info.get("extractor_key") or info.get("ie_key")
+        if not extractor or not info.get("id"):
+            return []
+        filepath = info.get("filepath") or info.get("_filename")
+        return [(extractor.lower(), str(info["id"]), info.get("title"), filepath)]
+
+    match = _FILENAME_ID.search(name) if youtube_ids else None
+    if match:
+        return [("youtube", match.group(1), None, path)]
+    return []
+
+
+# ============================================================================
+# ENTRY POINT
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Gestione dell'archivio da riga di comando.
+
+    Examples:
+        python run.py archive rebuild /srv/media
+        python run.py archive rebuild --youtube-ids ~/yt-dlp-downloads
+        python run.py archive import archive.txt
+        python run.py archive stats
+    """
+    from .utils import setup_logger
+
+    parser = argparse.ArgumentParser(prog="mvd archive", description="Archivio dei download completati")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="allinea l'archivio ai file di una cartella")
+    rebuild.add_argument("directory", nargs="?", default=DEFAULT_DOWNLOAD_PATH)
+    rebuild.add_argument("--keep-missing", action="store_true",
+                         help="non eliminare le voci con file non più presenti")
+    rebuild.add_argument("--youtube-ids", action="store_true",
+                         help='la cartella contiene solo video YouTube con nomi "Titolo [id].ext"')
+    import_ = commands.add_parser("import", help="importa un file --download-archive di yt-dlp")
+    import_.add_argument("file")
+    commands.add_parser("stats", help="numero di voci per estrattore")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild" and not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+
+    setup_logger()
+    path = default_db_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        archive = DownloadArchive(path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Cannot open download archive {path}: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.command == "rebuild":
+            result = archive.rebuild(
+                args.directory, prune_missing=not args.keep_missing, youtube_ids=args.youtube_ids
+            )
+        elif args.command == "import":
+            try:
+                result = {"added": archive.import_ytdlp_archive(args.file)}
+            except OSError as e:
+                parser.error(f"cannot read {args.file}: {e}")
+        else:
+            result = {"total": len(archive), "extractors": archive.stats()}
+    except sqlite3.Error as e:
+        print(f"Download archive error ({path}): {e}", file=sys.stderr)
+        return 1
+    finally:
+        archive.close()
+
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,579 @@
+"""
+Limite di banda per Modern Video Downloader (token bucket).
+
+Con più download in parallelo e CONCURRENT_FRAGMENTS frammenti per job la
+linea si satura, e l'opzione ratelimit di yt-dlp vale per un singolo
+download e non cambia a download avviato. BandwidthGovernor applica tre
+livelli di token bucket condivisi da tutti i worker del processo:
+- totale: somma di tutti i download, con limiti diversi per fascia oraria
+  (BandwidthSchedule)
+- per host: stesso sito (host canonico dell'URL, vedi mvd.host_health)
+- per job
+
+Il consumo avviene nel progress hook di download_video: a ogni blocco o
+frammento scritto il thread di yt-dlp paga i byte ricevuti in tutti i
+bucket e, se uno è in debito, dorme finché la banda non li ha coperti (il
+server rallenta di conseguenza tramite il controllo di flusso TCP).
+L'attesa è spezzata in tratti di SLEEP_SLICE secondi: cancellazione,
+pausa e cambi dei limiti (configure(), PATCH /bandwidth del daemon, cambio
+di fascia oraria) hanno effetto sui download già in corso, senza riavviarli.
+
+Senza limiti configurati il progress hook non acquisisce alcun lock.
+
+Examples:
+    >>> parse_rate("2.5M")
+    2621440
+    >>> schedule = parse_schedule("mon-fri 09:00-18:00=2M; 18:00-09:00=0")
+    >>> schedule.rate_at(datetime(2026, 3, 2, 10, 30))  # lunedì
+    (True, 2097152)
+    >>> BANDWIDTH.configure(total=parse_rate("5M"), per_job=parse_rate("1M"), schedule=schedule)  # doctest: +SKIP
+"""
+
+import argparse
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from .config import BANDWIDTH_CONFIG
+from .exceptions import ValidationError
+
+# Valore di default di configure(): lascia il limite invariato
+_UNCHANGED: Any = object()
+
+_RATE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+_RATE = re.compile(r"^(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?$")
+_NO_LIMIT = frozenset({"", "0", "none", "off", "unlimited"})
+
+_DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_SCHEDULE_RULE = re.compile(
+    r"^(?:(?P<days>[a-z,\-]+)\s+)?(?P<start>\d{1,2}:\d{2})\s*-\s*(?P<end>\d{1,2}:\d{2})\s*=\s*(?P<rate>\S+)$"
+)
+
+
+def parse_rate(value: Union[str, int, float, None]) -> Optional[int]:
+    """
+    Converte un limite di banda in byte/s (unità binarie, come yt-dlp).
+
+    Args:
+        value: Numero di byte/s oppure stringa come "500K", "2.5M", "1G",
+            "800KiB/s"; 0, "off" e "unlimited" = nessun limite
+
+    Returns:
+        Byte/s, oppure None se senza limite
+
+    Raises:
+        ValidationError: Valore non riconosciuto o negativo
+
+    Examples:
+        >>> parse_rate("500K"), parse_rate("off"), parse_rate(1024)
+        (512000, None, 1024)
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValidationError(f"Invalid bandwidth limit: {value!r}")
+    if isinstance(value, (int, float)):
+        if value < 0:
+            raise ValidationError(f"Invalid bandwidth limit: {value!r}")
+        return int(value) or None
+
+    text = value.strip().lower()
+    if text in _NO_LIMIT:
+        return None
+    match = _RATE.match(text)
+    if match is None:
+        raise ValidationError(f"Invalid bandwidth limit: {value!r} (e.g. 500K, 2M, 1.5G)")
+    return int(float(match.group(1)) * _RATE_UNITS[match.group(2)]) or None
+
+
+def parse_limits(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Argomenti di BandwidthGovernor.configure() da un oggetto JSON.
+
+    Args:
+        spec: Campi opzionali "total", "per_host", "per_job" (come
+            parse_rate; null = nessun limite) e "schedule" (come
+            parse_schedule; null o "" = nessuna fascia)
+
+    Raises:
+        ValidationError: Campo sconosciuto o valore non valido
+
+    Examples:
+        >>> parse_limits({"total": "4M", "per_job": None})
+        {'total': 4194304, 'per_job': None}
+    """
+    unknown = set(spec) - {"total", "per_host", "per_job", "schedule"}
+    if unknown:
+        raise ValidationError(f"Unknown bandwidth fields: {', '.join(sorted(unknown))}")
+
+    limits: Dict[str, Any] = {}
+    for name in ("total", "per_host", "per_job"):
+        if name in spec:
+            value = spec[name]
+            if value is not None and not isinstance(value, (str, int, float)):
+                raise ValidationError(f"{name} must be a number of bytes/s or a string like \"2M\"")
+            limits[name] = parse_rate(value)
+    if "schedule" in spec:
+        schedule = spec["schedule"]
+        if schedule is not None and not isinstance(schedule, str):
+            raise ValidationError("schedule must be a string")
+        limits["schedule"] = parse_schedule(schedule or "")
+    return limits
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opzioni --limit-rate & co. per le entry point a riga di comando."""
+    def rate(value: str) -> Optional[int]:
+        try:
+            return parse_rate(value)
+        except ValidationError as e:
+            raise argparse.ArgumentTypeError(str(e)) from e
+
+    def schedule(value: str) -> BandwidthSchedule:
+        try:
+            return parse_schedule(value)
+        except ValidationError as e:
+            raise argparse.ArgumentTypeError(str(e)) from e
+
+    group = parser.add_argument_group("banda", "limiti in byte/s, es. 500K, 2M (0 = nessun limite)")
+    group.add_argument("--limit-rate", type=rate, default=_UNCHANGED, metavar="RATE",
+                       help="limite totale di tutti i download")
+    group.add_argument("--host-limit-rate", type=rate, default=_UNCHANGED, metavar="RATE",
+                       help="limite per sito")
+    group.add_argument("--job-limit-rate", type=rate, default=_UNCHANGED, metavar="RATE",
+                       help="limite per download")
+    group.add_argument("--bandwidth-schedule", type=schedule, default=_UNCHANGED, metavar="RULES",
+                       help='limite totale per fascia oraria, es. "mon-fri 09:00-18:00=2M; 18:00-09:00=0"')
+
+
+def configure_from_args(args: argparse.Namespace, governor: Optional["BandwidthGovernor"] = None) -> None:
+    """Applica a BANDWIDTH (o a governor) le opzioni di add_arguments() passate."""
+    limits = {
+        name: value
+        for name, value in (
+            ("total", args.limit_rate),
+            ("per_host", args.host_limit_rate),
+            ("per_job", args.job_limit_rate),
+            ("schedule", args.bandwidth_schedule),
+        )
+        if value is not _UNCHANGED
+    }
+    if limits:
+        (governor or BANDWIDTH).configure(**limits)
+
+
+# ============================================================================
+# FASCE ORARIE
+# ============================================================================
+
+@dataclass(frozen=True)
+class ScheduleRule:
+    """
+    Limite totale in una fascia oraria.
+
+    Una fascia con end <= start passa la mezzanotte: la parte dopo la
+    mezzanotte appartiene al giorno in cui la fascia inizia.
+    """
+
+    start: int  # Minuti dalla mezzanotte
+    end: int  # Minuti dalla mezzanotte (1440 = 24:00)
+    rate: Optional[int]  # Byte/s (None = nessun limite)
+    days: FrozenSet[int] = frozenset(range(7))  # 0 = lunedì
+
+    def matches(self, when: datetime) -> bool:
+        minute = when.hour * 60 + when.minute
+        day = when.weekday()
+        if self.start < self.end:
+            return day in self.days and self.start <= minute < self.end
+        if minute >= self.start or self.start == self.end:
+            return day in self.days
+        return minute < self.end and (day - 1) % 7 in self.days
+
+
+class BandwidthSchedule:
+    """
+    Regole per fascia oraria; vale la prima che corrisponde.
+
+    Fuori da tutte le fasce vale il limite totale configurato.
+    """
+
+    def __init__(self, rules: Iterable[ScheduleRule], spec: str = "") -> None:
+        self.rules: Tuple[ScheduleRule, ...] = tuple(rules)
+        self.spec = spec
+
+    def rate_at(self, when: datetime) -> Tuple[bool, Optional[int]]:
+        """
+        Limite in vigore in un istante.
+
+        Returns:
+            (True, limite) se una fascia corrisponde, altrimenti (False, None)
+        """
+        for rule in self.rules:
+            if rule.matches(when):
+                return True, rule.rate
+        return False, None
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def __str__(self) -> str:
+        return self.spec
+
+
+def _parse_minutes(text: str, spec: str) -> int:
+    hours, minutes = (int(part) for part in text.split(":"))
+    if minutes >= 60 or hours > 24 or (hours == 24 and minutes):
+        raise ValidationError(f"Invalid time {text!r} in bandwidth schedule {spec!r}")
+    return hours * 60 + minutes
+
+
+def _parse_days(text: str, spec: str) -> FrozenSet[int]:
+    days = set()
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        if first not in _DAYS or (last and last not in _DAYS):
+            raise ValidationError(f"Invalid day {part!r} in bandwidth schedule {spec!r} (mon..sun)")
+        start = _DAYS.index(first)
+        end = _DAYS.index(last) if last else start
+        days.update((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    return frozenset(days)
+
+
+def parse_schedule(spec: str) -> BandwidthSchedule:
+    """
+    Legge le fasce orarie: regole separate da ";" nella forma
+    "[giorni ]HH:MM-HH:MM=LIMITE".
+
+    Args:
+        spec: Es. "mon-fri 09:00-18:00=2M; sat,sun 10:00-13:00=5M";
+            LIMITE come parse_rate (0 = nessun limite in quella fascia)
+
+    Raises:
+        ValidationError: Regola non valida
+
+    Examples:
+        >>> rule = parse_schedule("fri-mon 22:00-06:00=1M").rules[0]
+        >>> rule.start, rule.end, sorted(rule.days)
+        (1320, 360, [0, 4, 5, 6])
+    """
+    rules: List[ScheduleRule] = []
+    for chunk in spec.split(";"):
+        chunk = chunk.strip().lower()
+        if not chunk:
+            continue
+        match = _SCHEDULE_RULE.match(chunk)
+        if match is None:
+            raise ValidationError(f"Invalid bandwidth schedule rule {chunk!r} (e.g. mon-fri 09:00-18:00=2M)")
+        rules.append(ScheduleRule(
+            start=_parse_minutes(match.group("start"), spec),
+            end=_parse_minutes(match.group("end"), spec),
+            rate=parse_rate(match.group("rate")),
+            days=_parse_days(match.group("days"), spec) if match.group("days") else frozenset(range(7)),
+        ))
+    return BandwidthSchedule(rules, spec.strip())
+
+
+# ============================================================================
+# TOKEN BUCKET
+# ============================================================================
+
+class TokenBucket:
+    """
+    Token bucket in byte, con debito (non thread-safe: lo protegge il governor).
+
+    consume() non blocca mai: i byte sono già arrivati quando il progress
+    hook li riporta, quindi il bucket va in negativo e wait_time() dice
+    quanto dormire perché la media torni entro rate.
+    """
+
+    def __init__(self, rate: Optional[int], clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._updated = clock()
+        self.rate: Optional[int] = None
+        self.capacity = 0.0
+        self.tokens = 0.0
+        self.set_rate(rate)
+
+    def _refill(self, now: float) -> None:
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: Optional[int]) -> None:
+        """Cambia il limite; il debito accumulato si ripaga alla nuova velocità."""
+        self._refill(self._clock())
+        was_limited = self.rate is not None
+        self.rate = rate or None
+        if self.rate is None:
+            self.capacity = self.tokens = 0.0
+            return
+        self.capacity = max(self.rate * BANDWIDTH_CONFIG.BURST_SECONDS, float(BANDWIDTH_CONFIG.MIN_BURST))
+        self.tokens = min(self.tokens, self.capacity) if was_limited else self.capacity
+
+    def consume(self, nbytes: int, now: float) -> float:
+        """Toglie nbytes dal bucket e ritorna wait_time()."""
+        self._refill(now)
+        if self.rate is None:
+            return 0.0
+        self.tokens -= nbytes
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def wait_time(self, now: float) -> float:
+        """Secondi prima che il debito sia ripagato (0 se il bucket è in attivo)."""
+        self._refill(now)
+        if self.rate is None or self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+# ============================================================================
+# GOVERNOR
+# ============================================================================
+
+class BandwidthGovernor:
+    """
+    Limiti di banda condivisi da tutti i download del processo.
+
+    Args:
+        total: Byte/s di tutti i download insieme (None = nessun limite)
+        per_host: Byte/s per host
+        per_job: Byte/s per job
+        schedule: Limiti totali per fascia oraria (prevalgono su total
+            dentro le loro fasce)
+        clock: Orologio monotono (per i test)
+        now: Ora locale per le fasce orarie (per i test)
+    """
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        per_host: Optional[int] = None,
+        per_job: Optional[int] = None,
+        schedule: Optional[BandwidthSchedule] = None,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self._clock = clock
+        self._now = now
+        self._lock = threading.Lock()
+        self._total_rate = total or None
+        self._host_rate = per_host or None
+        self._job_rate = per_job or None
+        self._schedule = schedule or None
+        self._total = TokenBucket(None, clock)
+        self._hosts: Dict[str, TokenBucket] = {}
+        self._jobs: Dict[str, TokenBucket] = {}
+        self._schedule_checked = 0.0
+        self._throttled = 0.0  # Secondi di attesa imposti (statistiche)
+        self.enabled = False
+        with self._lock:
+            self._apply()
+
+    @classmethod
+    def from_config(cls) -> "BandwidthGovernor":
+        """Governor con i limiti di BANDWIDTH_CONFIG e delle variabili d'ambiente."""
+        try:
+            total = parse_rate(os.getenv(BANDWIDTH_CONFIG.RATE_ENV) or BANDWIDTH_CONFIG.TOTAL_RATE)
+            schedule = parse_schedule(os.getenv(BANDWIDTH_CONFIG.SCHEDULE_ENV) or BANDWIDTH_CONFIG.SCHEDULE)
+        except ValidationError as e:
+            logging.warning(f"Ignoring bandwidth settings from environment: {e}")
+            total, schedule = parse_rate(BANDWIDTH_CONFIG.TOTAL_RATE), parse_schedule(BANDWIDTH_CONFIG.SCHEDULE)
+        return cls(
+            total=total,
+            per_host=BANDWIDTH_CONFIG.HOST_RATE,
+            per_job=BANDWIDTH_CONFIG.JOB_RATE,
+            schedule=schedule,
+        )
+
+    # ------------------------------------------------------------------
+    # Configurazione
+    # ------------------------------------------------------------------
+
+    def configure(
+        self,
+        total: Optional[int] = _UNCHANGED,
+        per_host: Optional[int] = _UNCHANGED,
+        per_job: Optional[int] = _UNCHANGED,
+        schedule: Optional[BandwidthSchedule] = _UNCHANGED,
+    ) -> None:
+        """
+        Cambia i limiti a runtime (anche per i download in corso).
+
+        Gli argomenti non passati restano invariati; None = nessun limite.
+        """
+        with self._lock:
+            if total is not _UNCHANGED:
+                self._total_rate = total or None
+            if per_host is not _UNCHANGED:
+                self._host_rate = per_host or None
+            if per_job is not _UNCHANGED:
+                self._job_rate = per_job or None
+            if schedule is not _UNCHANGED:
+                self._schedule = schedule or None
+            self._apply()
+        logging.info(f"Bandwidth limits: {self.snapshot()}")
+
+    def _apply(self) -> None:
+        """Aggiorna i bucket ai limiti e alla fascia oraria correnti (con il lock)."""
+        total = self._total_rate
+        if self._schedule is not None:
+            matched, rate = self._schedule.rate_at(self._now())
+            if matched:
+                total = rate
+        if total != self._total.rate:
+            self._total.set_rate(total)
+            logging.info(f"Total bandwidth limit: {_format_rate(total)}")
+        for bucket in self._hosts.values():
+            bucket.set_rate(self._host_rate)
+        for bucket in self._jobs.values():
+            bucket.set_rate(self._job_rate)
+        self._schedule_checked = self._clock()
+        self.enabled = bool(self._total_rate or self._host_rate or self._job_rate or self._schedule)
+
+    # ------------------------------------------------------------------
+    # Consumo
+    # ------------------------------------------------------------------
+
+    def _check_schedule(self, now: float) -> None:
+        """Rivaluta la fascia oraria ogni SCHEDULE_CHECK_INTERVAL secondi (con il lock)."""
+        if self._schedule is not None and now - self._schedule_checked >= BANDWIDTH_CONFIG.SCHEDULE_CHECK_INTERVAL:
+            self._apply()
+
+    def _wait(self, job: str, host: str) -> float:
+        """Attesa richiesta dai bucket del job (con il lock)."""
+        now = self._clock()
+        self._check_schedule(now)
+        wait = self._total.wait_time(now)
+        for bucket in (self._hosts.get(host), self._jobs.get(job)):
+            if bucket is not None:
+                wait = max(wait, bucket.wait_time(now))
+        return wait
+
+    def throttle(self, job: str, host: str, nbytes: int, check: Optional[Callable[[], None]] = None) -> float:
+        """
+        Paga nbytes già ricevuti e dorme finché i limiti lo richiedono.
+
+        Args:
+            job: Identificativo del job (bucket per job)
+            host: Host del download (bucket per host)
+            nbytes: Byte ricevuti dall'ultima chiamata
+            check: Chiamato tra un tratto di attesa e l'altro (es.
+                CancelToken.check, che interrompe il download sollevando)
+
+        Returns:
+            Secondi di attesa
+        """
+        if not self.enabled or nbytes <= 0:
+            return 0.0
+
+        with self._lock:
+            now = self._clock()
+            self._check_schedule(now)
+            wait = self._total.consume(nbytes, now)
+            if self._host_rate is not None or host in self._hosts:
+                bucket = self._hosts.get(host)
+                if bucket is None:
+                    bucket = self._hosts[host] = TokenBucket(self._host_rate, self._clock)
+                wait = max(wait, bucket.consume(nbytes, now))
+            if self._job_rate is not None or job in self._jobs:
+                bucket = self._jobs.get(job)
+                if bucket is None:
+                    bucket = self._jobs[job] = TokenBucket(self._job_rate, self._clock)
+                wait = max(wait, bucket.consume(nbytes, now))
+        if wait <= 0:
+            return 0.0
+
+        started = time.monotonic()
+        while wait > 0:
+            if check is not None:
+                check()
+            time.sleep(min(wait, BANDWIDTH_CONFIG.SLEEP_SLICE))
+            with self._lock:
+                wait = self._wait(job, host)
+
+        slept = time.monotonic() - started
+        if slept:
+            with self._lock:
+                self._throttled += slept
+        return slept
+
+    def open_job(self, job: str, host: str) -> "JobBandwidth":
+        """Contatore dei byte di un job da collegare al suo progress hook."""
+        return JobBandwidth(self, job, host)
+
+    def release_job(self, job: str) -> None:
+        """Scarta il bucket di un job concluso."""
+        with self._lock:
+            self._jobs.pop(job, None)
+
+    # ------------------------------------------------------------------
+    # Statistiche
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Limiti in vigore (es. per GET /bandwidth del daemon)."""
+        with self._lock:
+            return {
+                "total": self._total.rate,
+                "total_configured": self._total_rate,
+                "per_host": self._host_rate,
+                "per_job": self._job_rate,
+                "schedule": str(self._schedule) if self._schedule is not None else None,
+                "jobs": len(self._jobs),
+                "throttled_seconds": round(self._throttled, 1),
+            }
+
+
+def _format_rate(rate: Optional[int]) -> str:
+    return "unlimited" if rate is None else f"{rate / 1024:.0f} KiB/s"
+
+
+class JobBandwidth:
+    """
+    Byte ricevuti da un job, dai progress hook di yt-dlp al governor.
+
+    downloaded_bytes è cumulativo per file: si paga la differenza dall'ultimo
+    valore visto. Il primo valore di un file (o il primo dopo l'attivazione
+    dei limiti) non si paga perché comprende byte già ricevuti, ad esempio
+    quelli ripresi dal .part; con frammenti concorrenti un valore più basso
+    del massimo visto arriva in ritardo e viene ignorato.
+    """
+
+    def __init__(self, governor: BandwidthGovernor, job: str, host: str) -> None:
+        self._governor = governor
+        self.job = job
+        self.host = host
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def on_progress(self, d: Dict[str, Any], check: Optional[Callable[[], None]] = None) -> None:
+        """Da chiamare dal progress hook con status "downloading"."""
+        if not self._governor.enabled:
+            # Nessun limite: al prossimo limite si riparte dal valore corrente
+            if self._seen:
+                self._seen.clear()
+            return
+        downloaded = d.get("downloaded_bytes")
+        if downloaded is None or self._closed:
+            return
+        filename = d.get("filename") or ""
+        with self._lock:
+            previous = self._seen.get(filename)
+            if previous is not None and downloaded <= previous:
+                return
+            self._seen[filename] = downloaded
+        if previous is not None:
+            self._governor.throttle(self.job, self.host, downloaded - previous, check)
+
+    def close(self) -> None:
+        self._closed = True
+        self._governor.release_job(self.job)
+
+
+BANDWIDTH = BandwidthGovernor.from_config()
@@ -0,0 +1,274 @@
+"""
+Cancellazione e pausa dei download in ogni fase.
+
+yt-dlp controlla la cancellazione solo dove lo interroghiamo noi
+(progress hook), quindi un annullamento durante extract_info o durante un
+merge/transcodifica FFmpeg aspetterebbe la fine della fase. Qui:
+- CancelToken raccoglie gli eventi cancel/pausa di un job e i processi
+  figli avviati per quel job
+- install_process_hook() fa partire ogni processo di yt-dlp (FFmpeg) in
+  un proprio gruppo di processi e lo associa al token attivo nel thread,
+  così la cancellazione lo termina subito insieme ai suoi figli
+- PartialFiles tiene traccia dei file scritti dal job e, secondo
+  CANCELLATION_CONFIG.PARTIAL_POLICY, li elimina dopo un annullamento
+
+download_video esegue yt-dlp in un thread dedicato e aspetta il token:
+alla cancellazione ritorna entro POLL_INTERVAL, termina FFmpeg e lascia
+che il thread yt-dlp si chiuda da solo al prossimo checkpoint (o al
+timeout del socket), eliminando i file parziali quando li ha rilasciati.
+"""
+
+import contextvars
+import glob
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import List, Optional, Set
+
+from .config import CANCELLATION_CONFIG
+from .exceptions import DownloadCancelledError, DownloadPausedError
+
+# Token del job in esecuzione nel thread corrente (per il tracking dei processi)
+_active_token: contextvars.ContextVar[Optional["CancelToken"]] = contextvars.ContextVar(
+    "mvd_cancel_token", default=None
+)
+
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+# ============================================================================
+# TOKEN
+# ============================================================================
+
+class CancelToken:
+    """
+    Stato di cancellazione/pausa di un job, condiviso tra i thread.
+
+    Args:
+        cancel_event: Event di cancellazione (es. quello della coda, condiviso
+            da tutti i job di un'esecuzione); None = nuovo Event
+        pause_event: Event di pausa del singolo job; None = nuovo Event
+
+    Examples:
+        >>> token = CancelToken()
+        >>> token.check()
+        >>> token.cancel()
+        >>> token.check()
+        Traceback (most recent call last):
+            ...
+        mvd.exceptions.DownloadCancelledError: Download cancelled by user
+    """
+
+    def __init__(
+        self,
+        cancel_event: Optional[threading.Event] = None,
+        pause_event: Optional[threading.Event] = None,
+    ) -> None:
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.pause_event = pause_event if pause_event is not None else threading.Event()
+        self._processes: List[subprocess.Popen] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return self.pause_event.is_set()
+
+    @property
+    def requested(self) -> bool:
+        """True se è stata richiesta cancellazione o pausa."""
+        return self.cancel_event.is_set() or self.pause_event.is_set()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+        self.kill_processes()
+
+    def pause(self) -> None:
+        self.pause_event.set()
+        self.kill_processes()
+
+    def check(self) -> None:
+        """
+        Checkpoint: solleva se è stata richiesta cancellazione o pausa.
+
+        Raises:
+            DownloadCancelledError: Cancellazione (ha precedenza sulla pausa)
+            DownloadPausedError: Pausa
+        """
+        if self.cancel_event.is_set():
+            raise DownloadCancelledError("Download cancelled by user")
+        if self.pause_event.is_set():
+            raise DownloadPausedError("Download paused by user")
+
+    def wait(self, done: threading.Event, timeout: Optional[float] = None) -> bool:
+        """
+        Attende done oppure una richiesta di cancellazione/pausa.
+
+        Returns:
+            True se done è stato impostato
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = CANCELLATION_CONFIG.POLL_INTERVAL
+        while not done.wait(interval):
+            if self.requested:
+                return done.is_set()
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Processi figli
+    # ------------------------------------------------------------------
+
+    def register_process(self, proc: subprocess.Popen) -> None:
+        """Associa un processo al job (terminato subito se già annullato)."""
+        with self._lock:
+            self._processes = [p for p in self._processes if p.poll() is None]
+            self._processes.append(proc)
+        if self.requested:
+            self.kill_processes()
+
+    def kill_processes(self) -> None:
+        """Termina i processi del job con tutto il loro gruppo."""
+        with self._lock:
+            processes, self._processes = self._processes, []
+
+        for proc in processes:
+            if proc.poll() is not None:
+                continue
+            try:
+                if os.name == "nt":
+                    proc.kill()
+                else:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                logging.info(f"Killed child process {proc.pid} ({os.path.basename(str(proc.args[0]))})")
+            except (ProcessLookupError, PermissionError, OSError) as e:
+                logging.debug(f"Cannot kill process {proc.pid}: {e}")
+                try:
+                    proc.kill()
+                except OSError:
+                    pass
+
+
+def bind_token(token: CancelToken) -> contextvars.Token:
+    """Imposta il token attivo nel thread corrente (processi avviati da yt-dlp)."""
+    return _active_token.set(token)
+
+
+# ============================================================================
+# HOOK PROCESSI YT-DLP
+# ============================================================================
+
+def install_process_hook() -> None:
+    """
+    Registra i processi avviati da yt-dlp sul token attivo.
+
+    yt-dlp avvia FFmpeg (merge, conversione, downloader esterno) sempre
+    tramite yt_dlp.utils.Popen: il suo __init__ viene esteso una sola volta
+    per processo. Con un token attivo il figlio parte in una nuova sessione
+    (nuovo gruppo di processi, POSIX) o con CREATE_NEW_PROCESS_GROUP
+    (Windows), così può essere terminato insieme ai suoi figli.
+    """
+    global _hook_installed
+    with _hook_lock:
+        if _hook_installed:
+            return
+
+        from yt_dlp.utils import Popen
+
+        original_init = Popen.__init__
+
+        def __init__(self, *args, **kwargs):
+            token = _active_token.get()
+            if token is not None:
+                token.check()  # niente nuovi processi dopo una cancellazione
+                if os.name == "nt":
+                    kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+                else:
+                    kwargs.setdefault("start_new_session", True)
+            original_init(self, *args, **kwargs)
+            if token is not None:
+                token.register_process(self)
+
+        Popen.__init__ = __init__
+        _hook_installed = True
+
+
+# ============================================================================
+# FILE PARZIALI
+# ============================================================================
+
+class PartialFiles:
+    """
+    File scritti da un job, da eliminare se il job viene annullato.
+
+    Vengono registrati solo i file effettivamente scaricati in questa
+    esecuzione (progress hook "downloading") e gli output temporanei dei
+    post-processor: un file già presente e saltato da yt-dlp non viene
+    mai toccato.
+    """
+
+    def __init__(self) -> None:
+        self._downloads: Set[str] = set()
+        self._postprocessed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def add_download(self, filename: Optional[str]) -> None:
+        if filename:
+            with self._lock:
+                self._downloads.add(filename)
+
+    def add_postprocessed(self, filepath: Optional[str]) -> None:
+        if filepath:
+            with self._lock:
+                self._postprocessed.add(filepath)
+
+    def candidates(self) -> List[str]:
+        """Percorsi (esistenti) che un annullamento lascerebbe su disco."""
+        with self._lock:
+            downloads = set(self._downloads)
+            postprocessed = set(self._postprocessed)
+
+        paths: Set[str] = set()
+        for path in downloads:
+            paths.update((path, f"{path}.part", f"{path}.ytdl"))
+            paths.update(glob.glob(f"{glob.escape(path)}.part-Frag*"))
+        for path in postprocessed:
+            root, _ = os.path.splitext(path)
+            paths.update(glob.glob(f"{glob.escape(root)}.temp.*"))
+        return sorted(p for p in paths if os.path.isfile(p))
+
+    def cleanup(self, policy: Optional[str] = None) -> List[str]:
+        """
+        Applica la policy ai file parziali.
+
+        Args:
+            policy: "delete" elimina i file, "keep" li lascia (riprendibili
+                aggiungendo di nuovo lo stesso URL); None = quella di
+                CANCELLATION_CONFIG al momento della chiamata
+
+        Returns:
+            I file eliminati
+        """
+        if policy is None:
+            policy = CANCELLATION_CONFIG.PARTIAL_POLICY
+        if policy != "delete":
+            return []
+
+        removed = []
+        for path in self.candidates():
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                logging.warning(f"Cannot remove partial file {path}: {e}")
+        if removed:
+            logging.info(f"Removed {len(removed)} partial files after cancellation")
+        return removed
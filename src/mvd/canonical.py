@@ -0,0 +1,228 @@
+"""
+Forma canonica degli URL per Modern Video Downloader.
+
+Lo stesso video arriva con URL diversi: youtu.be/X, youtube.com/watch?v=X&t=30,
+m.youtube.com/watch?v=X&list=...&si=... Per riconoscerli senza accesso
+alla rete canonicalize_url:
+- normalizza schema e host (https, minuscolo, senza www./m./mobile., senza
+  porta di default) e il path (niente slash finale)
+- elimina frammento e parametri di tracking (utm_*, fbclid, gclid, ...) e,
+  solo per i siti con regola dell'id, quelli di condivisione e posizione
+  (si, ref, t, start, ...); ordina quelli rimasti. Su un sito sconosciuto
+  t o start possono far parte dell'indirizzo (token firmati, spezzoni)
+- per i siti più comuni ricava estrattore e id video con gli stessi nomi
+  usati da yt-dlp (ie_key in minuscolo)
+
+CanonicalURL.key identifica il video: "estrattore id" quando l'id è noto,
+altrimenti l'URL normalizzato. La usano l'indice della DownloadQueue, lo
+scheduler del daemon, il batch CLI e l'archivio dei download.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Prefissi di host che non cambiano il contenuto
+_HOST_PREFIXES: Tuple[str, ...] = ("www.", "m.", "mobile.")
+
+# Host alternativi dello stesso sito (dopo la rimozione dei prefissi)
+_HOST_ALIASES: Dict[str, str] = {
+    "youtube-nocookie.com": "youtube.com",
+    "music.youtube.com": "youtube.com",
+    "x.com": "twitter.com",
+    "touch.dailymotion.com": "dailymotion.com",
+    "player.vimeo.com": "vimeo.com",
+}
+
+_DEFAULT_PORTS: Dict[str, str] = {"http": "80", "https": "443"}
+
+# Parametri di tracking, eliminati per ogni host
+_TRACKING_PARAMS = frozenset({"fbclid", "gclid", "dclid", "msclkid"})
+_TRACKING_PREFIXES: Tuple[str, ...] = ("utm_",)
+
+# Parametri che non identificano il video sui siti di _ID_RULES
+_SITE_PARAMS = frozenset({
+    # Condivisione
+    "igshid", "igsh", "si", "feature", "pp", "ref", "ref_src", "ref_url",
+    "ab_channel", "embeds_referring_euri", "embeds_referring_origin",
+    # Posizione nel video
+    "t", "start", "time_continue",
+})
+
+_YOUTUBE_ID = re.compile(r"^[0-9A-Za-z_-]{11}$")
+
+
+@dataclass(frozen=True)
+class CanonicalURL:
+    """URL normalizzato ed eventuale identità del video."""
+
+    url: str
+    extractor: Optional[str] = None
+    video_id: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Chiave di deduplicazione: "estrattore id" oppure l'URL normalizzato."""
+        if self.extractor and self.video_id:
+            return f"{self.extractor} {self.video_id}"
+        return self.url
+
+
+# ============================================================================
+# ID PER SITO
+# ============================================================================
+
+# (path, query) -> (id, URL canonico) oppure None
+_IdRule = Callable[[str, Dict[str, str]], Optional[Tuple[str, str]]]
+
+
+def _segments(path: str) -> List[str]:
+    return [part for part in path.split("/") if part]
+
+
+def _youtube(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    parts = _segments(path)
+    video_id = None
+    if parts[:1] == ["watch"]:
+        video_id = query.get("v")
+    elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+        video_id = parts[1]
+    if video_id and _YOUTUBE_ID.match(video_id):
+        return video_id, f"https://www.youtube.com/watch?v={video_id}"
+    return None
+
+
+def _youtu_be(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    parts = _segments(path)
+    if parts and _YOUTUBE_ID.match(parts[0]):
+        return parts[0], f"https://www.youtube.com/watch?v={parts[0]}"
+    return None
+
+
+def _vimeo(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    # vimeo.com/123, vimeo.com/channels/x/123, player.vimeo.com/video/123
+    parts = _segments(path)
+    video_id = next((part for part in reversed(parts) if part.isdigit()), None)
+    if video_id:
+        return video_id, f"https://vimeo.com/{video_id}"
+    return None
+
+
+def _dailymotion(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    parts = _segments(path)
+    if len(parts) >= 2 and parts[0] == "video":
+        video_id = parts[1].split("_", 1)[0]
+        return video_id, f"https://www.dailymotion.com/video/{video_id}"
+    return None
+
+
+def _dai_ly(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    parts = _segments(path)
+    if parts:
+        return parts[0], f"https://www.dailymotion.com/video/{parts[0]}"
+    return None
+
+
+def _tiktok(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    # tiktok.com/@utente/video/123
+    parts = _segments(path)
+    if len(parts) >= 3 and parts[0].startswith("@") and parts[1] == "video" and parts[2].isdigit():
+        return parts[2], f"https://www.tiktok.com/{parts[0]}/video/{parts[2]}"
+    return None
+
+
+def _twitter(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    # twitter.com/utente/status/123 (anche x.com e /i/web/status/123)
+    parts = _segments(path)
+    if "status" in parts:
+        index = parts.index("status")
+        if index + 1 < len(parts) and parts[index + 1].isdigit():
+            return parts[index + 1], f"https://twitter.com/i/web/status/{parts[index + 1]}"
+    return None
+
+
+def _instagram(path: str, query: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    parts = _segments(path)
+    if len(parts) >= 2 and parts[0] in ("p", "reel", "reels", "tv"):
+        return parts[1], f"https://www.instagram.com/p/{parts[1]}/"
+    return None
+
+
+# Host normalizzato -> (estrattore yt-dlp, regola)
+_ID_RULES: Dict[str, Tuple[str, _IdRule]] = {
+    "youtube.com": ("youtube", _youtube),
+    "youtu.be": ("youtube", _youtu_be),
+    "vimeo.com": ("vimeo", _vimeo),
+    "dailymotion.com": ("dailymotion", _dailymotion),
+    "dai.ly": ("dailymotion", _dai_ly),
+    "tiktok.com": ("tiktok", _tiktok),
+    "twitter.com": ("twitter", _twitter),
+    "instagram.com": ("instagram", _instagram),
+}
+
+
+# ============================================================================
+# CANONICALIZZAZIONE
+# ============================================================================
+
+def _normalize_host(netloc: str, scheme: str) -> str:
+    host = netloc.rsplit("@", 1)[-1].lower().rstrip(".")
+    name, sep, port = host.rpartition(":")
+    if sep and _DEFAULT_PORTS.get(scheme) == port:
+        host = name
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return _HOST_ALIASES.get(host, host)
+
+
+def _keep_param(name: str, known_site: bool) -> bool:
+    lowered = name.lower()
+    if lowered in _TRACKING_PARAMS or lowered.startswith(_TRACKING_PREFIXES):
+        return False
+    return not (known_site and lowered in _SITE_PARAMS)
+
+
+@lru_cache(maxsize=4096)
+def canonicalize_url(url: str) -> CanonicalURL:
+    """
+    Forma canonica di un URL (nessun accesso alla rete).
+
+    Examples:
+        >>> canonicalize_url("https://youtu.be/dQw4w9WgXcQ?t=30").key
+        'youtube dQw4w9WgXcQ'
+        >>> canonicalize_url("https://m.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1&si=abc").url
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+        >>> canonicalize_url("HTTP://Example.com:80/media/clip.mp4/?utm_source=x&b=2&a=1#t=5").url
+        'https://example.com/media/clip.mp4?a=1&b=2'
+        >>> canonicalize_url("https://example.com/clip.mp4?start=20&fbclid=x").url
+        'https://example.com/clip.mp4?start=20'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = _normalize_host(parts.netloc, scheme)
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+
+    rule = _ID_RULES.get(host)
+    params = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if _keep_param(k, rule is not None)
+    ]
+    if rule is not None:
+        extractor, find_id = rule
+        found = find_id(path, dict(params))
+        if found is not None:
+            video_id, canonical = found
+            return CanonicalURL(canonical, extractor, video_id)
+
+    # Sito senza regola (o URL senza id, es. playlist): URL normalizzato,
+    # con http e https equivalenti
+    query = urlencode(sorted(params))
+    return CanonicalURL(urlunsplit(("https" if scheme in _DEFAULT_PORTS else scheme, host, path, query, "")))
+
+
+def dedup_key(url: str) -> str:
+    """Chiave di deduplicazione di un URL (vedi CanonicalURL.key)."""
+    return canonicalize_url(url).key
@@ -0,0 +1,387 @@
+"""
+Modalità batch da riga di comando per Modern Video Downloader.
+
+Usa lo stesso motore della GUI (download_video) senza importare
+customtkinter né pyperclip, così parte in fretta anche su server Linux
+senza display o da cron. Su stdout scrive solo eventi JSON-lines, una riga
+per evento; i log restano su file (e su stderr in modalità sviluppo).
+
+Eventi:
+    {"event": "queued",   "job": ..., "url": ...}
+    {"event": "start",    "job": ...}
+    {"event": "status",   "job": ..., "message": ...}
+    {"event": "progress", "job": ..., "percent": ..., "downloaded": ..., "total": ..., "speed": ..., "eta": ...}
+    {"event": "result",   "job": ..., "url": ..., "ok": ..., "outcome": ..., "error": ..., "bytes": ..., "duration": ...}
+    {"event": "summary",  "total": ..., "ok": ..., "failed": ..., "cancelled": ..., "skipped": ..., "duration": ...}
+
+Gli URL di video già nell'archivio dei download (vedi mvd.archive)
+vengono saltati senza accesso alla rete: "result" con outcome "archived";
+un URL dello stesso video di uno precedente del batch (vedi mvd.canonical)
+ha outcome "duplicate" e "duplicate_of" con il job originale.
+
+--limit-rate, --host-limit-rate, --job-limit-rate e --bandwidth-schedule
+limitano la banda di tutti i download paralleli (vedi mvd.bandwidth).
+
+Exit code: 0 se tutti i job sono completati, 1 se almeno uno fallisce,
+2 per argomenti non validi, 130 se interrotto (Ctrl+C).
+
+Examples:
+    python run.py cli https://www.youtube.com/watch?v=dQw4w9WgXcQ --mode audio
+    python run.py cli -a urls.txt -o /srv/media --quality 1080 --concurrency 3
+    python -m mvd.cli -a - --no-progress < urls.txt
+    python run.py cli -a urls.txt -j 4 --limit-rate 4M --job-limit-rate 1M
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, IO, Iterable, List, Optional
+
+from . import __version__, bandwidth
+from .archive import DownloadArchive
+from .canonical import dedup_key
+from .config import DEFAULT_DOWNLOAD_PATH, METRICS_CONFIG, quality_to_ydl_format
+from .downloader import download_video
+from .exceptions import AlreadyDownloadedError, DownloadCancelledError
+from .log_pipeline import job_context
+from .metrics import METRICS, JobMetrics
+from .tracing import TRACER
+from .utils import is_valid_url, new_job_id, setup_logger
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INTERRUPTED = 130
+
+
+# ============================================================================
+# OUTPUT JSON-LINES
+# ============================================================================
+
+class EventWriter:
+    """
+    Scrive eventi JSON-lines su uno stream (thread-safe).
+
+    Examples:
+        >>> import io
+        >>> out = io.StringIO()
+        >>> EventWriter(out, timestamps=False).emit("start", job="a1b2c3d4")
+        >>> out.getvalue()
+        '{"event": "start", "job": "a1b2c3d4"}\\n'
+    """
+
+    def __init__(self, stream: IO[str], timestamps: bool = True) -> None:
+        self._stream = stream
+        self._timestamps = timestamps
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        record: Dict[str, Any] = {"event": event}
+        if self._timestamps:
+            record["ts"] = round(time.time(), 3)
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def read_batch_file(path: str) -> List[str]:
+    """
+    Legge gli URL da file (uno per riga, '-' = stdin).
+
+    Righe vuote e commenti (#, ;) vengono ignorati, come nei batch file
+    di yt-dlp.
+    """
+    if path == "-":
+        return parse_url_lines(sys.stdin)
+    with open(path, encoding="utf-8") as f:
+        return parse_url_lines(f)
+
+
+def parse_url_lines(lines: Iterable[str]) -> List[str]:
+    """
+    Estrae gli URL da righe di testo.
+
+    Examples:
+        >>> parse_url_lines(["https://a.example/1\\n", "\\n", "# commento\\n", "  https://b.example/2  "])
+        ['https://a.example/1', 'https://b.example/2']
+    """
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith(("#", ";")):
+            urls.append(line)
+    return urls
+
+
+def resolve_format(quality: str, ydl_format: Optional[str]) -> str:
+    """
+    Format string yt-dlp da --quality (preset o altezza) o --format.
+
+    Examples:
+        >>> resolve_format("1080", None)
+        'bestvideo[height<=1080]+bestaudio/best/best'
+        >>> resolve_format("best", "bv*+ba")
+        'bv*+ba'
+    """
+    return ydl_format or quality_to_ydl_format(quality)
+
+
+# ============================================================================
+# BATCH
+# ============================================================================
+
+class BatchRunner:
+    """
+    Esegue una lista di URL con N download in parallelo.
+
+    Args:
+        urls: URL da scaricare
+        mode: "video" o "audio"
+        ydl_format: Format string yt-dlp
+        output_path: Cartella di destinazione
+        concurrency: Download contemporanei
+        writer: Destinazione degli eventi
+        progress_interval: Secondi minimi tra due eventi "progress" dello
+            stesso job (0 = tutti, None = nessuno)
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        mode: str,
+        ydl_format: str,
+        output_path: str,
+        concurrency: int,
+        writer: EventWriter,
+        progress_interval: Optional[float] = 1.0,
+        archive: Optional[DownloadArchive] = None,
+    ) -> None:
+        self.urls = urls
+        self.mode = mode
+        self.ydl_format = ydl_format
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.writer = writer
+        self.progress_interval = progress_interval
+        self.archive = archive
+        self.cancel_event = threading.Event()
+        self.counts = {"ok": 0, "failed": 0, "cancelled": 0, "skipped": 0}
+        self._counts_lock = threading.Lock()
+
+    def run(self) -> int:
+        """Esegue il batch e ritorna l'exit code."""
+        started = time.monotonic()
+        jobs = []
+        seen: Dict[str, str] = {}  # Chiave canonica -> job
+        for url in self.urls:
+            job_id = new_job_id()
+            self.writer.emit("queued", job=job_id, url=url)
+            if not is_valid_url(url):
+                self._result(job_id, url, "invalid", error="Invalid URL")
+                continue
+            key = dedup_key(url)
+            if key in seen:
+                self._result(job_id, url, "duplicate", duplicate_of=seen[key])
+            elif self.archive is not None and self.archive.contains_url(url):
+                self._result(job_id, url, "archived")
+            else:
+                seen[key] = job_id
+                jobs.append((job_id, url))
+
+        TRACER.start_session()
+        interrupted = False
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="CLIDownload")
+
+        try:
+            futures = [executor.submit(self._run_job, job_id, url) for job_id, url in jobs]
+            for future in as_completed(futures):
+                future.result()
+        except KeyboardInterrupt:
+            # I download in corso si fermano al prossimo progress hook,
+            # quelli non ancora partiti vengono scartati
+            interrupted = True
+            self.cancel_event.set()
+            logging.info("Batch interrupted, cancelling downloads")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if METRICS_CONFIG.METRICS_ENABLED:
+                METRICS.export()
+            TRACER.dump()
+
+        self.writer.emit(
+            "summary",
+            total=len(self.urls),
+            ok=self.counts["ok"],
+            failed=self.counts["failed"],
+            cancelled=self.counts["cancelled"] + (len(self.urls) - sum(self.counts.values())),
+            skipped=self.counts["skipped"],
+            duration=round(time.monotonic() - started, 3),
+        )
+
+        if interrupted:
+            return EXIT_INTERRUPTED
+        return EXIT_OK if self.counts["failed"] == 0 else EXIT_FAILED
+
+    def _run_job(self, job_id: str, url: str) -> None:
+        """Scarica un URL (thread del pool) ed emette gli eventi del job."""
+        if self.cancel_event.is_set():
+            self._result(job_id, url, "cancelled")
+            return
+
+        emit = self.writer.emit
+        job_metrics = JobMetrics(job_id=job_id, url=url)
+        last_progress = 0.0
+
+        def on_progress(data: Dict[str, Any]) -> None:
+            nonlocal last_progress
+            if self.progress_interval is None:
+                return
+            now = time.monotonic()
+            if now - last_progress >= self.progress_interval:
+                last_progress = now
+                emit("progress", job=job_id, **data)
+
+        def on_status(msg: str) -> None:
+            emit("status", job=job_id, message=msg)
+
+        emit("start", job=job_id)
+        with (
+            job_context(job_id=job_id, url=url),
+            TRACER.span("job", cat="cli", job=job_id, url=url),
+        ):
+            try:
+                download_video(
+                    url=url,
+                    mode=self.mode,
+                    quality=self.ydl_format,
+                    output_path=self.output_path,
+                    progress_cb=on_progress,
+                    status_cb=on_status,
+                    cancel_event=self.cancel_event,
+                    metrics=job_metrics,
+                    archive=self.archive,
+                )
+            except AlreadyDownloadedError:
+                self._result(job_id, url, "archived", job_metrics=job_metrics)
+            except DownloadCancelledError:
+                self._result(job_id, url, "cancelled", job_metrics=job_metrics)
+            except Exception as e:
+                # download_video ha già loggato l'errore con il traceback
+                self._result(job_id, url, "error", error=str(e), exc=e, job_metrics=job_metrics)
+            else:
+                self._result(job_id, url, "complete", job_metrics=job_metrics)
+
+    def _result(
+        self,
+        job_id: str,
+        url: str,
+        outcome: str,
+        error: Optional[str] = None,
+        exc: Optional[BaseException] = None,
+        job_metrics: Optional[JobMetrics] = None,
+        duplicate_of: Optional[str] = None,
+    ) -> None:
+        ok = outcome == "complete"
+        key = {"complete": "ok", "cancelled": "cancelled", "archived": "skipped", "duplicate": "skipped"}.get(
+            outcome, "failed"
+        )
+        with self._counts_lock:
+            self.counts[key] += 1
+
+        fields: Dict[str, Any] = {"job": job_id, "url": url, "ok": ok, "outcome": outcome}
+        if error is not None:
+            fields["error"] = error
+        if exc is not None:
+            fields["exc_class"] = type(exc).__name__
+        if duplicate_of is not None:
+            fields["duplicate_of"] = duplicate_of
+        if job_metrics is not None:
+            fields["bytes"] = job_metrics.bytes
+            fields["duration"] = round(job_metrics.duration, 3)
+            throughput = job_metrics.throughput
+            fields["throughput"] = round(throughput, 1) if throughput is not None else None
+        self.writer.emit("result", **fields)
+
+
+# ============================================================================
+# ENTRY POINT
+# ============================================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="mvd",
+        description="Modern Video Downloader - modalità batch (output JSON-lines su stdout)",
+    )
+    parser.add_argument("urls", nargs="*", metavar="URL", help="URL da scaricare")
+    parser.add_argument("-a", "--batch-file", metavar="FILE", help="file con un URL per riga ('-' = stdin)")
+    parser.add_argument("-m", "--mode", choices=("video", "audio"), default="video")
+    parser.add_argument(
+        "-q", "--quality", default="best",
+        help="best, 2160, 1440, 1080, 720, 480 (come i preset della GUI)",
+    )
+    parser.add_argument("-f", "--format", dest="ydl_format", metavar="FORMAT",
+                        help="format string yt-dlp (ha precedenza su --quality)")
+    parser.add_argument("-o", "--output", default=DEFAULT_DOWNLOAD_PATH, help="cartella di destinazione")
+    parser.add_argument("-j", "--concurrency", type=int, default=1, help="download contemporanei")
+    parser.add_argument("--progress-interval", type=float, default=1.0,
+                        help="secondi tra due eventi progress dello stesso job (0 = tutti)")
+    parser.add_argument("--no-progress", action="store_true", help="non emettere eventi progress")
+    parser.add_argument("--no-archive", dest="archive", action="store_false",
+                        help="scarica anche i video già nell'archivio")
+    bandwidth.add_arguments(parser)
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point CLI.
+
+    Args:
+        argv: Argomenti (default sys.argv[1:])
+
+    Returns:
+        Exit code
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.batch_file:
+        try:
+            urls.extend(read_batch_file(args.batch_file))
+        except OSError as e:
+            parser.error(f"cannot read batch file: {e}")
+    if not urls:
+        parser.error("no URLs given (pass URLs or --batch-file)")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
+
+    setup_logger()
+    bandwidth.configure_from_args(args)
+    logging.info(f"CLI batch: {len(urls)} URLs, mode={args.mode}, concurrency={args.concurrency}")
+
+    runner = BatchRunner(
+        urls=urls,
+        mode=args.mode,
+        ydl_format=resolve_format(args.quality, args.ydl_format),
+        output_path=args.output,
+        concurrency=args.concurrency,
+        writer=EventWriter(sys.stdout),
+        progress_interval=None if args.no_progress else args.progress_interval,
+        archive=DownloadArchive.open_default() if args.archive else None,
+    )
+    return runner.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
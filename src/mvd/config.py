@@ -184,8 +184,13 @@ class PerformanceConfig:
 
     UI_POLL_INTERVAL_MS: int = 80  # Polling interval per UI queue (ms)
     TITLE_FETCH_TIMEOUT: int = 10  # Timeout fetch titolo video (secondi)
+    TITLE_FETCH_WORKERS: int = 4  # Thread massimi per il fetch dei titoli
+    TITLE_FETCH_IDLE_TIMEOUT: float = 5.0  # Secondi di inattività prima che un worker titoli termini
     PROGRESS_UPDATE_INTERVAL: float = 0.1  # Debounce progress updates (100ms)
     DOWNLOAD_CHUNK_SIZE: int = 1048576  # 1MB chunk size
+    QUEUE_RENDER_LIMIT: int = 200  # Job mostrati nella queue box (gli altri riassunti)
+    PRELOAD_DELAY_MS: int = 300  # Attesa dopo il primo disegno prima del precaricamento
+    PRELOAD_MODULES: tuple[str, ...] = ("yt_dlp", "mvd.updater", "pyperclip")  # Caricati in background
 
 
 # ============================================================================
@@ -205,6 +210,253 @@ class LogConfig:
     # Rotating file handler settings
     LOG_MAX_BYTES: int = 10485760  # 10 MB
     LOG_BACKUP_COUNT: int = 3  # Mantieni 3 backup
+    LOG_COMPRESS_ROTATED: bool = False  # Comprimi in gzip i backup (thread in background)
+
+    # Pipeline asincrona: i thread accodano, un listener scrive su file
+    LOG_ASYNC: bool = True
+
+    # Log strutturati JSON-lines (attivabili anche con MVD_LOG_JSON=1)
+    LOG_JSON: bool = False
+    LOG_JSON_FILE_NAME: str = "app.jsonl"
+
+    # Log box GUI (ring buffer): lo storico completo resta nel file di log
+    LOG_VIEW_MAX_LINES: int = 2000  # Righe mantenute in memoria/visibili
+    LOG_VIEW_TRIM_BATCH: int = 200  # Righe eliminate dal widget in un colpo solo
+    LOG_VIEW_LEVELS: tuple[str, ...] = ("DEBUG", "INFO", "WARNING", "ERROR")
+    LOG_VIEW_DEFAULT_LEVEL: str = "INFO"
+
+
+# ============================================================================
+# CONFIGURAZIONE METRICHE
+# ============================================================================
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    """Configurazione metriche per-job (export JSON + Prometheus textfile)."""
+
+    METRICS_ENABLED: bool = True
+    METRICS_DIR_NAME: str = "metrics"  # Sotto la directory dati dell'app
+    JSON_FILE_NAME: str = "metrics.json"
+    PROM_FILE_NAME: str = "mvd.prom"  # Override directory: MVD_METRICS_TEXTFILE_DIR
+    EXPORT_INTERVAL: float = 5.0  # Secondi minimi tra due export automatici
+    RECENT_JOBS: int = 50  # Job recenti riportati nel JSON
+
+    # Bucket istogrammi
+    DURATION_BUCKETS: tuple[float, ...] = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+    THROUGHPUT_BUCKETS: tuple[float, ...] = (
+        65536, 262144, 1048576, 4194304, 16777216, 67108864  # 64KB/s .. 64MB/s
+    )
+
+
+# ============================================================================
+# CONFIGURAZIONE TRACING
+# ============================================================================
+
+@dataclass(frozen=True)
+class TraceConfig:
+    """Configurazione tracer Chrome trace-event (opt-in, anche con MVD_TRACE=1)."""
+
+    TRACE_ENABLED: bool = False
+    TRACE_DIR_NAME: str = "traces"  # Sotto la directory dati dell'app
+    MAX_EVENTS: int = 200000  # Limite eventi per sessione (oltre: scartati)
+
+
+# ============================================================================
+# CONFIGURAZIONE PROFILING
+# ============================================================================
+
+@dataclass(frozen=True)
+class ProfileConfig:
+    """Configurazione profiling cProfile + tracemalloc (opt-in, anche con MVD_PROFILE)."""
+
+    PROFILE_ENABLED: bool = False
+    PROFILE_DIR_NAME: str = "profiles"  # Sotto la directory dati dell'app
+    MAX_SESSIONS: int = 20  # Catture massime per processo
+    TOP_N: int = 25  # Righe nei report (allocazioni e funzioni)
+    TRACEMALLOC_FRAMES: int = 10  # Profondità stack registrata da tracemalloc
+
+    # Campionamento: una chiamata ogni N per target
+    SAMPLE_EVERY: tuple[tuple[str, int], ...] = (
+        ("download_video", 1),
+        ("title_fetch", 1),
+        ("ui_drain", 250),  # ~1 tick ogni 20s con polling a 80ms
+    )
+
+
+# ============================================================================
+# CONFIGURAZIONE UI MONITOR
+# ============================================================================
+
+@dataclass(frozen=True)
+class UIMonitorConfig:
+    """Configurazione monitor lag event loop e frame-time UI."""
+
+    HEARTBEAT_MS: int = 100  # Intervallo heartbeat after() misurato
+    LAG_WARN_MS: float = 250.0  # Soglia lag oltre cui loggare un warning
+    LAG_WARN_INTERVAL: float = 30.0  # Secondi minimi tra due warning
+    MAX_SAMPLES: int = 1000  # Campioni per metrica (finestra percentili)
+    OVERLAY_ENABLED: bool = False  # Overlay visibile all'avvio (anche MVD_UI_MONITOR=1)
+    OVERLAY_REFRESH_MS: int = 500  # Aggiornamento testo overlay
+
+
+# ============================================================================
+# CONFIGURAZIONE DAEMON HTTP
+# ============================================================================
+
+@dataclass(frozen=True)
+class DaemonConfig:
+    """Configurazione API HTTP locale (modalità daemon)."""
+
+    HOST: str = "127.0.0.1"  # Solo loopback di default
+    PORT: int = 8787
+    CONCURRENCY: int = 2  # Download contemporanei
+    MAX_BODY_BYTES: int = 1048576  # Dimensione massima richiesta JSON (1MB)
+    MAX_BATCH_JOBS: int = 10000  # Job massimi per POST /jobs/batch
+    MAX_FINISHED_JOBS: int = 1000  # Job conclusi mantenuti per GET /jobs
+    SSE_HEARTBEAT: float = 15.0  # Secondi tra due commenti keep-alive SSE
+    SSE_QUEUE_SIZE: int = 1000  # Eventi in attesa per client SSE (oltre: scartati)
+    PROGRESS_INTERVAL: float = 0.5  # Secondi minimi tra due eventi progress dello stesso job
+    TOKEN_ENV: str = "MVD_DAEMON_TOKEN"  # Se impostata, richiede Authorization: Bearer <token>
+    WARM_UP: bool = True  # Precarica yt-dlp ed estrattori all'avvio
+    JOB_STORE_FILE_NAME: str = "daemon_jobs.sqlite3"  # Job del daemon (separati da quelli della GUI)
+
+
+# ============================================================================
+# CONFIGURAZIONE ARCHIVIO DOWNLOAD
+# ============================================================================
+
+@dataclass(frozen=True)
+class ArchiveConfig:
+    """Configurazione dell'archivio dei download completati (vedi mvd.archive)."""
+
+    ENABLED: bool = True
+    DB_FILE_NAME: str = "archive.sqlite3"  # Sotto la directory dati dell'app
+    BUSY_TIMEOUT: float = 5.0  # Secondi di attesa se il database è bloccato
+    BLOOM_CAPACITY: int = 100_000  # Voci previste (il filtro raddoppia se superate)
+    BLOOM_ERROR_RATE: float = 0.001  # Falsi positivi (solo questi interrogano SQLite)
+    MANIFEST_FILE_NAME: str = ".mvd-archive.jsonl"  # Id dei video scaricati, accanto ai file
+
+
+# ============================================================================
+# CONFIGURAZIONE NOMI FILE
+# ============================================================================
+
+@dataclass(frozen=True)
+class NamingConfig:
+    """Configurazione dell'indice dei nomi di output (vedi mvd.naming)."""
+
+    RESCAN_INTERVAL: float = 30.0  # Secondi minimi tra due scansioni di una cartella modificata da altri
+    MAX_STEM_BYTES: int = 200  # Byte UTF-8 del nome dal titolo (limite 255 meno " (n)", ".f137.mp4.part", ...)
+    # File incompleti (yt-dlp, frammenti, temporanei FFmpeg): nome che finisce o contiene
+    PARTIAL_SUFFIXES: tuple[str, ...] = (".part", ".ytdl")
+    PARTIAL_INFIXES: tuple[str, ...] = (".part-Frag", ".temp.")
+    # Estensioni dei file di un job, tolte per ricavarne il nome base
+    MEDIA_EXTENSIONS: tuple[str, ...] = (
+        "mp4", "mkv", "webm", "mov", "avi", "flv", "3gp", "ts", "m4v", "ogv",
+        "m4a", "mka", "mp3", "opus", "ogg", "oga", "flac", "wav", "aac", "alac", "aiff",
+    )
+    SIDECAR_EXTENSIONS: tuple[str, ...] = (
+        "jpg", "jpeg", "png", "webp", "json", "description", "xml",
+        "vtt", "srt", "ass", "lrc", "ttml", "srv1", "srv2", "srv3", "json3",
+    )
+
+
+# ============================================================================
+# CONFIGURAZIONE CANCELLAZIONE
+# ============================================================================
+
+@dataclass(frozen=True)
+class CancellationConfig:
+    """Configurazione cancellazione/pausa dei download (vedi mvd.cancellation)."""
+
+    POLL_INTERVAL: float = 0.05  # Secondi tra due controlli del token mentre yt-dlp lavora
+    PARTIAL_POLICY: str = "delete"  # "delete" o "keep": file parziali dopo un annullamento
+    PREVIOUS_RUN_TIMEOUT: float = 35.0  # Attesa massima del thread yt-dlp di un job annullato prima di riavviarlo
+
+
+# ============================================================================
+# CONFIGURAZIONE RETRY
+# ============================================================================
+
+@dataclass(frozen=True)
+class RetryConfig:
+    """Configurazione dei nuovi tentativi dei job falliti (vedi mvd.retry)."""
+
+    NETWORK_MAX_ATTEMPTS: int = 4  # Tentativi totali per gli errori di rete (transitori)
+    OTHER_MAX_ATTEMPTS: int = 2  # Tentativi totali per gli errori di download non classificati
+    BASE_DELAY: float = 5.0  # Secondi prima del secondo tentativo
+    BACKOFF_FACTOR: float = 2.0  # Moltiplicatore del ritardo a ogni tentativo
+    MAX_DELAY: float = 300.0  # Ritardo massimo tra due tentativi
+    JITTER: float = 0.5  # Frazione del ritardo resa casuale (evita retry sincronizzati)
+
+
+# ============================================================================
+# CONFIGURAZIONE SALUTE DEGLI HOST
+# ============================================================================
+
+@dataclass(frozen=True)
+class HostHealthConfig:
+    """Configurazione circuit breaker e limiti per host (vedi mvd.host_health)."""
+
+    FAILURE_THRESHOLD: int = 3  # Errori di rete consecutivi che aprono il circuito
+    OPEN_COOLDOWN: float = 30.0  # Secondi di circuito aperto prima della richiesta di prova
+    MAX_COOLDOWN: float = 600.0  # Limite del cooldown (raddoppia a ogni prova fallita)
+    MAX_CONCURRENCY: int = 4  # Job contemporanei per host (limite iniziale)
+    RECOVERY_SUCCESSES: int = 5  # Successi consecutivi per alzare di 1 il limite dopo un 429
+    DEGRADED_RETRIES: int = 2  # retries/fragment_retries di yt-dlp per un host con errori recenti
+    BLOCKED_POLL_INTERVAL: float = 1.0  # Secondi tra i controlli di un host al limite o in prova
+
+
+# ============================================================================
+# CONFIGURAZIONE BANDA
+# ============================================================================
+
+@dataclass(frozen=True)
+class BandwidthConfig:
+    """Configurazione del limite di banda (token bucket, vedi mvd.bandwidth)."""
+
+    TOTAL_RATE: int = 0  # Byte/s per l'intero processo (0 = nessun limite)
+    HOST_RATE: int = 0  # Byte/s per host (0 = nessun limite)
+    JOB_RATE: int = 0  # Byte/s per job (0 = nessun limite)
+    SCHEDULE: str = ""  # Limiti per fascia oraria, es. "mon-fri 09:00-18:00=2M" (vale su TOTAL_RATE)
+    RATE_ENV: str = "MVD_LIMIT_RATE"  # Es. MVD_LIMIT_RATE=5M (sovrascrive TOTAL_RATE)
+    SCHEDULE_ENV: str = "MVD_BANDWIDTH_SCHEDULE"  # Sovrascrive SCHEDULE
+    BURST_SECONDS: float = 1.0  # Capacità del bucket in secondi di banda
+    MIN_BURST: int = 256 * 1024  # Capacità minima (un blocco di yt-dlp non deve superarla)
+    SLEEP_SLICE: float = 0.25  # Attesa massima tra due controlli di cancellazione e limiti
+    BLOCK_SIZE: int = 64 * 1024  # Blocco di lettura di yt-dlp con un limite attivo
+    SCHEDULE_CHECK_INTERVAL: float = 30.0  # Secondi tra due valutazioni della fascia oraria
+
+
+# ============================================================================
+# CONFIGURAZIONE JOB STORE PERSISTENTE
+# ============================================================================
+
+@dataclass(frozen=True)
+class JobStoreConfig:
+    """Configurazione della coda persistente (SQLite in modalità WAL)."""
+
+    ENABLED: bool = True
+    DB_FILE_NAME: str = "jobs.sqlite3"  # Sotto la directory dati dell'app
+    BUSY_TIMEOUT: float = 5.0  # Secondi di attesa se il database è bloccato
+    MAX_FINISHED_JOBS: int = 1000  # Job conclusi mantenuti (con il loro journal)
+
+
+# ============================================================================
+# CONFIGURAZIONE ISTANZA SINGOLA
+# ============================================================================
+
+@dataclass(frozen=True)
+class SingleInstanceConfig:
+    """Configurazione istanza singola della GUI (inoltro URL via socket locale)."""
+
+    ENABLED: bool = True
+    DISABLE_ENV: str = "MVD_MULTI_INSTANCE"  # =1 per aprire sempre una nuova finestra
+    INSTANCE_FILE_NAME: str = "instance.json"  # Porta, token e PID dell'istanza attiva
+    HOST: str = "127.0.0.1"  # Solo loopback, porta scelta dal sistema
+    CONNECT_TIMEOUT: float = 0.5  # Secondi per connettersi all'istanza attiva
+    IO_TIMEOUT: float = 2.0  # Secondi per inviare URL e ricevere la conferma
+    MAX_MESSAGE_BYTES: int = 1048576  # Dimensione massima di un messaggio (1MB)
 
 
 # ============================================================================
@@ -245,6 +497,8 @@ class UIMessages:
     BTN_ADD: str = "➕ Aggiungi"
     BTN_DOWNLOAD: str = "⬇️ Download"
     BTN_CANCEL: str = "❌ Annulla"
+    BTN_PAUSE: str = "⏸️ Pausa"
+    BTN_RESUME: str = "▶️ Riprendi"
     BTN_CLEAR_QUEUE: str = "🗑️ Svuota"
     BTN_REMOVE_LAST: str = "⬅️ Rimuovi ultimo"
     BTN_COPY_LOG: str = "📄 Copia log"
@@ -257,6 +511,7 @@ class UIMessages:
     LBL_SAVE_IN: str = "Salva in"
     LBL_QUEUE: str = "Coda download"
     LBL_LOG: str = "Log"
+    LBL_LOG_ALL_JOBS: str = "Tutti i job"
 
     # ========== Status Messages ==========
     STATUS_READY: str = "⏳ In attesa di un download"
@@ -264,6 +519,8 @@ class UIMessages:
     STATUS_PROCESSING: str = "⚙️ Elaborazione file..."
     STATUS_COMPLETE: str = "✅ Download completato!"
     STATUS_CANCELLED: str = "❌ Download annullato."
+    STATUS_PAUSED: str = "⏸️ Download in pausa."
+    STATUS_ARCHIVED: str = "⏭️ Già scaricato."
     STATUS_ERROR: str = "❌ Errore: {}"
 
     # ========== Log Messages ==========
@@ -274,11 +531,20 @@ class UIMessages:
     LOG_QUEUE_CLEARED: str = "Coda svuotata."
     LOG_REMOVED_LAST: str = "Rimosso ultimo elemento dalla coda."
     LOG_CANCEL_REQUESTED: str = "Richiesto annullamento..."
+    LOG_PAUSE_REQUESTED: str = "Richiesta pausa del download corrente..."
+    LOG_JOB_PAUSED: str = "⏸️ In pausa: {}"
+    LOG_JOB_RETRY: str = "🔁 Nuovo tentativo {}/{} tra {:.0f}s: {}"
+    LOG_JOBS_RESUMED: str = "▶️ Ripresi {} job."
+    LOG_NOTHING_PAUSED: str = "Nessun job in pausa."
     LOG_DOWNLOADING: str = "Download: {}"
     LOG_ALL_COMPLETE: str = "✅ Tutti i download completati!"
     LOG_QUEUE_CANCELLED: str = "❌ Coda annullata."
     LOG_LOG_COPIED: str = "Log copiato in clipboard."
     LOG_CANNOT_COPY: str = "Impossibile copiare il log."
+    LOG_EXTERNAL_URLS: str = "Ricevuti {} URL da riga di comando."
+    LOG_JOBS_RESTORED: str = "Ripristinati {} job dalla sessione precedente."
+    LOG_ALREADY_ARCHIVED: str = "Già scaricato, saltato: {}"
+    LOG_ALREADY_QUEUED: str = "Già in coda: {}"
     LOG_OUTPUT_FOLDER: str = "Output: {}"
     LOG_DOWNLOAD_IN_PROGRESS: str = "Download in corso: attendi la fine o annulla."
 
@@ -299,6 +565,7 @@ class UIMessages:
     # ========== Altri ==========
     TITLE_LOADING: str = "(Caricamento titolo...)"
     TITLE_UNTITLED: str = "(senza titolo)"
+    QUEUE_MORE_ITEMS: str = "… e altri {} in coda\n"
 
     # ========== Tooltips (per feature futura) ==========
     TOOLTIP_PASTE: str = "Incolla URL dalla clipboard (oppure usa Ctrl+V)"
@@ -342,6 +609,7 @@ class KeyboardShortcuts:
     CANCEL: str = "<Escape>"
     COPY_LOG: str = "<Control-l>"
     REFRESH: str = "<F5>"
+    TOGGLE_UI_MONITOR: str = "<F12>"
 
 
 # ============================================================================
@@ -356,6 +624,19 @@ YTDLP_CONFIG = YTDLPConfig()
 YTDLP_CONFIG.__post_init__()  # Inizializza HTTP_HEADERS
 PERFORMANCE_CONFIG = PerformanceConfig()
 LOG_CONFIG = LogConfig()
+METRICS_CONFIG = MetricsConfig()
+TRACE_CONFIG = TraceConfig()
+PROFILE_CONFIG = ProfileConfig()
+UI_MONITOR_CONFIG = UIMonitorConfig()
+DAEMON_CONFIG = DaemonConfig()
+SINGLE_INSTANCE_CONFIG = SingleInstanceConfig()
+JOB_STORE_CONFIG = JobStoreConfig()
+CANCELLATION_CONFIG = CancellationConfig()
+ARCHIVE_CONFIG = ArchiveConfig()
+NAMING_CONFIG = NamingConfig()
+RETRY_CONFIG = RetryConfig()
+HOST_HEALTH_CONFIG = HostHealthConfig()
+BANDWIDTH_CONFIG = BandwidthConfig()
 UI_MSG = UIMessages()
 SETTINGS_CONFIG = SettingsConfig()
 KEYBOARD = KeyboardShortcuts()
@@ -411,6 +692,30 @@ def get_resolution_height(preset: str) -> int | None:
     return None
 
 
+def quality_to_ydl_format(preset: str) -> str:
+    """
+    Converte preset qualità UI in format string yt-dlp.
+
+    Args:
+        preset: Preset qualità (es. "1080p (Full HD)")
+
+    Returns:
+        Format string per yt-dlp
+
+    Examples:
+        >>> quality_to_ydl_format("1080p (Full HD)")
+        'bestvideo[height<=1080]+bestaudio/best/best'
+        >>> quality_to_ydl_format("Best (auto)")
+        'bestvideo+bestaudio/best'
+    """
+    height = get_resolution_height(preset)
+
+    if height:
+        return f"bestvideo[height<={height}]+bestaudio/best/best"
+    else:
+        return "bestvideo+bestaudio/best"
+
+
 def get_status_color(status: str) -> str:
     """
     Ottieni colore per status message.
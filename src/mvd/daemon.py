@@ -0,0 +1,1142 @@
+"""
+Modalità daemon: API HTTP/JSON locale sopra il motore di download.
+
+Più strumenti interni possono inviare download alla stessa macchina senza
+passare dalla finestra Tk. Il processo resta vivo tra le richieste, quindi
+import di yt-dlp, estrattori e regex compilate restano caldi; N worker
+eseguono download_video in parallelo, in ordine di priorità.
+
+Endpoint (JSON):
+    GET    /health               stato del daemon e contatori
+    POST   /jobs                 {"url", "mode", "quality" | "format", "output", "priority"}
+                                 ("output" relativo alla cartella del daemon, mai fuori)
+    POST   /jobs/batch           {"jobs": [...]} oppure {"urls": [...], + campi comuni}
+    GET    /jobs[?status=...]    elenco job (in coda, in corso e ultimi conclusi)
+    GET    /jobs/<id>            dettaglio job
+    PATCH  /jobs/<id>            {"priority": n} (solo job in coda o in pausa)
+    DELETE /jobs/<id>            annulla il job (in coda, in pausa o in corso)
+    POST   /jobs/<id>/pause      sospende il job tenendo i file parziali
+    POST   /jobs/<id>/resume     rimette in coda un job in pausa (riprende dal .part)
+    GET    /bandwidth            limiti di banda in vigore
+    PATCH  /bandwidth            {"total", "per_host", "per_job", "schedule"} (vedi mvd.bandwidth;
+                                 valgono subito anche per i download in corso)
+    GET    /events               stream server-sent events (job_added, job_started,
+                                 progress, status, job_updated, job_finished,
+                                 bandwidth_updated)
+
+Ogni job viene eseguito dallo stesso JobRunner della download queue della
+GUI (vedi mvd.job_runner), quindi archivio, retry, circuit breaker e
+JobStore seguono le stesse regole; lo scheduler aggiunge solo priorità e
+N worker.
+
+I video già nell'archivio dei download (vedi mvd.archive) vengono
+conclusi subito come "skipped", senza occupare un worker. Un URL dello
+stesso video di un job in coda o in corso (vedi mvd.canonical) non crea
+un nuovo job: la risposta contiene quello esistente. Un job fallito per
+un errore transitorio torna "queued" dopo il ritardo di backoff della
+RetryPolicy (vedi mvd.retry; campi "attempts" e "retry_at"). Un circuit
+breaker per host (vedi mvd.host_health) tiene in coda i job di un sito
+che fallisce ripetutamente, mentre i worker servono gli altri host;
+GET /health ne riporta lo stato in "hosts".
+
+I job sono salvati in un JobStore proprio del daemon
+(DAEMON_CONFIG.JOB_STORE_FILE_NAME): dopo un riavvio o un crash quelli in
+coda o interrotti ripartono (dal .part), quelli in pausa restano in
+pausa. --no-store tiene i job solo in memoria.
+
+Il server ascolta solo su 127.0.0.1 di default; con MVD_DAEMON_TOKEN
+impostata ogni richiesta deve avere "Authorization: Bearer <token>".
+
+Examples:
+    python run.py daemon --port 8787 --concurrency 3 -o /srv/media
+    curl -X POST localhost:8787/jobs -d '{"url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "priority": 5}'
+    curl -N localhost:8787/events
+    curl -X PATCH localhost:8787/bandwidth -d '{"total": "4M", "schedule": "mon-fri 09:00-18:00=1M"}'
+"""
+
+import argparse
+import heapq
+import hmac
+import itertools
+import json
+import logging
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from . import __version__, bandwidth
+from .archive import DownloadArchive
+from .config import DAEMON_CONFIG, DEFAULT_DOWNLOAD_PATH, HOST_HEALTH_CONFIG, quality_to_ydl_format
+from .host_health import HostHealthTracker
+from .job_runner import OUTCOME_ERROR, OUTCOME_PAUSED, OUTCOME_RETRY, DownloadJob, JobIndex, JobRunner
+from .job_store import (
+    STATE_CANCELLED,
+    STATE_COMPLETE,
+    STATE_ERROR,
+    STATE_PAUSED,
+    STATE_QUEUED,
+    STATE_RUNNING,
+    STATE_SKIPPED,
+    JobStore,
+)
+from .retry import RETRY_POLICY, RetryPolicy
+from .exceptions import (
+    InvalidURLError,
+    JobNotFoundError,
+    JobStateError,
+    ValidationError,
+)
+from .metrics import JobMetrics, PHASE_QUEUE_WAIT
+from .tracing import TRACER
+from .utils import is_valid_url, setup_logger
+
+# Stati job
+STATUS_QUEUED = STATE_QUEUED
+STATUS_RUNNING = STATE_RUNNING
+STATUS_PAUSED = STATE_PAUSED
+STATUS_COMPLETE = STATE_COMPLETE
+STATUS_ERROR = STATE_ERROR
+STATUS_CANCELLED = STATE_CANCELLED
+STATUS_SKIPPED = STATE_SKIPPED  # Già nell'archivio dei download
+
+FINISHED_STATUSES = frozenset({STATUS_COMPLETE, STATUS_ERROR, STATUS_CANCELLED, STATUS_SKIPPED})
+
+# Callback eventi: (kind, data)
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+# ============================================================================
+# JOB
+# ============================================================================
+
+@dataclass
+class DaemonJob(DownloadJob):
+    """Job della download queue con lo stato esposto dall'API."""
+
+    priority: int = 0
+    status: str = STATUS_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    exc_class: Optional[str] = None
+    bytes: int = 0
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    pause_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    heap_seq: int = field(default=-1, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Rappresentazione JSON del job."""
+        return {
+            "id": self.id,
+            "url": self.url,
+            "mode": self.mode,
+            "format": self.quality,
+            "output": self.output_path,
+            "priority": self.priority,
+            "status": self.status,
+            "created_at": round(self.created_at, 3),
+            "started_at": round(self.started_at, 3) if self.started_at else None,
+            "finished_at": round(self.finished_at, 3) if self.finished_at else None,
+            "progress": self.progress,
+            "error": self.error,
+            "exc_class": self.exc_class,
+            "bytes": self.bytes,
+            "attempts": self.attempts,
+            "retry_at": round(time.time() + self.retry_at - time.monotonic(), 3) if self.retry_at else None,
+        }
+
+
+def resolve_output(output: str, root: str) -> str:
+    """
+    Cartella di output di un job, vincolata alla cartella del daemon.
+
+    Un path relativo è relativo a root; link simbolici e ".." vengono
+    risolti prima del confronto, così un client non può scrivere fuori
+    dalla cartella configurata.
+
+    Raises:
+        ValidationError: Path fuori da root
+
+    Examples:
+        >>> resolve_output("music", "/srv/media")
+        '/srv/media/music'
+        >>> resolve_output("../etc", "/srv/media")
+        Traceback (most recent call last):
+        ...
+        mvd.exceptions.ValidationError: output must be inside /srv/media
+    """
+    base = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(base, output))
+    try:
+        inside = os.path.commonpath([base, path]) == base
+    except ValueError:  # Dischi diversi su Windows
+        inside = False
+    if not inside:
+        raise ValidationError(f"output must be inside {base}")
+    return path
+
+
+def parse_job_spec(
+    spec: Dict[str, Any],
+    defaults: Dict[str, Any],
+    root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Valida i campi di un job ricevuto dall'API.
+
+    Args:
+        spec: Oggetto JSON del job
+        defaults: Valori comuni (output del daemon o campi del batch)
+        root: Cartella entro cui deve stare l'output (None = nessun vincolo)
+
+    Returns:
+        Argomenti per JobScheduler.submit()
+
+    Raises:
+        InvalidURLError: URL mancante o non http/https
+        ValidationError: Altri campi non validi
+
+    Examples:
+        >>> parse_job_spec({"url": "https://example.com/v", "quality": "720"}, {"output": "/tmp"})["quality"]
+        'bestvideo[height<=720]+bestaudio/best/best'
+    """
+    if not isinstance(spec, dict):
+        raise ValidationError("Job must be a JSON object")
+    merged = {**defaults, **spec}
+
+    url = merged.get("url")
+    if not isinstance(url, str) or not is_valid_url(url):
+        raise InvalidURLError(f"Invalid URL: {url!r}")
+
+    mode = merged.get("mode", "video")
+    if mode not in ("video", "audio"):
+        raise ValidationError(f"Invalid mode: {mode!r} (video or audio)")
+
+    ydl_format = merged.get("format")
+    if ydl_format is None:
+        ydl_format = quality_to_ydl_format(str(merged.get("quality", "best")))
+    elif not isinstance(ydl_format, str):
+        raise ValidationError("format must be a string")
+
+    output = merged.get("output") or root or DEFAULT_DOWNLOAD_PATH
+    if not isinstance(output, str):
+        raise ValidationError("output must be a string")
+    if root is not None:
+        output = resolve_output(output, root)
+
+    priority = merged.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        raise ValidationError("priority must be an integer")
+
+    return {"url": url, "mode": mode, "quality": ydl_format, "output_path": output, "priority": priority}
+
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+
+class JobScheduler:
+    """
+    Coda con priorità e N worker di download.
+
+    I job con priorità più alta partono prima; a parità di priorità vale
+    l'ordine di arrivo. Ogni job ha il proprio cancel_event e pause_event,
+    così annullarne o sospenderne uno non ferma gli altri.
+
+    L'esecuzione di un job (archivio, circuit breaker, JobStore, RetryPolicy)
+    è delegata allo stesso JobRunner della DownloadQueue; qui restano
+    l'ordine, la concorrenza e lo stato esposto dall'API. I job di un host
+    con il circuito aperto o al limite di download contemporanei restano
+    parcheggiati fuori dall'heap finché l'host non può ripartire; quelli
+    in attesa di un retry stanno in un secondo heap ordinato per retry_at
+    e rientrano in coda allo scadere, senza un timer per job.
+
+    Args:
+        concurrency: Download contemporanei
+        on_event: Callback per ogni evento (chiamato anche dai worker)
+        max_finished: Job conclusi mantenuti in memoria per GET /jobs
+        archive: Archivio dei download (None = nessun controllo dei duplicati)
+        retry_policy: Policy dei nuovi tentativi (None = nessun retry)
+        host_health: Circuit breaker per host (None = uno nuovo)
+        store: Persistenza dei job (None = solo in memoria)
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DAEMON_CONFIG.CONCURRENCY,
+        on_event: Optional[EventCallback] = None,
+        max_finished: int = DAEMON_CONFIG.MAX_FINISHED_JOBS,
+        archive: Optional[DownloadArchive] = None,
+        retry_policy: Optional[RetryPolicy] = RETRY_POLICY,
+        host_health: Optional[HostHealthTracker] = None,
+        store: Optional[JobStore] = None,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self._on_event = on_event or (lambda kind, data: None)
+        self._max_finished = max_finished
+        self.runner = JobRunner(
+            archive=archive, store=store, retry_policy=retry_policy, host_health=host_health, trace_cat="daemon"
+        )
+        self._cond = threading.Condition()
+        self._jobs: Dict[str, DaemonJob] = {}
+        self._index = JobIndex()  # Job in coda, in pausa o in corso
+        self._heap: List[Tuple[int, int, str]] = []
+        self._delayed: List[Tuple[float, int, str]] = []  # (retry_at, seq, id) dei job in attesa di retry
+        self._parked: Dict[str, List[Tuple[int, int, str]]] = {}  # Host -> voci dell'heap in attesa
+        self._seq = itertools.count()
+        self._finished: Deque[str] = deque()
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+
+    @property
+    def hosts(self) -> HostHealthTracker:
+        """Circuit breaker per host usato dai worker."""
+        return self.runner.hosts
+
+    @property
+    def _store(self) -> Optional[JobStore]:
+        return self.runner.store
+
+    # ------------------------------------------------------------------
+    # Ciclo di vita
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Avvia i worker."""
+        TRACER.start_session()
+        for i in range(self.concurrency):
+            worker = threading.Thread(target=self._worker_loop, daemon=True, name=f"DaemonWorker-{i}")
+            worker.start()
+            self._workers.append(worker)
+        logging.info(f"Job scheduler started with {self.concurrency} workers")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Ferma i download in corso e attende la fine dei worker.
+
+        I download in corso vengono sospesi (file parziali mantenuti) e
+        salvati come "queued": al riavvio ripartono dal .part.
+        """
+        with self._cond:
+            self._stopping = True
+            for job in self._jobs.values():
+                if job.status == STATUS_RUNNING:
+                    job.pause_event.set()
+            self._cond.notify_all()
+
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        TRACER.dump()
+        logging.info("Job scheduler stopped")
+
+    def restore(self) -> List[DaemonJob]:
+        """
+        Ricarica dal JobStore i job rimasti in sospeso (prima di start()).
+
+        I job in coda o interrotti a metà download tornano in coda con le
+        stesse opzioni (yt-dlp riprende il .part), quelli in pausa restano
+        in pausa.
+
+        Returns:
+            I job ripristinati, nell'ordine originale
+        """
+        if self._store is None:
+            return []
+
+        restored: List[DaemonJob] = []
+        for row in self._store.pending():
+            job = DaemonJob(
+                url=row["url"],
+                id=row["id"],
+                mode=row["mode"],
+                quality=row["quality"],
+                output_path=row["output_path"],
+                priority=row["priority"] or 0,
+                created_at=row["created_at"],
+            )
+            if row["state"] == STATE_PAUSED:
+                job.status = STATUS_PAUSED
+            elif row["state"] == STATE_RUNNING:
+                self._store.transition(job.id, STATE_QUEUED, detail="interrupted, restored")
+            restored.append(job)
+
+        with self._cond:
+            for job in restored:
+                self._jobs[job.id] = job
+                self._index.claim(job)
+                if job.status == STATUS_QUEUED:
+                    self._push(job)
+            self._cond.notify_all()
+
+        if restored:
+            paused = sum(job.status == STATUS_PAUSED for job in restored)
+            logging.info(f"Restored {len(restored) - paused} queued and {paused} paused jobs from job store")
+        return restored
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def submit(self, **options: Any) -> DaemonJob:
+        """Accoda un job (argomenti come da parse_job_spec)."""
+        return self.submit_many([options])[0]
+
+    def submit_many(self, specs: List[Dict[str, Any]]) -> List[DaemonJob]:
+        """
+        Accoda più job con una sola transazione sul JobStore.
+
+        I video già nell'archivio non entrano in coda: il job viene
+        concluso subito come "skipped". Un URL dello stesso video di un job
+        in coda, in pausa o in corso (anche nella stessa richiesta)
+        restituisce il job esistente.
+        """
+        jobs = [DaemonJob(**options) for options in specs]
+        archived = {job.id for job in jobs if self.runner.is_archived(job.url)}
+        result: List[DaemonJob] = []
+        added: List[DaemonJob] = []
+        with self._cond:
+            for job in jobs:
+                existing = self._index.get(job.key)
+                if existing is not None:
+                    result.append(existing)
+                    continue
+                self._jobs[job.id] = job
+                if job.id in archived:
+                    job.status = STATUS_SKIPPED
+                else:
+                    self._index.claim(job)
+                result.append(job)
+                added.append(job)
+
+        # Salvati prima di entrare nell'heap: un worker non può avviare un
+        # job che lo store non conosce ancora
+        queued = [job for job in added if job.id not in archived]
+        if self._store is not None:
+            self._store.add_jobs({
+                "id": job.id, "url": job.url, "mode": job.mode, "quality": job.quality,
+                "output_path": job.output_path, "priority": job.priority,
+            } for job in queued)
+        with self._cond:
+            # Annullati o sospesi nel frattempo: lo store va riallineato
+            changed = [job for job in queued if job.status != STATUS_QUEUED]
+            for job in queued:
+                if job.status == STATUS_QUEUED:
+                    self._push(job)
+            self._cond.notify(len(queued))
+        if self._store is not None:
+            for job in changed:
+                self._store.transition(job.id, job.status)
+
+        added_ids = {job.id for job in added}
+        for job in jobs:
+            if job.id not in added_ids:
+                logging.info(f"Duplicate of queued job: {job.url}", extra={"url": job.url, "phase": "queued"})
+        for job in added:
+            logging.info(
+                f"Added to queue: {job.url}",
+                extra={"job_id": job.id, "url": job.url, "phase": "queued"}
+            )
+            self._on_event("job_added", job.to_dict())
+            if job.id in archived:
+                self._finish(job, STATUS_SKIPPED)
+        return result
+
+    def get(self, job_id: str) -> DaemonJob:
+        with self._cond:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"Unknown job: {job_id}")
+        return job
+
+    def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Job noti (in coda, in corso, in pausa e ultimi conclusi), dal più vecchio."""
+        with self._cond:
+            return [job.to_dict() for job in self._jobs.values() if status is None or job.status == status]
+
+    def counts(self) -> Dict[str, int]:
+        with self._cond:
+            counts = dict.fromkeys((STATUS_QUEUED, STATUS_RUNNING, STATUS_PAUSED, *sorted(FINISHED_STATUSES)), 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    def cancel(self, job_id: str) -> DaemonJob:
+        """
+        Annulla un job.
+
+        Un job in coda o in pausa viene concluso subito; uno in corso si
+        ferma al prossimo progress hook di yt-dlp.
+
+        Raises:
+            JobNotFoundError: Job sconosciuto
+            JobStateError: Job già concluso
+        """
+        with self._cond:
+            job = self._get_locked(job_id)
+            if job.status in FINISHED_STATUSES:
+                raise JobStateError(f"Job {job_id} is already {job.status}")
+            job.cancel_event.set()
+            waiting = job.status in (STATUS_QUEUED, STATUS_PAUSED)
+            if waiting:
+                # Subito fuori dalla coda: _pop salta i job non più "queued"
+                job.status = STATUS_CANCELLED
+
+        logging.info(f"Cancellation requested: {job.url}", extra={"job_id": job.id, "phase": "cancelled"})
+        if waiting:
+            if self._store is not None:
+                self._store.transition(job.id, STATE_CANCELLED)
+            self._finish(job, STATUS_CANCELLED)
+        return job
+
+    def pause(self, job_id: str) -> DaemonJob:
+        """
+        Sospende un job mantenendo i file parziali.
+
+        Un job in corso si ferma al prossimo progress hook e libera il
+        worker; uno in coda (anche in attesa di retry) esce dalla coda.
+
+        Raises:
+            JobNotFoundError: Job sconosciuto
+            JobStateError: Job non in coda né in corso
+        """
+        with self._cond:
+            job = self._get_locked(job_id)
+            if job.status == STATUS_RUNNING:
+                job.pause_event.set()
+                logging.info(f"Pause requested: {job.url}", extra={"job_id": job.id})
+                return job
+            if job.status != STATUS_QUEUED:
+                raise JobStateError(f"Job {job_id} is {job.status}, only queued or running jobs can be paused")
+            # Le voci nell'heap (o tra i retry) diventano obsolete
+            job.status = STATUS_PAUSED
+            job.retry_at = 0.0
+
+        if self._store is not None:
+            self._store.transition(job.id, STATE_PAUSED)
+        logging.info(f"Paused queued job: {job.url}", extra={"job_id": job.id})
+        self._on_event("job_updated", job.to_dict())
+        return job
+
+    def resume(self, job_id: str) -> DaemonJob:
+        """
+        Rimette in coda un job in pausa (con la sua priorità).
+
+        Raises:
+            JobNotFoundError: Job sconosciuto
+            JobStateError: Job non in pausa
+        """
+        with self._cond:
+            job = self._get_locked(job_id)
+            if job.status != STATUS_PAUSED:
+                raise JobStateError(f"Job {job_id} is {job.status}, only paused jobs can be resumed")
+            job.status = STATUS_QUEUED
+            job.pause_event.clear()
+            job.progress = None
+            job.queued_at = time.monotonic()
+            job.retry_at = 0.0
+            self._push(job)
+            self._cond.notify()
+
+        if self._store is not None:
+            self._store.transition(job.id, STATE_QUEUED, detail="resumed")
+        logging.info(f"Resumed job: {job.url}", extra={"job_id": job.id})
+        self._on_event("job_updated", job.to_dict())
+        return job
+
+    def set_priority(self, job_id: str, priority: int) -> DaemonJob:
+        """
+        Cambia la priorità di un job in coda o in pausa.
+
+        Raises:
+            JobNotFoundError: Job sconosciuto
+            JobStateError: Job già avviato o concluso
+        """
+        with self._cond:
+            job = self._get_locked(job_id)
+            if job.status not in (STATUS_QUEUED, STATUS_PAUSED):
+                raise JobStateError(f"Job {job_id} is {job.status}, only queued or paused jobs can be reprioritised")
+            job.priority = priority
+            # La voce precedente nell'heap diventa obsoleta (heap_seq diverso);
+            # un job in attesa di retry entra nell'heap solo allo scadere del ritardo
+            if job.status == STATUS_QUEUED and not job.retry_at:
+                self._push(job)
+
+        if self._store is not None:
+            self._store.set_priority(job.id, priority)
+        self._on_event("job_updated", job.to_dict())
+        return job
+
+    def _get_locked(self, job_id: str) -> DaemonJob:
+        """Job per id (chiamare con il lock)."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"Unknown job: {job_id}")
+        return job
+
+    # ------------------------------------------------------------------
+    # Heap
+    # ------------------------------------------------------------------
+
+    def _push(self, job: DaemonJob) -> None:
+        job.heap_seq = next(self._seq)
+        heapq.heappush(self._heap, (-job.priority, job.heap_seq, job.id))
+
+    def _pop(self) -> Optional[DaemonJob]:
+        """
+        Prossimo job in coda (chiamato con il lock), saltando le voci obsolete.
+
+        I retry scaduti rientrano nell'heap. Il job ritornato ha già un
+        posto riservato nel circuit breaker; le voci di host che non
+        possono partire vengono parcheggiate.
+        """
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            retry_at, _, job_id = heapq.heappop(self._delayed)
+            job = self._jobs.get(job_id)
+            # Annullato, in pausa o ripreso nel frattempo: voce obsoleta
+            if job is not None and job.status == STATUS_QUEUED and job.retry_at == retry_at:
+                job.queued_at = now
+                job.retry_at = 0.0
+                self._push(job)
+
+        for host in [host for host in self._parked if self.hosts.can_start(host)]:
+            for entry in self._parked.pop(host):
+                heapq.heappush(self._heap, entry)
+
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            job = self._jobs.get(entry[2])
+            if job is None or job.status != STATUS_QUEUED or job.heap_seq != entry[1]:
+                continue
+            slot = None if job.host in self._parked else self.hosts.try_acquire(job.host)
+            if slot is None:
+                self._parked.setdefault(job.host, []).append(entry)
+                continue
+            job.slot = slot
+            return job
+        return None
+
+    def _next_wakeup(self) -> Optional[float]:
+        """Secondi al primo retry dovuto o host parcheggiato ripartibile (None = nessuno)."""
+        waits = [
+            HOST_HEALTH_CONFIG.BLOCKED_POLL_INTERVAL if wait is None else wait
+            for wait in (self.hosts.retry_after(host) for host in self._parked)
+        ]
+        if self._delayed:
+            waits.append(max(0.0, self._delayed[0][0] - time.monotonic()))
+        return min(waits) if waits else None
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                job = self._pop()
+                while job is None and not self._stopping:
+                    # Risvegliati da nuovi job, job conclusi, retry dovuti o riapertura di un host
+                    self._cond.wait(self._next_wakeup())
+                    job = self._pop()
+                if self._stopping:
+                    if job is not None:
+                        self.runner.release(job, neutral=True)
+                    return
+                job.status = STATUS_RUNNING
+                job.started_at = time.time()
+
+            self._on_event("job_started", job.to_dict())
+            self._run_job(job)
+
+    def _run_job(self, job: DaemonJob) -> None:
+        """Scarica un job con lo stesso JobRunner della GUI."""
+        job_metrics = JobMetrics(job_id=job.id, url=job.url)
+        job_metrics.add_phase(PHASE_QUEUE_WAIT, time.monotonic() - job.queued_at)
+        last_progress = 0.0
+
+        def on_progress(data: Dict[str, Any]) -> None:
+            nonlocal last_progress
+            job.progress = data
+            now = time.monotonic()
+            if now - last_progress >= DAEMON_CONFIG.PROGRESS_INTERVAL:
+                last_progress = now
+                self._on_event("progress", {"id": job.id, **data})
+
+        def on_status(msg: str) -> None:
+            self._on_event("status", {"id": job.id, "message": msg})
+
+        outcome = self.runner.run(
+            job,
+            progress_cb=on_progress,
+            status_cb=on_status,
+            cancel_event=job.cancel_event,
+            pause_event=job.pause_event,
+            metrics=job_metrics,
+        )
+
+        with self._cond:
+            # L'host ha un posto libero: risveglia i worker in attesa
+            if self._parked:
+                self._cond.notify_all()
+
+        if outcome.status == OUTCOME_RETRY:
+            self._retry_later(job, outcome.exc)
+        elif outcome.status == OUTCOME_PAUSED:
+            self._on_paused(job)
+        else:
+            exc = outcome.exc if outcome.status == OUTCOME_ERROR else None
+            self._finish(job, outcome.status, exc=exc, job_metrics=job_metrics)
+
+    def _retry_later(self, job: DaemonJob, exc: Optional[BaseException]) -> None:
+        """
+        Rimette in coda un job fallito allo scadere di job.retry_at.
+
+        Nel frattempo il job resta "queued" (annullabile) ma fuori
+        dall'heap, così nessun worker resta occupato ad aspettare.
+        """
+        with self._cond:
+            job.status = STATUS_QUEUED
+            job.error = str(exc)
+            job.exc_class = type(exc).__name__
+            job.progress = None
+            heapq.heappush(self._delayed, (job.retry_at, next(self._seq), job.id))
+            # Un worker in attesa ricalcola il timeout
+            self._cond.notify()
+
+        self._on_event("job_updated", job.to_dict())
+
+    def _on_paused(self, job: DaemonJob) -> None:
+        """Job sospeso durante il download: resta nell'indice fino alla ripresa."""
+        with self._cond:
+            if self._stopping:
+                # Chiusura del daemon: al riavvio il job riparte dal .part
+                job.status = STATUS_QUEUED
+            else:
+                job.status = STATUS_PAUSED
+
+        if job.status == STATUS_QUEUED and self._store is not None:
+            self._store.transition(job.id, STATE_QUEUED, detail="interrupted by shutdown")
+        self._on_event("job_updated", job.to_dict())
+
+    def _finish(
+        self,
+        job: DaemonJob,
+        status: str,
+        exc: Optional[BaseException] = None,
+        job_metrics: Optional[JobMetrics] = None,
+    ) -> None:
+        """Conclude un job e scarta dallo storico i conclusi più vecchi."""
+        with self._cond:
+            job.status = status
+            job.finished_at = time.time()
+            if exc is not None:
+                job.error = str(exc)
+                job.exc_class = type(exc).__name__
+            if job_metrics is not None:
+                job.bytes = job_metrics.bytes
+            self._index.discard(job)
+
+            self._finished.append(job.id)
+            while len(self._finished) > self._max_finished:
+                self._jobs.pop(self._finished.popleft(), None)
+
+        self._on_event("job_finished", job.to_dict())
+
+
+# ============================================================================
+# EVENTI (SSE)
+# ============================================================================
+
+class EventHub:
+    """
+    Distribuisce gli eventi ai client /events.
+
+    Ogni client ha una coda limitata: un client lento perde eventi invece
+    di rallentare i worker di download.
+    """
+
+    def __init__(self, max_queue: int = DAEMON_CONFIG.SSE_QUEUE_SIZE) -> None:
+        self._max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers: List["queue.Queue[Tuple[int, str, Dict[str, Any]]]"] = []
+        self._ids = itertools.count(1)
+        self.dropped = 0
+
+    def subscribe(self) -> "queue.Queue[Tuple[int, str, Dict[str, Any]]]":
+        q: "queue.Queue[Tuple[int, str, Dict[str, Any]]]" = queue.Queue(maxsize=self._max_queue)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: "queue.Queue[Tuple[int, str, Dict[str, Any]]]") -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def publish(self, kind: str, data: Dict[str, Any]) -> None:
+        event = (next(self._ids), kind, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+
+    @property
+    def clients(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+class _APIHandler(BaseHTTPRequestHandler):
+    """Handler HTTP: routing, autenticazione e serializzazione JSON."""
+
+    server_version = f"MVD-Daemon/{__version__}"
+    protocol_version = "HTTP/1.1"
+    daemon: "Daemon"  # impostato da Daemon.make_server()
+
+    # Routing ------------------------------------------------------------
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PATCH(self) -> None:
+        self._dispatch("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        if not self._authorized():
+            self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "Missing or invalid token"})
+            return
+
+        parsed = urlparse(self.path)
+        parts = [p for p in parsed.path.split("/") if p]
+        scheduler = self.daemon.scheduler
+
+        try:
+            if method == "GET" and parts == ["health"]:
+                self._send_json(HTTPStatus.OK, self.daemon.health())
+            elif method == "GET" and parts == ["events"]:
+                self._stream_events()
+            elif method == "GET" and parts == ["jobs"]:
+                status = parse_qs(parsed.query).get("status", [None])[0]
+                self._send_json(HTTPStatus.OK, {"jobs": scheduler.list(status)})
+            elif method == "POST" and parts == ["jobs"]:
+                options = parse_job_spec(self._read_json(), self.daemon.defaults, root=self.daemon.output_root)
+                self._send_json(HTTPStatus.CREATED, scheduler.submit(**options).to_dict())
+            elif method == "POST" and parts == ["jobs", "batch"]:
+                jobs = scheduler.submit_many(self._batch_specs(self._read_json()))
+                self._send_json(HTTPStatus.CREATED, {"jobs": [job.to_dict() for job in jobs]})
+            elif method == "GET" and parts == ["bandwidth"]:
+                self._send_json(HTTPStatus.OK, bandwidth.BANDWIDTH.snapshot())
+            elif method == "PATCH" and parts == ["bandwidth"]:
+                bandwidth.BANDWIDTH.configure(**bandwidth.parse_limits(self._read_json()))
+                limits = bandwidth.BANDWIDTH.snapshot()
+                self.daemon.events.publish("bandwidth_updated", limits)
+                self._send_json(HTTPStatus.OK, limits)
+            elif len(parts) == 2 and parts[0] == "jobs" and method in ("GET", "PATCH", "DELETE"):
+                self._job_action(method, parts[1])
+            elif len(parts) == 3 and parts[0] == "jobs" and method == "POST" and parts[2] in ("pause", "resume"):
+                action = scheduler.pause if parts[2] == "pause" else scheduler.resume
+                self._send_json(HTTPStatus.OK, action(parts[1]).to_dict())
+            else:
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {parsed.path}"})
+        except JobNotFoundError as e:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": str(e)})
+        except JobStateError as e:
+            self._send_json(HTTPStatus.CONFLICT, {"error": str(e)})
+        except ValidationError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            logging.exception(f"Daemon API error on {method} {self.path}")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+
+    def _job_action(self, method: str, job_id: str) -> None:
+        scheduler = self.daemon.scheduler
+        if method == "GET":
+            job = scheduler.get(job_id)
+        elif method == "DELETE":
+            job = scheduler.cancel(job_id)
+        else:
+            priority = self._read_json().get("priority")
+            if not isinstance(priority, int) or isinstance(priority, bool):
+                raise ValidationError("priority must be an integer")
+            job = scheduler.set_priority(job_id, priority)
+        self._send_json(HTTPStatus.OK, job.to_dict())
+
+    def _batch_specs(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Job di un batch: {"jobs": [...]} o {"urls": [...]} con campi comuni."""
+        common = {k: v for k, v in body.items() if k not in ("jobs", "urls")}
+        defaults = {**self.daemon.defaults, **common}
+
+        if isinstance(body.get("jobs"), list):
+            items = body["jobs"]
+        elif isinstance(body.get("urls"), list):
+            items = [{"url": url} for url in body["urls"]]
+        else:
+            raise ValidationError('Batch needs a "jobs" or "urls" list')
+
+        if len(items) > DAEMON_CONFIG.MAX_BATCH_JOBS:
+            raise ValidationError(f"Batch too large ({len(items)} > {DAEMON_CONFIG.MAX_BATCH_JOBS})")
+
+        # Tutto o niente: un job non valido rifiuta l'intero batch
+        specs = []
+        for index, item in enumerate(items):
+            try:
+                specs.append(parse_job_spec(item, defaults, root=self.daemon.output_root))
+            except ValidationError as e:
+                raise type(e)(f"jobs[{index}]: {e}") from e
+        return specs
+
+    # I/O ----------------------------------------------------------------
+
+    def _authorized(self) -> bool:
+        token = self.daemon.token
+        if not token:
+            return True
+        header = self.headers.get("Authorization", "")
+        return hmac.compare_digest(header, f"Bearer {token}")
+
+    def _read_json(self) -> Dict[str, Any]:
+        raw_length = self.headers.get("Content-Length") or "0"
+        try:
+            length = int(raw_length)
+        except ValueError:
+            length = -1
+        if not 0 <= length <= DAEMON_CONFIG.MAX_BODY_BYTES:
+            # Il body non viene letto: la connessione non è più riutilizzabile
+            self.close_connection = True
+            if length > DAEMON_CONFIG.MAX_BODY_BYTES:
+                raise ValidationError(f"Request body too large ({length} bytes)")
+            raise ValidationError(f"Invalid Content-Length: {raw_length!r}")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise ValidationError(f"Invalid JSON: {e}") from e
+        if not isinstance(body, dict):
+            raise ValidationError("Request body must be a JSON object")
+        return body
+
+    def _send_json(self, status: HTTPStatus, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self) -> None:
+        """Server-sent events fino alla disconnessione del client."""
+        hub = self.daemon.events
+        q = hub.subscribe()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            self.wfile.write(b": connected\n\n")
+            self.wfile.flush()
+            while not self.daemon.stopping.is_set():
+                try:
+                    event_id, kind, data = q.get(timeout=DAEMON_CONFIG.SSE_HEARTBEAT)
+                    chunk = f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                except queue.Empty:
+                    chunk = ": keep-alive\n\n"
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            hub.unsubscribe(q)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug(f"daemon {self.address_string()} {format % args}")
+
+
+# ============================================================================
+# DAEMON
+# ============================================================================
+
+def warm_up() -> float:
+    """
+    Precarica yt-dlp: import dei moduli e regex _VALID_URL di tutti gli
+    estrattori, che restano compilate a livello di classe per i job
+    successivi (altrimenti il primo URL paga ~0,5 s in più).
+
+    Returns:
+        Secondi impiegati
+    """
+    started = time.perf_counter()
+    import yt_dlp
+    from yt_dlp.extractor import gen_extractor_classes
+
+    with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}):
+        pass
+    for ie in gen_extractor_classes():
+        ie.suitable("https://warm-up.invalid/")
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"yt-dlp warm-up completed in {elapsed:.2f}s")
+    return elapsed
+
+
+class Daemon:
+    """
+    API HTTP + scheduler + hub eventi.
+
+    Args:
+        host: Indirizzo di ascolto
+        port: Porta (0 = scelta dal sistema)
+        concurrency: Download contemporanei
+        output_path: Cartella di default dei job (l'output dei client deve stare al suo interno)
+        token: Token Bearer richiesto (None = nessuna autenticazione)
+        archive: Archivio dei download (None = nessun controllo dei duplicati)
+        store: Persistenza dei job (None = solo in memoria)
+    """
+
+    def __init__(
+        self,
+        host: str = DAEMON_CONFIG.HOST,
+        port: int = DAEMON_CONFIG.PORT,
+        concurrency: int = DAEMON_CONFIG.CONCURRENCY,
+        output_path: str = DEFAULT_DOWNLOAD_PATH,
+        token: Optional[str] = None,
+        archive: Optional[DownloadArchive] = None,
+        store: Optional[JobStore] = None,
+    ) -> None:
+        self.output_root = output_path
+        self.defaults: Dict[str, Any] = {"output": output_path}
+        self.token = token
+        self.events = EventHub()
+        self.scheduler = JobScheduler(concurrency, on_event=self.events.publish, archive=archive, store=store)
+        self.stopping = threading.Event()
+        self.started_at = time.time()
+        self.server = self.make_server(host, port)
+
+    def make_server(self, host: str, port: int) -> ThreadingHTTPServer:
+        handler = type("APIHandler", (_APIHandler,), {"daemon": self})
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        return server
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address[:2]
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "version": __version__,
+            "uptime": round(time.time() - self.started_at, 1),
+            "concurrency": self.scheduler.concurrency,
+            "jobs": self.scheduler.counts(),
+            "hosts": self.scheduler.hosts.snapshot(unhealthy_only=True),
+            "event_clients": self.events.clients,
+            "dropped_events": self.events.dropped,
+        }
+
+    def start(self) -> None:
+        """Ripristina i job salvati e avvia scheduler e server HTTP in thread separati."""
+        self.scheduler.restore()
+        self.scheduler.start()
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="DaemonHTTP").start()
+        host, port = self.address
+        logging.info(f"Daemon API listening on http://{host}:{port}")
+
+    def stop(self) -> None:
+        """Ferma server, stream SSE e download in corso."""
+        self.stopping.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.scheduler.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point daemon (python run.py daemon ...).
+
+    Returns:
+        Exit code
+    """
+    parser = argparse.ArgumentParser(prog="mvd daemon", description="Modern Video Downloader - API HTTP locale")
+    parser.add_argument("--host", default=DAEMON_CONFIG.HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_CONFIG.PORT)
+    parser.add_argument("-j", "--concurrency", type=int, default=DAEMON_CONFIG.CONCURRENCY)
+    parser.add_argument("-o", "--output", default=DEFAULT_DOWNLOAD_PATH, help="cartella di default dei job")
+    parser.add_argument("--no-warm-up", dest="warm_up", action="store_false", default=DAEMON_CONFIG.WARM_UP)
+    parser.add_argument("--no-archive", dest="archive", action="store_false",
+                        help="scarica anche i video già nell'archivio")
+    parser.add_argument("--no-store", dest="store", action="store_false",
+                        help="non salvare i job su disco (persi al riavvio)")
+    bandwidth.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    setup_logger()
+    bandwidth.configure_from_args(args)
+
+    try:
+        daemon = Daemon(
+            host=args.host,
+            port=args.port,
+            concurrency=args.concurrency,
+            output_path=args.output,
+            token=os.getenv(DAEMON_CONFIG.TOKEN_ENV) or None,
+            archive=DownloadArchive.open_default() if args.archive else None,
+            store=JobStore.open_default(DAEMON_CONFIG.JOB_STORE_FILE_NAME) if args.store else None,
+        )
+    except OSError as e:
+        print(f"Cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+
+    if args.warm_up:
+        threading.Thread(target=warm_up, daemon=True, name="WarmUp").start()
+
+    # SIGTERM (systemd, docker stop) come Ctrl+C
+    def on_sigterm(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    daemon.start()
+    host, port = daemon.address
+    print(f"MVD daemon listening on http://{host}:{port}", file=sys.stderr)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logging.info("Daemon shutting down")
+    finally:
+        daemon.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,679 @@
+"""
+Motore della download queue per Modern Video Downloader.
+
+Gestisce la lista dei job, il fetch dei titoli e il worker che scarica
+i job in sequenza, senza dipendere dalla GUI: gli aggiornamenti vengono
+notificati tramite un callback on_event(kind, payload) con gli stessi
+messaggi usati dalla UI queue della GUI ("status", "details", "progress",
+"log", "done", "show_error") più "queue_changed" quando la lista cambia.
+
+Così la stessa coda può essere pilotata dalla GUI, da script headless
+e dai benchmark.
+
+Con un JobStore le transizioni dei job vengono salvate su SQLite e
+restore() ripristina i job rimasti in sospeso dopo un crash o una chiusura.
+
+pause() ferma un singolo job tenendo i file parziali e libera il worker
+per il job successivo; resume() lo rimette in testa alla coda e il
+download riprende dall'ultimo byte o frammento.
+
+Un indice hash per chiave canonica dell'URL (vedi mvd.canonical) fa
+confluire sul job esistente gli URL diversi dello stesso video (youtu.be,
+watch?v=...&t=30, m.youtube.com...), finché il job è in coda, in pausa o
+in download.
+
+Con un DownloadArchive i job di video già scaricati vengono saltati dal
+worker prima di qualsiasi accesso alla rete (is_archived() permette ai
+chiamanti di scartarli già all'aggiunta).
+
+Un job fallito passa alla RetryPolicy (vedi mvd.retry): gli errori
+transitori lo rimettono in fondo alla coda, subito o non prima del
+ritardo di backoff (retry_at), mentre il worker continua con gli altri;
+quelli permanenti lo concludono subito come errore.
+
+Un HostHealthTracker (vedi mvd.host_health) tiene un circuit breaker per
+host: mentre un sito è giù i suoi job restano in coda e il worker scarica
+quelli degli altri host, poi un solo job fa da prova.
+
+Archivio, circuit breaker, JobStore e RetryPolicy vengono applicati da un
+JobRunner (vedi mvd.job_runner), lo stesso dello scheduler del daemon:
+qui restano l'ordine dei job, la pausa e gli eventi per la GUI.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .archive import DownloadArchive
+from .canonical import dedup_key
+from .config import HOST_HEALTH_CONFIG, METRICS_CONFIG, PERFORMANCE_CONFIG, UI_MSG
+from .job_runner import (
+    OUTCOME_CANCELLED,
+    OUTCOME_ERROR,
+    OUTCOME_PAUSED,
+    OUTCOME_RETRY,
+    OUTCOME_SKIPPED,
+    DownloadJob,
+    JobIndex,
+    JobOutcome,
+    JobRunner,
+)
+from .job_store import STATE_PAUSED, STATE_QUEUED, STATE_RUNNING, JobStore
+from .host_health import HostHealthTracker
+from .log_pipeline import job_context
+from .metrics import METRICS, JobMetrics, PHASE_QUEUE_WAIT
+from .profiling import PROFILER
+from .retry import RETRY_POLICY, RetryPolicy
+from .tracing import TRACER
+
+# Callback eventi: (kind, payload)
+EventCallback = Callable[[str, Any], None]
+
+
+# ============================================================================
+# QUEUE
+# ============================================================================
+
+class DownloadQueue:
+    """
+    Coda di download con worker sequenziale.
+
+    Args:
+        on_event: Callback chiamato (anche da thread worker) per ogni evento
+        store: Persistenza opzionale dei job (None = solo in memoria)
+        archive: Archivio dei download completati (None = nessun controllo
+            dei duplicati)
+        retry_policy: Policy dei nuovi tentativi (None = nessun retry)
+        host_health: Circuit breaker per host, condivisibile tra code
+            (None = uno nuovo per questa coda)
+
+    Examples:
+        >>> events = []
+        >>> q = DownloadQueue(lambda kind, payload: events.append(kind))
+        >>> job = q.add("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        >>> len(q)
+        1
+        >>> q.start(mode="video", quality="best", output_path="/tmp/out")  # doctest: +SKIP
+        True
+        >>> q.wait()  # doctest: +SKIP
+    """
+
+    def __init__(
+        self,
+        on_event: EventCallback,
+        store: Optional[JobStore] = None,
+        archive: Optional[DownloadArchive] = None,
+        retry_policy: Optional[RetryPolicy] = RETRY_POLICY,
+        host_health: Optional[HostHealthTracker] = None,
+    ) -> None:
+        self._on_event = on_event
+        self._store = store
+        self._runner = JobRunner(
+            archive=archive, store=store, retry_policy=retry_policy, host_health=host_health, trace_cat="queue"
+        )
+        self._jobs: Deque[DownloadJob] = deque()
+        self._paused: Dict[str, DownloadJob] = {}  # In ordine di pausa
+        self._index = JobIndex()  # Job in coda, in pausa o in corso
+        self._current: Optional[DownloadJob] = None
+        self._current_pause: Optional[threading.Event] = None
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._wakeup = threading.Event()  # Nuovi job per un worker in attesa di un retry
+        self._worker: Optional[threading.Thread] = None
+        self._started_at: float = 0.0
+        self._run_options: Dict[str, str] = {}
+        self._title_jobs: "queue.SimpleQueue[DownloadJob]" = queue.SimpleQueue()
+        self._title_workers = 0
+
+    # ------------------------------------------------------------------
+    # Stato
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def snapshot(self, limit: Optional[int] = None) -> List[DownloadJob]:
+        """
+        Copia dei job in attesa (per il rendering).
+
+        Args:
+            limit: Numero massimo di job copiati dalla testa della coda
+                (None = tutti); tiene breve il lock con code molto lunghe
+        """
+        with self._lock:
+            if limit is None:
+                return list(self._jobs)
+            return list(itertools.islice(self._jobs, limit))
+
+    def paused_snapshot(self) -> List[DownloadJob]:
+        """Copia dei job in pausa (per il rendering)."""
+        with self._lock:
+            return list(self._paused.values())
+
+    @property
+    def current(self) -> Optional[DownloadJob]:
+        """Job in download in questo momento (None se nessuno)."""
+        return self._current
+
+    @property
+    def is_running(self) -> bool:
+        """True se il worker sta processando la coda."""
+        return self._worker is not None and self._worker.is_alive()
+
+    @property
+    def host_health(self) -> HostHealthTracker:
+        """Circuit breaker per host usato dal worker."""
+        return self._runner.hosts
+
+    @property
+    def cancel_requested(self) -> bool:
+        """True se è stata richiesta la cancellazione dell'esecuzione corrente."""
+        return self._cancel_event.is_set()
+
+    # ------------------------------------------------------------------
+    # Gestione job
+    # ------------------------------------------------------------------
+
+    def is_archived(self, url: str) -> bool:
+        """True se l'URL punta a un video già nell'archivio (senza rete)."""
+        return self._runner.is_archived(url)
+
+    def find(self, url: str) -> Optional[DownloadJob]:
+        """Job in coda, in pausa o in corso per lo stesso video (None se non c'è)."""
+        key = dedup_key(url)
+        with self._lock:
+            return self._index.get(key)
+
+    def add(self, url: str, **options: Any) -> DownloadJob:
+        """
+        Aggiunge un job in fondo alla coda.
+
+        Un URL dello stesso video di un job ancora da completare non crea
+        un nuovo job (vedi add_or_get).
+
+        Args:
+            url: URL da scaricare (già validato)
+            **options: Campi opzionali di DownloadJob (title, mode, quality, output_path)
+
+        Returns:
+            Il job creato o quello già presente
+        """
+        return self.add_or_get(url, **options)[0]
+
+    def add_or_get(self, url: str, **options: Any) -> Tuple[DownloadJob, bool]:
+        """
+        Aggiunge un job, oppure ritorna quello già presente per lo stesso video.
+
+        Returns:
+            (job, True se è stato creato)
+        """
+        job = DownloadJob(url=url, **options)
+        with self._lock:
+            existing = self._index.claim(job)
+            if existing is None:
+                self._jobs.append(job)
+
+        if existing is not None:
+            logging.info(
+                f"Duplicate of queued job {existing.id}: {url}",
+                extra={"job_id": existing.id, "url": url, "phase": "queued"}
+            )
+            return existing, False
+        self._wakeup.set()
+
+        if self._store is not None:
+            self._store.add_job(
+                job.id, url,
+                title=job.title if job.title != UI_MSG.TITLE_LOADING else None,
+                mode=job.mode, quality=job.quality, output_path=job.output_path,
+            )
+
+        logging.info(
+            f"Added to queue: {url}",
+            extra={"job_id": job.id, "url": url, "phase": "queued"}
+        )
+        return job, True
+
+    def clear(self) -> None:
+        """Rimuove tutti i job in attesa."""
+        with self._lock:
+            removed = [job.id for job in self._jobs] + list(self._paused)
+            self._jobs.clear()
+            self._paused.clear()
+            self._index.clear(keep=self._current)
+
+        if self._store is not None:
+            self._store.remove(removed)
+        logging.info("Queue cleared")
+
+    def remove_last(self) -> Optional[DownloadJob]:
+        """Rimuove l'ultimo job in attesa (None se la coda è vuota)."""
+        with self._lock:
+            removed = self._jobs.pop() if self._jobs else None
+            if removed is not None:
+                self._index.discard(removed)
+
+        if removed is not None:
+            if self._store is not None:
+                self._store.remove([removed.id])
+            logging.info(f"Removed from queue: {removed.url}")
+        return removed
+
+    def pause(self, job_id: Optional[str] = None) -> bool:
+        """
+        Mette in pausa un job.
+
+        Il job in download si ferma al prossimo progress hook mantenendo
+        .part e frammenti, e il worker passa al job successivo; un job in
+        attesa viene solo spostato tra quelli in pausa.
+
+        Args:
+            job_id: Job da mettere in pausa (None = quello in download)
+
+        Returns:
+            False se il job non è in coda né in download
+        """
+        with self._lock:
+            current = self._current
+            if current is not None and job_id in (None, current.id):
+                self._current_pause.set()
+                logging.info(f"Pause requested: {current.url}", extra={"job_id": current.id})
+                return True
+
+            job = next((j for j in self._jobs if j.id == job_id), None) if job_id else None
+            if job is None:
+                return False
+            self._jobs.remove(job)
+            self._paused[job.id] = job
+
+        if self._store is not None:
+            self._store.transition(job.id, STATE_PAUSED)
+        logging.info(f"Paused queued job: {job.url}", extra={"job_id": job.id})
+        return True
+
+    def resume(self, job_id: Optional[str] = None) -> List[DownloadJob]:
+        """
+        Rimette in testa alla coda job in pausa.
+
+        Se la coda è in esecuzione il worker li prende subito dopo il job
+        corrente, altrimenti partono al prossimo start().
+
+        Args:
+            job_id: Job da riprendere (None = tutti, nell'ordine di pausa)
+
+        Returns:
+            I job ripresi
+        """
+        with self._lock:
+            if job_id is None:
+                resumed = list(self._paused.values())
+                self._paused.clear()
+            else:
+                job = self._paused.pop(job_id, None)
+                resumed = [job] if job is not None else []
+            self._jobs.extendleft(reversed(resumed))
+
+        for job in resumed:
+            job.queued_at = time.monotonic()
+            job.retry_at = 0.0
+            if self._store is not None:
+                self._store.transition(job.id, STATE_QUEUED, detail="resumed")
+        if resumed:
+            self._wakeup.set()
+            logging.info(f"Resumed {len(resumed)} paused jobs")
+        return resumed
+
+    def restore(self) -> List[DownloadJob]:
+        """
+        Rimette in coda i job rimasti in sospeso nello store.
+
+        I job "running" sono stati interrotti (crash o chiusura a metà
+        download): tornano "queued" con le opzioni effettive salvate, così
+        yt-dlp ritrova e riprende il file .part.
+
+        Returns:
+            I job ripristinati, nell'ordine originale
+        """
+        if self._store is None:
+            return []
+
+        restored = []
+        paused = []
+        for row in self._store.pending():
+            job = DownloadJob(
+                url=row["url"],
+                id=row["id"],
+                title=row["title"] or UI_MSG.TITLE_LOADING,
+                mode=row["mode"],
+                quality=row["quality"],
+                output_path=row["output_path"],
+            )
+            if row["state"] == STATE_PAUSED:
+                paused.append(job)
+                continue
+            if row["state"] == STATE_RUNNING:
+                self._store.transition(job.id, STATE_QUEUED, detail="interrupted, restored")
+            restored.append(job)
+
+        with self._lock:
+            self._jobs.extend(restored)
+            self._paused.update((job.id, job) for job in paused)
+            for job in restored + paused:
+                self._index.claim(job)
+
+        if restored or paused:
+            logging.info(f"Restored {len(restored)} queued and {len(paused)} paused jobs from job store")
+        return restored + paused
+
+    # ------------------------------------------------------------------
+    # Fetch titolo
+    # ------------------------------------------------------------------
+
+    def fetch_title_async(self, job: DownloadJob) -> None:
+        """
+        Recupera il titolo del job in background e notifica "queue_changed".
+
+        I fetch sono eseguiti da al più TITLE_FETCH_WORKERS thread, che
+        terminano dopo TITLE_FETCH_IDLE_TIMEOUT secondi senza lavoro: incollare
+        migliaia di URL non crea migliaia di thread.
+        """
+        with self._lock:
+            self._title_jobs.put(job)
+            if self._title_workers >= PERFORMANCE_CONFIG.TITLE_FETCH_WORKERS:
+                return
+            self._title_workers += 1
+
+        threading.Thread(
+            target=self._title_fetch_loop,
+            daemon=True,
+            name="TitleFetchThread"
+        ).start()
+
+    def _title_fetch_loop(self) -> None:
+        """Worker titoli: consuma i job finché resta inattivo troppo a lungo."""
+        while True:
+            try:
+                job = self._title_jobs.get(timeout=PERFORMANCE_CONFIG.TITLE_FETCH_IDLE_TIMEOUT)
+            except queue.Empty:
+                # Controllo sotto lock: un put concorrente vede il contatore aggiornato
+                with self._lock:
+                    if self._title_jobs.empty():
+                        self._title_workers -= 1
+                        return
+                continue
+
+            self._fetch_title_worker(job)
+            del job  # non trattenere l'ultimo job durante l'attesa
+
+    def _fetch_title_worker(self, job: DownloadJob) -> None:
+        """Fetch titolo di un job (nel contesto log del job)."""
+        with (
+            job_context(job_id=job.id, url=job.url),
+            TRACER.span("title_fetch", cat="extract", job=job.id),
+            PROFILER.capture("title_fetch", label=job.url),
+        ):
+            self._fetch_title(job)
+
+    def _fetch_title(self, job: DownloadJob) -> None:
+        """Esegue il fetch del titolo e aggiorna job.title."""
+        import yt_dlp
+
+        try:
+            ydl_opts = {
+                "quiet": True,
+                "no_warnings": True,
+                "noplaylist": True,
+                "skip_download": True,
+                "socket_timeout": PERFORMANCE_CONFIG.TITLE_FETCH_TIMEOUT,
+            }
+
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(job.url, download=False)
+
+            job.title = info.get("title") or job.url
+            logging.info(f"Fetched title: {job.title}", extra={"phase": "title_fetch"})
+
+        except yt_dlp.utils.DownloadError as e:
+            logging.warning(
+                f"Failed to fetch title for {job.url}: {e}",
+                extra={"phase": "title_fetch", "exc_class": type(e).__name__}
+            )
+            job.title = job.url
+
+        except Exception:
+            logging.exception(
+                f"Unexpected error fetching title for {job.url}",
+                extra={"phase": "title_fetch"}
+            )
+            job.title = job.url
+
+        if self._store is not None:
+            self._store.set_title(job.id, job.title)
+        self._on_event("queue_changed", None)
+
+    # ------------------------------------------------------------------
+    # Esecuzione
+    # ------------------------------------------------------------------
+
+    def start(self, mode: str, quality: str, output_path: str) -> bool:
+        """
+        Avvia il worker che scarica tutti i job in coda.
+
+        Args:
+            mode: "video" o "audio" (default per i job senza override)
+            quality: Stringa formato yt-dlp
+            output_path: Cartella di destinazione
+
+        Returns:
+            False se un'esecuzione è già in corso
+        """
+        if self.is_running:
+            return False
+
+        self._cancel_event.clear()
+        self._started_at = time.monotonic()
+        self._run_options = {"mode": mode, "quality": quality, "output_path": output_path}
+        TRACER.start_session()
+
+        self._worker = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name="DownloadWorkerThread"
+        )
+        self._worker.start()
+
+        logging.info("Download queue started")
+        return True
+
+    def cancel(self) -> bool:
+        """
+        Richiede la cancellazione del download corrente e della coda.
+
+        Returns:
+            True se un'esecuzione era in corso
+        """
+        if not self.is_running:
+            return False
+
+        self._cancel_event.set()
+        self._wakeup.set()
+        logging.info("Download cancellation requested")
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attende la fine dell'esecuzione corrente.
+
+        Returns:
+            True se il worker è terminato entro il timeout
+        """
+        if self._worker is not None:
+            self._worker.join(timeout)
+        return not self.is_running
+
+    def _next_job(self) -> Tuple[Optional[DownloadJob], Optional[float]]:
+        """
+        Primo job pronto, saltando i retry non ancora dovuti e i job di
+        host con il circuito aperto.
+
+        Il job ritornato ha già un posto riservato nel circuit breaker
+        (job.slot, liberato da JobRunner.run()).
+
+        Returns:
+            (job, None), oppure (None, secondi al primo job ripartibile) se
+            in coda restano solo job in attesa, oppure (None, None) a coda vuota
+        """
+        with self._lock:
+            if not self._jobs:
+                return None, None
+            now = time.monotonic()
+            earliest: Optional[float] = None
+            blocked: Set[str] = set()  # Host già rifiutati in questa scansione
+
+            # I job in attesa sono di solito pochi: il primo pronto è vicino alla testa
+            for index, job in enumerate(self._jobs):
+                if job.retry_at > now:
+                    ready_at = job.retry_at
+                else:
+                    slot = None if job.host in blocked else self._runner.hosts.try_acquire(job.host)
+                    if slot is not None:
+                        del self._jobs[index]
+                        job.slot = slot
+                        return job, None
+                    blocked.add(job.host)
+                    wait = self._runner.hosts.retry_after(job.host)
+                    ready_at = now + (HOST_HEALTH_CONFIG.BLOCKED_POLL_INTERVAL if wait is None else wait)
+                earliest = ready_at if earliest is None else min(earliest, ready_at)
+            return None, max(0.0, earliest - now)
+
+    def _run(self) -> None:
+        """
+        Worker thread: scarica i job in sequenza.
+
+        Un errore su un job viene loggato e si passa al successivo (il job
+        torna in coda se la RetryPolicy lo prevede); la cancellazione
+        interrompe l'intera esecuzione.
+        """
+        emit = self._on_event
+
+        try:
+            while not self._cancel_event.is_set():
+                self._wakeup.clear()
+                job, wait = self._next_job()
+                if job is None:
+                    if wait is None:
+                        break
+                    # Solo job in attesa (retry o host giù): dorme fino al primo, o a un nuovo job
+                    self._wakeup.wait(wait)
+                    continue
+
+                emit("log", (UI_MSG.LOG_DOWNLOADING.format(job.title), logging.INFO, job.id, job.label))
+                emit("queue_changed", None)
+
+                if not self._run_job(job):
+                    break
+
+            # Fine queue
+            if self._cancel_event.is_set():
+                emit("status", UI_MSG.STATUS_CANCELLED)
+                emit("log", UI_MSG.LOG_QUEUE_CANCELLED)
+            else:
+                emit("status", UI_MSG.STATUS_COMPLETE)
+                emit("log", UI_MSG.LOG_ALL_COMPLETE)
+
+        except Exception as e:
+            logging.exception("Unexpected error in queue worker")
+            emit("status", UI_MSG.STATUS_ERROR.format(str(e)))
+            emit("log", (f"❌ Errore fatale: {e}", logging.ERROR))
+            emit("show_error", ("Errore", str(e)))
+
+        finally:
+            if METRICS_CONFIG.METRICS_ENABLED:
+                METRICS.export()
+            TRACER.dump()
+            emit("done", None)
+            logging.info("Queue worker terminated")
+
+    def _run_job(self, job: DownloadJob) -> bool:
+        """
+        Scarica un singolo job.
+
+        Returns:
+            False se il job è stato cancellato (l'esecuzione va interrotta);
+            un job messo in pausa non interrompe l'esecuzione
+        """
+        emit = self._on_event
+
+        # Attesa in coda: dall'aggiunta (o dall'avvio coda) al dequeue
+        job_metrics = JobMetrics(job_id=job.id, url=job.url)
+        queue_wait = time.monotonic() - max(job.queued_at, self._started_at)
+        job_metrics.add_phase(PHASE_QUEUE_WAIT, queue_wait)
+        TRACER.complete("queue_wait", cat="queue", duration=queue_wait, job=job.id)
+
+        def on_progress(data: Dict[str, Any]) -> None:
+            emit("progress", data)
+
+        def on_status(msg: str) -> None:
+            emit("status", msg)
+            emit("log", (msg, logging.INFO, job.id))
+
+        # Opzioni effettive fissate sul job (e salvate nello store dal runner):
+        # dopo una pausa o un crash riparte con la stessa cartella e lo stesso
+        # formato (ripresa del .part)
+        job.mode = job.mode or self._run_options["mode"]
+        job.quality = job.quality or self._run_options["quality"]
+        job.output_path = job.output_path or self._run_options["output_path"]
+
+        pause_event = threading.Event()
+        with self._lock:
+            self._current = job
+            self._current_pause = pause_event
+
+        outcome: Optional[JobOutcome] = None
+        try:
+            outcome = self._runner.run(
+                job,
+                progress_cb=on_progress,
+                status_cb=on_status,
+                cancel_event=self._cancel_event,
+                pause_event=pause_event,
+                metrics=job_metrics,
+            )
+        finally:
+            status = outcome.status if outcome is not None else None
+            with self._lock:
+                self._current = None
+                self._current_pause = None
+                if status == OUTCOME_PAUSED:
+                    self._paused[job.id] = job
+                elif status == OUTCOME_RETRY:
+                    # Errore transitorio: di nuovo in fondo alla coda, il worker prosegue
+                    self._jobs.append(job)
+                else:
+                    # Un job in pausa o da ritentare resta nell'indice fino al completamento
+                    self._index.discard(job)
+
+        if outcome.status == OUTCOME_SKIPPED:
+            emit("log", (UI_MSG.LOG_ALREADY_ARCHIVED.format(job.title), logging.INFO, job.id, job.label))
+        elif outcome.status == OUTCOME_PAUSED:
+            emit("log", (UI_MSG.LOG_JOB_PAUSED.format(job.title), logging.INFO, job.id, job.label))
+            emit("queue_changed", None)
+        elif outcome.status == OUTCOME_CANCELLED:
+            logging.info("Download cancelled, exiting worker", extra={"job_id": job.id, "phase": "cancelled"})
+            return False
+        elif outcome.status == OUTCOME_RETRY and outcome.decision is not None:
+            decision = outcome.decision
+            emit("log", (
+                UI_MSG.LOG_JOB_RETRY.format(job.attempts + 1, decision.max_attempts, decision.delay, job.title),
+                logging.WARNING, job.id, job.label,
+            ))
+            emit("queue_changed", None)
+        elif outcome.status == OUTCOME_ERROR:
+            emit("log", (f"❌ Errore: {outcome.exc}", logging.ERROR, job.id))
+
+        return True
@@ -7,30 +7,135 @@ Gestisce il download di video e audio tramite yt-dlp con supporto per:
 - Progress tracking in tempo reale
 - Cancellazione download
 - Ottimizzazioni performance (concurrent fragments, debouncing)
+- Metriche per fase (estrazione, trasferimento, post-processing)
+- Cancellazione/pausa immediata anche durante estrazione e FFmpeg
+  (vedi mvd.cancellation)
+- Nomi di output univoci anche tra job paralleli (vedi mvd.naming)
 """
 
+import contextvars
 import os
 import time
 import threading
 import logging
-from typing import Callable, Optional, Dict, Any
-
-import yt_dlp
-
+from typing import Callable, Optional, Dict, Any, List, Sequence, Tuple
+
+from .archive import DownloadArchive
+from .bandwidth import BANDWIDTH
+from .canonical import dedup_key
+from .cancellation import CancelToken, PartialFiles, bind_token, install_process_hook
+from .host_health import host_for_url
+from .naming import OUTPUT_TEMPLATE, OutputName
+from .log_pipeline import current_job_context, job_context
 from .utils import setup_ffmpeg, resource_path, format_bytes, format_time
-from .config import YTDLP_CONFIG, PERFORMANCE_CONFIG, UI_MSG, get_user_agent
+from .config import (
+    BANDWIDTH_CONFIG,
+    CANCELLATION_CONFIG,
+    YTDLP_CONFIG,
+    PERFORMANCE_CONFIG,
+    METRICS_CONFIG,
+    UI_MSG,
+    get_user_agent,
+)
+from .profiling import profiled
+from .tracing import TRACER, Span
+from .metrics import (
+    METRICS,
+    JobMetrics,
+    PHASE_EXTRACT,
+    PHASE_TRANSFER,
+    PHASE_POSTPROCESS,
+    PHASE_FINALIZE,
+)
 from .exceptions import (
+    AlreadyDownloadedError,
     DownloadCancelledError,
+    DownloadPausedError,
     FFmpegNotFoundError,
+    DownloadError as MVDDownloadError,
     wrap_ytdlp_exception,
     NetworkError,
 )
 
 
+# ============================================================================
+# YT-DLP LOGGER
+# ============================================================================
+
+class _YDLLogger:
+    """
+    Logger passato a yt-dlp (opzione "logger").
+
+    Inoltra warning ed errori al logging dell'applicazione e conta i
+    messaggi di retry ("Retrying ...") nelle metriche del job. I messaggi
+    di debug/screen vengono solo ispezionati, mai scritti.
+    """
+
+    def __init__(self, job_metrics: JobMetrics) -> None:
+        self._metrics = job_metrics
+
+    def _count_retry(self, msg: str) -> None:
+        if "Retrying" in msg:
+            self._metrics.retries += 1
+
+    def debug(self, msg: str) -> None:
+        self._count_retry(msg)
+
+    def info(self, msg: str) -> None:
+        self._count_retry(msg)
+
+    def warning(self, msg: str) -> None:
+        self._count_retry(msg)
+        logging.warning(f"yt-dlp: {msg}")
+
+    def error(self, msg: str) -> None:
+        # L'errore arriva anche come eccezione: qui basta il debug
+        logging.debug(f"yt-dlp: {msg}")
+
+
+# ============================================================================
+# PROGRESS
+# ============================================================================
+
+def build_progress_data(d: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte un dict di progresso yt-dlp ("downloading") nei dati per la UI.
+
+    Args:
+        d: Dizionario progresso passato da yt-dlp al progress hook
+
+    Returns:
+        Dict con percent, downloaded, total, speed, eta (stringhe formattate)
+
+    Examples:
+        >>> build_progress_data({"downloaded_bytes": 1048576, "total_bytes": 4194304, "speed": 524288, "eta": 6})
+        {'percent': 25.0, 'downloaded': '1.00 MB', 'total': '4.00 MB', 'speed': '512.00 KB/s', 'eta': '00:06'}
+    """
+    total = d.get("total_bytes") or d.get("total_bytes_estimate")
+    downloaded = d.get("downloaded_bytes", 0)
+    speed = d.get("speed")
+    eta = d.get("eta")
+
+    # Calcola percentuale
+    if total and total > 0:
+        percent = (downloaded / total * 100.0)
+    else:
+        percent = 0.0
+
+    return {
+        "percent": round(percent, 1),
+        "downloaded": format_bytes(int(downloaded)) if downloaded else "0 B",
+        "total": format_bytes(int(total)) if total else "?",
+        "speed": (format_bytes(int(speed)) + "/s") if speed else "?",
+        "eta": format_time(int(eta)) if eta is not None else "--:--",
+    }
+
+
 # ============================================================================
 # DOWNLOAD FUNCTION
 # ============================================================================
 
+@profiled("download_video")
 def download_video(
     url: str,
     mode: str,
@@ -39,6 +144,10 @@ def download_video(
     progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
     status_cb: Optional[Callable[[str], None]] = None,
     cancel_event: Optional[threading.Event] = None,
+    metrics: Optional[JobMetrics] = None,
+    pause_event: Optional[threading.Event] = None,
+    archive: Optional[DownloadArchive] = None,
+    retries: Optional[int] = None,
 ) -> None:
     """
     Scarica video o audio da URL usando yt-dlp.
@@ -59,9 +168,20 @@ def download_video(
             - eta: Tempo rimanente stimato (str formattato)
         status_cb: Callback per messaggi di stato (str)
         cancel_event: Event per cancellare il download
+        metrics: Metriche del job da completare (es. con l'attesa in coda
+            già registrata). Se None ne viene creata una nuova. Il job
+            concluso viene sempre registrato in METRICS.
+        pause_event: Event per mettere in pausa il download (file parziali
+            mantenuti per la ripresa)
+        archive: Archivio dei download: yt-dlp salta i video già presenti
+            e registra quelli completati (con titolo e file finale)
+        retries: Limite ai retry di yt-dlp (richieste e frammenti), es.
+            ridotto per un host con errori recenti (None = YTDLP_CONFIG)
 
     Raises:
         DownloadCancelledError: Se download viene annullato dall'utente
+        DownloadPausedError: Se download viene messo in pausa
+        AlreadyDownloadedError: Se il video è già nell'archivio
         FFmpegNotFoundError: Se FFmpeg non è disponibile
         NetworkError: Se ci sono problemi di connessione
         DownloadError: Per altri errori durante il download
@@ -90,6 +210,12 @@ def download_video(
         - Per audio: estrae MP3 a 192kbps
         - Usa concurrent fragment downloads (4 thread) per velocità ottimale
         - Progress callback ha debouncing (100ms) per evitare saturazione UI
+        - Le fasi misurate sono extract, transfer, postprocess, finalize
+        - Se il nome dal titolo è già usato (file esistente o altro job in
+          corso) il file diventa "Titolo (1).mp4", "Titolo (2).mp4", ...
+        - I byte ricevuti passano dai limiti di banda del processo
+          (mvd.bandwidth.BANDWIDTH): con un limite attivo il progress hook
+          attende prima di restituire il controllo a yt-dlp
     """
     # Setup FFmpeg (PATH) + path esplicito per yt-dlp
     if not setup_ffmpeg():
@@ -118,6 +244,57 @@ def download_video(
         logging.error(f"Cannot create output directory {output_path}: {e}")
         raise
 
+    # Metriche del job (fasi, byte, retry)
+    job_metrics = metrics if metrics is not None else JobMetrics(url=url)
+    if job_metrics.job_id is None:
+        job_metrics.job_id = current_job_context().get("job_id")
+
+    # Span trace aperti (fase corrente, frammento, post-processor)
+    spans: Dict[str, Optional[Span]] = {"phase": None, "fragment": None, "pp": None}
+    last_fragment_index: Optional[int] = None
+
+    def enter_phase(phase: str) -> None:
+        """Cambia fase del job (metriche + span trace)."""
+        if phase == job_metrics.current_phase:
+            return
+        job_metrics.enter(phase)
+        TRACER.end(spans["phase"])
+        spans["phase"] = TRACER.begin(phase, cat="download", job=job_metrics.job_id)
+
+    def trace_fragment(index: int, count: Optional[int]) -> None:
+        """
+        Span per frammento (HLS/DASH): va dal completamento del frammento
+        precedente al successivo, sul thread che lo riporta.
+        """
+        nonlocal last_fragment_index
+        if index == last_fragment_index:
+            return
+        last_fragment_index = index
+        TRACER.end(spans["fragment"])
+        spans["fragment"] = TRACER.begin(
+            "fragment", cat="fragment", job=job_metrics.job_id, index=index, count=count
+        )
+
+    def close_spans() -> None:
+        for key in spans:
+            TRACER.end(spans[key])
+            spans[key] = None
+
+    # Cancellazione/pausa raggiungibili da ogni fase + file da ripulire
+    token = CancelToken(cancel_event, pause_event)
+    partials = PartialFiles()
+
+    # Nome di output riservato dopo l'estrazione (stesso video = stesso nome)
+    output_name = OutputName(output_path, owner=dedup_key(url))
+
+    # Limiti di banda: totale, per host e per job
+    job_bandwidth = BANDWIDTH.open_job(job_metrics.job_id or dedup_key(url), host_for_url(url))
+
+    def match_filter(info: Dict[str, Any], incomplete: bool = False) -> Optional[str]:
+        """Checkpoint tra estrazione e download (None = accetta il video)."""
+        token.check()
+        return None
+
     # Progress tracking con debouncing
     last_progress_time = 0.0
 
@@ -133,17 +310,24 @@ def download_video(
 
         Raises:
             DownloadCancelledError: Se cancel_event è impostato
+            DownloadPausedError: Se pause_event è impostato
         """
         nonlocal last_progress_time
 
-        # Check cancellazione
-        if cancel_event and cancel_event.is_set():
-            logging.info("Download cancellation requested")
-            raise DownloadCancelledError("Download cancelled by user")
+        # Check cancellazione/pausa: l'eccezione interrompe yt-dlp (in pausa
+        # .part e frammenti restano per la ripresa)
+        token.check()
 
         status = d.get("status")
 
         if status == "downloading":
+            enter_phase(PHASE_TRANSFER)
+            partials.add_download(d.get("filename"))
+            # Rallenta il thread di yt-dlp se un limite di banda è superato
+            job_bandwidth.on_progress(d, token.check)
+            if TRACER.enabled and d.get("fragment_index") is not None:
+                trace_fragment(d["fragment_index"], d.get("fragment_count"))
+
             # Debouncing: aggiorna solo ogni PROGRESS_UPDATE_INTERVAL
             current_time = time.time()
             if current_time - last_progress_time < PERFORMANCE_CONFIG.PROGRESS_UPDATE_INTERVAL:
@@ -151,36 +335,46 @@ def download_video(
 
             last_progress_time = current_time
 
-            # Estrai informazioni
-            total = d.get("total_bytes") or d.get("total_bytes_estimate")
-            downloaded = d.get("downloaded_bytes", 0)
-            speed = d.get("speed")
-            eta = d.get("eta")
-
-            # Calcola percentuale
-            if total and total > 0:
-                percent = (downloaded / total * 100.0)
-            else:
-                percent = 0.0
-
-            # Prepara dati per callback
-            progress_data = {
-                "percent": round(percent, 1),
-                "downloaded": format_bytes(int(downloaded)) if downloaded else "0 B",
-                "total": format_bytes(int(total)) if total else "?",
-                "speed": (format_bytes(int(speed)) + "/s") if speed else "?",
-                "eta": format_time(int(eta)) if eta is not None else "--:--",
-            }
-
             # Invia callback
             if progress_cb:
-                progress_cb(progress_data)
+                progress_cb(build_progress_data(d))
 
         elif status == "finished":
             # Download finito, inizia elaborazione
+            job_metrics.bytes += int(d.get("total_bytes") or d.get("downloaded_bytes") or 0)
+            enter_phase(PHASE_FINALIZE)
             if status_cb:
                 status_cb(UI_MSG.STATUS_PROCESSING)
-            logging.info("Download finished, starting post-processing")
+            logging.info(
+                "Download finished, starting post-processing",
+                extra={"phase": "postprocess", "bytes": job_metrics.bytes}
+            )
+
+    def postprocessor_hook(d: Dict[str, Any]) -> None:
+        """Hook post-processor yt-dlp: misura il tempo speso in FFmpeg."""
+        if d.get("status") == "started":
+            # Checkpoint prima di avviare FFmpeg; durante, il processo viene
+            # terminato direttamente dal token
+            token.check()
+            partials.add_postprocessed((d.get("info_dict") or {}).get("filepath"))
+            enter_phase(PHASE_POSTPROCESS)
+            TRACER.end(spans["pp"])
+            spans["pp"] = TRACER.begin(
+                d.get("postprocessor") or "postprocessor", cat="ffmpeg", job=job_metrics.job_id
+            )
+        elif d.get("status") == "finished":
+            TRACER.end(spans["pp"])
+            spans["pp"] = None
+            enter_phase(PHASE_FINALIZE)
+            # MoveFiles è sempre l'ultimo post-processor: il file è quello finale
+            info = d.get("info_dict") or {}
+            if archive is not None and d.get("postprocessor") == "MoveFiles" and info.get("id"):
+                extractor = info.get("extractor_key") or info.get("ie_key") or ""
+                filepath = info.get("filepath")
+                if filepath:
+                    archive.record_download(extractor.lower(), str(info["id"]), info.get("title"), filepath)
+                else:
+                    archive.add(extractor.lower(), str(info["id"]), title=info.get("title"))
 
     # ========================================================================
     # Configurazione yt-dlp (BASE)
@@ -188,17 +382,23 @@ def download_video(
 
     ydl_opts: Dict[str, Any] = {
         # Output template
-        "outtmpl": os.path.join(output_path, "%(title)s.%(ext)s"),
+        "outtmpl": os.path.join(output_path, OUTPUT_TEMPLATE),
 
         # Download settings
         "noplaylist": True,  # Solo singolo video, non playlist
+        "continuedl": True,  # Riprende i .part lasciati da un crash o da una chiusura
+        "nopart": False,
 
         # Progress
         "progress_hooks": [progress_hook],
+        "postprocessor_hooks": [postprocessor_hook],
+        "match_filter": match_filter,
+        "noprogress": True,  # Niente rendering testuale del progresso
 
         # Logging
         "quiet": True,
         "no_warnings": True,
+        "logger": _YDLLogger(job_metrics),
 
         # Merge format
         "merge_output_format": "mp4",
@@ -225,13 +425,24 @@ def download_video(
         "http_chunk_size": YTDLP_CONFIG.HTTP_CHUNK_SIZE,
 
         # Retry settings
-        "retries": YTDLP_CONFIG.RETRIES,
-        "fragment_retries": YTDLP_CONFIG.FRAGMENT_RETRIES,
+        "retries": YTDLP_CONFIG.RETRIES if retries is None else min(retries, YTDLP_CONFIG.RETRIES),
+        "fragment_retries": YTDLP_CONFIG.FRAGMENT_RETRIES if retries is None else min(retries, YTDLP_CONFIG.FRAGMENT_RETRIES),
 
         # Timeout
         "socket_timeout": YTDLP_CONFIG.SOCKET_TIMEOUT,
     })
 
+    # Con un limite di banda attivo blocchi piccoli e fissi: yt-dlp li
+    # ingrandirebbe fino a MB, con attese (e progresso) a scatti
+    if BANDWIDTH.enabled:
+        ydl_opts["buffersize"] = BANDWIDTH_CONFIG.BLOCK_SIZE
+        ydl_opts["noresizebuffer"] = True
+
+    # Archivio: controllo prima dell'estrazione (id dall'URL) e dopo
+    ydl_archive = archive.ydl_archive() if archive is not None else None
+    if ydl_archive is not None:
+        ydl_opts["download_archive"] = ydl_archive
+
     # Cookies da browser: DISABILITATO
     # Causa problemi se Chrome è aperto (database bloccato)
     # La maggior parte dei video YouTube funziona senza cookies
@@ -275,7 +486,7 @@ def download_video(
             ]
         }
 
-        logging.info(f"Video mode: MP4 with quality={quality}")
+        logging.info(f"Video mode: MP4 with quality={quality}", extra={"phase": "setup"})
 
     elif mode == "audio":
         # AUDIO MODE: estrazione MP3
@@ -290,7 +501,7 @@ def download_video(
             }
         ]
 
-        logging.info("Audio mode: MP3 extraction at 192kbps")
+        logging.info("Audio mode: MP3 extraction at 192kbps", extra={"phase": "setup"})
 
     else:
         # Modalità non valida
@@ -302,58 +513,191 @@ def download_video(
     # DOWNLOAD
     # ========================================================================
 
-    try:
-        # Notifica inizio
-        if status_cb:
-            status_cb(UI_MSG.STATUS_DOWNLOADING)
-        logging.info(f"Starting download: {url} (mode={mode})")
+    def outcome(phase: str, exc: Optional[BaseException] = None) -> Dict[str, Any]:
+        """Chiude le metriche del job e ritorna i campi per il log finale."""
+        close_spans()
+        job_metrics.finish(phase)
+        return {
+            "phase": phase,
+            "bytes": job_metrics.bytes,
+            "duration": round(job_metrics.duration, 3),
+            "exc_class": type(exc).__name__ if exc is not None else None,
+        }
 
-        # Download con yt-dlp
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+    # Import differito: la GUI si apre senza caricare yt-dlp, che viene
+    # precaricato in background dopo il primo disegno (vedi preload_modules)
+    import yt_dlp
 
-        # Notifica completamento
-        if status_cb:
-            status_cb(UI_MSG.STATUS_COMPLETE)
-        logging.info(f"Download completed: {url}")
+    completed = paused = False
 
-    except DownloadCancelledError:
-        # Download annullato dall'utente
-        if status_cb:
-            status_cb(UI_MSG.STATUS_CANCELLED)
-        logging.info("Download cancelled by user")
-        raise
+    with job_context(url=url):
+        try:
+            # Notifica inizio
+            if status_cb:
+                status_cb(UI_MSG.STATUS_DOWNLOADING)
+            logging.info(f"Starting download: {url} (mode={mode})", extra={"phase": "start"})
 
-    except yt_dlp.utils.DownloadError as e:
-        # Errore specifico yt-dlp: converti in eccezione MVD appropriata
-        logging.error(f"yt-dlp download error for {url}: {e}")
-        mvd_exception = wrap_ytdlp_exception(e)
+            # Download con yt-dlp (prima fase: estrazione info)
+            enter_phase(PHASE_EXTRACT)
+            _run_ydl(yt_dlp, ydl_opts, url, output_path, token, partials, [output_name.preprocessor()])
+            if ydl_archive is not None and ydl_archive.hits:
+                raise AlreadyDownloadedError(f"Already in download archive: {ydl_archive.hits[0]}")
+            completed = True
 
-        if status_cb:
-            status_cb(UI_MSG.STATUS_ERROR.format(str(e)))
+            # Notifica completamento
+            if status_cb:
+                status_cb(UI_MSG.STATUS_COMPLETE)
+            logging.info(f"Download completed: {url}", extra=outcome("complete"))
 
-        raise mvd_exception
+        except DownloadPausedError as e:
+            # Pausa: i file parziali (e il nome riservato) restano per la ripresa
+            paused = True
+            if status_cb:
+                status_cb(UI_MSG.STATUS_PAUSED)
+            logging.info("Download paused by user", extra=outcome("paused", e))
+            raise
 
-    except (ConnectionError, TimeoutError) as e:
-        # Errori di rete
-        logging.error(f"Network error downloading {url}: {e}")
-        if status_cb:
-            status_cb(UI_MSG.STATUS_ERROR.format("Network error"))
-        raise NetworkError(f"Network error: {e}") from e
+        except AlreadyDownloadedError as e:
+            # Saltato da yt-dlp: video già nell'archivio
+            if status_cb:
+                status_cb(UI_MSG.STATUS_ARCHIVED)
+            logging.info(str(e), extra=outcome("archived", e))
+            raise
 
-    except FileNotFoundError as e:
-        # FFmpeg non trovato o file output non creato
-        logging.error(f"File not found error: {e}")
-        if status_cb:
-            status_cb(UI_MSG.STATUS_ERROR.format("File not found"))
-        raise
+        except DownloadCancelledError as e:
+            # Download annullato dall'utente
+            if status_cb:
+                status_cb(UI_MSG.STATUS_CANCELLED)
+            logging.info("Download cancelled by user", extra=outcome("cancelled", e))
+            raise
 
-    except Exception as e:
-        # Errore generico: logga con traceback completo
-        logging.exception(f"Unexpected error downloading {url}")
-        if status_cb:
-            status_cb(UI_MSG.STATUS_ERROR.format(str(e)))
-        raise
+        except yt_dlp.utils.DownloadError as e:
+            # Errore specifico yt-dlp: converti in eccezione MVD appropriata
+            mvd_exception = wrap_ytdlp_exception(e)
+            logging.error(f"yt-dlp download error for {url}: {e}", extra=outcome("error", mvd_exception))
+
+            if status_cb:
+                status_cb(UI_MSG.STATUS_ERROR.format(str(e)))
+
+            raise mvd_exception
+
+        except (ConnectionError, TimeoutError) as e:
+            # Errori di rete
+            logging.error(f"Network error downloading {url}: {e}", extra=outcome("error", e))
+            if status_cb:
+                status_cb(UI_MSG.STATUS_ERROR.format("Network error"))
+            raise NetworkError(f"Network error: {e}") from e
+
+        except FileNotFoundError as e:
+            # FFmpeg non trovato o file output non creato
+            logging.error(f"File not found error: {e}", extra=outcome("error", e))
+            if status_cb:
+                status_cb(UI_MSG.STATUS_ERROR.format("File not found"))
+            raise
+
+        except Exception as e:
+            # Errore generico: logga con traceback completo
+            logging.exception(f"Unexpected error downloading {url}", extra=outcome("error", e))
+            if status_cb:
+                status_cb(UI_MSG.STATUS_ERROR.format(str(e)))
+            raise
+
+        finally:
+            job_bandwidth.close()
+            if completed:
+                output_name.commit()
+            elif not paused:
+                output_name.release()
+            if METRICS_CONFIG.METRICS_ENABLED:
+                METRICS.record(job_metrics)
+                METRICS.maybe_export()
+
+
+# ============================================================================
+# ESECUZIONE YT-DLP ANNULLABILE
+# ============================================================================
+
+# Thread yt-dlp ancora vivi dopo un annullamento, per (url, cartella)
+_previous_runs: Dict[Tuple[str, str], threading.Thread] = {}
+_previous_runs_lock = threading.Lock()
+
+
+def _run_ydl(
+    yt_dlp: Any,
+    ydl_opts: Dict[str, Any],
+    url: str,
+    output_path: str,
+    token: CancelToken,
+    partials: PartialFiles,
+    preprocessors: Sequence[Any] = (),
+) -> None:
+    """
+    Esegue ydl.download in un thread dedicato e attende il token.
+
+    I preprocessors vengono aggiunti a yt-dlp nella fase "after_filter"
+    (dopo match_filter e archivio, prima della scelta del formato).
+
+    Alla cancellazione (o pausa) ritorna subito sollevando l'eccezione del
+    token e termina i processi FFmpeg del job; il thread yt-dlp si chiude da
+    solo al prossimo checkpoint e, se il job è stato annullato, applica la
+    policy sui file parziali quando non li usa più.
+
+    Raises:
+        DownloadCancelledError / DownloadPausedError: Richiesta dal token
+        Exception: Qualsiasi errore sollevato da yt-dlp
+    """
+    install_process_hook()
+    key = (url, os.path.abspath(output_path))
+
+    # Un job ripreso subito dopo pausa/annullamento non deve scrivere sullo
+    # stesso .part del thread precedente ancora in chiusura
+    with _previous_runs_lock:
+        previous = _previous_runs.get(key)
+    if previous is not None and previous.is_alive():
+        logging.info("Waiting for previous yt-dlp run of this job to stop")
+        deadline = time.monotonic() + CANCELLATION_CONFIG.PREVIOUS_RUN_TIMEOUT
+        while previous.is_alive() and not token.requested and time.monotonic() < deadline:
+            previous.join(CANCELLATION_CONFIG.POLL_INTERVAL)
+    token.check()
+
+    done = threading.Event()
+    errors: List[BaseException] = []
+
+    def run() -> None:
+        bind_token(token)
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                for pp in preprocessors:
+                    ydl.add_post_processor(pp, when="after_filter")
+                ydl.download([url])
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            done.set()
+            if token.cancelled:
+                partials.cleanup()
+            with _previous_runs_lock:
+                if _previous_runs.get(key) is threading.current_thread():
+                    del _previous_runs[key]
+
+    # Stesso contesto (job_id/url nei log) anche nel thread yt-dlp
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(run,), daemon=True, name="YDLThread")
+    with _previous_runs_lock:
+        _previous_runs[key] = thread
+    thread.start()
+
+    if not token.wait(done):
+        token.kill_processes()
+        logging.info("Cancellation requested during yt-dlp run, not waiting for it to finish")
+        token.check()
+
+    if errors:
+        error = errors[0]
+        # Un errore di yt-dlp causato dal kill di FFmpeg è in realtà la cancellazione
+        if token.requested and not isinstance(error, MVDDownloadError):
+            token.check()
+        raise error
 
 
 # ============================================================================
@@ -384,6 +728,8 @@ def get_video_info(url: str, timeout: int = 10) -> Optional[Dict[str, Any]]:
     Note:
         Può fallire per video privati, rimossi, o siti non supportati
     """
+    import yt_dlp
+
     try:
         ydl_opts = {
             "quiet": True,
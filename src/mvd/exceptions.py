@@ -5,6 +5,8 @@ Questo modulo definisce una gerarchia di eccezioni specifiche
 per gestire errori in modo preciso e fornire feedback dettagliato.
 """
 
+import re
+
 
 class MVDError(Exception):
     """
@@ -35,6 +37,28 @@ class DownloadCancelledError(DownloadError):
     pass
 
 
+class DownloadPausedError(DownloadError):
+    """
+    Download messo in pausa dall'utente.
+
+    Come l'annullamento interrompe il trasferimento, ma i file .part e i
+    frammenti restano su disco: alla ripresa yt-dlp continua dall'ultimo
+    byte o frammento scaricato.
+    """
+    pass
+
+
+class AlreadyDownloadedError(DownloadError):
+    """
+    Video già presente nell'archivio dei download.
+
+    Sollevata da download_video quando yt-dlp salta il video perché
+    registrato nell'archivio (vedi mvd.archive): non è un errore, il job
+    va concluso come "saltato".
+    """
+    pass
+
+
 class NetworkError(DownloadError):
     """
     Errore di rete durante il download.
@@ -49,6 +73,16 @@ class NetworkError(DownloadError):
     pass
 
 
+class RateLimitedError(NetworkError):
+    """
+    Il sito ha limitato le richieste (HTTP 429 Too Many Requests).
+
+    Errore transitorio come NetworkError, ma segnala anche di ridurre i
+    download contemporanei verso quell'host (vedi mvd.host_health).
+    """
+    pass
+
+
 class TitleFetchError(DownloadError):
     """
     Impossibile recuperare il titolo del video.
@@ -183,10 +217,38 @@ class SettingsError(MVDError):
     pass
 
 
+class JobNotFoundError(MVDError):
+    """
+    Job inesistente (o già rimosso dallo storico).
+
+    Examples:
+        >>> raise JobNotFoundError("Unknown job: a1b2c3d4")
+    """
+    pass
+
+
+class JobStateError(MVDError):
+    """
+    Operazione non ammessa nello stato corrente del job.
+
+    Sollevata, ad esempio, cambiando la priorità di un job già avviato
+    o annullando un job concluso.
+
+    Examples:
+        >>> raise JobStateError("Job a1b2c3d4 is already complete")
+    """
+    pass
+
+
 # ============================================================================
 # EXCEPTION HELPERS
 # ============================================================================
 
+# HTTP 429 e HTTP 408/5xx (con i messaggi equivalenti)
+_RATE_LIMITED = re.compile(r"http error 429\b|too many requests")
+_TRANSIENT_HTTP = re.compile(r"http error (?:408|5\d\d)\b|temporarily unavailable")
+
+
 def wrap_ytdlp_exception(exc: Exception) -> DownloadError:
     """
     Converte eccezioni yt-dlp in eccezioni MVD appropriate.
@@ -206,6 +268,13 @@ def wrap_ytdlp_exception(exc: Exception) -> DownloadError:
     """
     exc_str = str(exc).lower()
 
+    # Errori HTTP transitori (prima del controllo "unavailable": un 503
+    # "Service Unavailable" non riguarda il video)
+    if _RATE_LIMITED.search(exc_str):
+        return RateLimitedError(str(exc))
+    if _TRANSIENT_HTTP.search(exc_str):
+        return NetworkError(str(exc))
+
     # Video non disponibile
     if any(keyword in exc_str for keyword in ["private", "unavailable", "removed", "deleted", "blocked"]):
         return VideoUnavailableError(str(exc))
@@ -10,14 +10,19 @@ import os
 import threading
 import queue
 import logging
-from typing import Dict, Any, Callable, Optional, Tuple
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
 import customtkinter as ctk
-import pyperclip
 from tkinter import filedialog, messagebox
 
-from .downloader import download_video
-from .utils import is_valid_url, resource_path
+from .download_queue import DownloadQueue
+from .archive import DownloadArchive
+from .job_store import JobStore
+from .log_view import LogBuffer, format_entries, level_from_name, text_lines
+from .profiling import profiled
+from .tracing import TRACER
+from .ui_monitor import OVERLAY_ON_START, UI_MONITOR
+from .utils import is_valid_url, preload_modules, resource_path
 from .config import (
     APP_TITLE,
     APP_VERSION,
@@ -29,17 +34,16 @@ from .config import (
     QUALITY_PRESETS,
     FORMAT_OPTIONS,
     PERFORMANCE_CONFIG,
+    LOG_CONFIG,
+    UI_MONITOR_CONFIG,
     KEYBOARD,
-    get_resolution_height,
+    quality_to_ydl_format,
     get_status_color,
 )
 from .exceptions import (
-    DownloadCancelledError,
     TitleFetchError,
     InvalidURLError,
 )
-from . import updater
-
 # Configura tema CustomTkinter
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -85,21 +89,43 @@ class VideoDownloaderGUI(ctk.CTk):
         # Thread-safe UI queue per comunicazione worker->UI
         self._uiq: queue.Queue[Tuple[str, Any]] = queue.Queue()
 
-        # Cancel event e stato download
-        self._cancel_event: threading.Event = threading.Event()
+        # Stato download
         self._is_downloading: bool = False
 
-        # Download queue con thread lock per sicurezza
-        self._download_queue: list[Dict[str, str]] = []
-        self._queue_lock: threading.Lock = threading.Lock()
+        # Download queue: eventi del worker inoltrati alla UI queue,
+        # job salvati su SQLite per sopravvivere a crash e chiusure
+        self._queue: DownloadQueue = DownloadQueue(
+            on_event=lambda kind, payload: self._uiq.put((kind, payload)),
+            store=JobStore.open_default(),
+            archive=DownloadArchive.open_default(),
+        )
+
+        # Log GUI: ring buffer limitato + contatore righe nel widget
+        self._log_buffer: LogBuffer = LogBuffer()
+        self._log_buffer.min_level = level_from_name(LOG_CONFIG.LOG_VIEW_DEFAULT_LEVEL)
+        self._log_box_lines: int = 0
+        self._log_scroll_pending: bool = False
+        self._log_job_labels: Dict[str, str] = {}
+
+        # Overlay debug del monitor UI (creato al primo toggle)
+        self._monitor_overlay: Optional[ctk.CTkLabel] = None
+        self._monitor_overlay_visible: bool = False
+        self._monitor_overlay_after: Optional[str] = None
 
         # Inizializza variabili e UI
         self._init_vars()
         self._build_ui()
         self._setup_keyboard_shortcuts()
+        self._restore_jobs()
 
-        # Avvia polling UI queue
+        # Avvia polling UI queue e heartbeat del monitor lag
         self.after(PERFORMANCE_CONFIG.UI_POLL_INTERVAL_MS, self._drain_ui_queue)
+        UI_MONITOR.start(self)
+        if OVERLAY_ON_START:
+            self.toggle_ui_monitor_overlay()
+
+        # Moduli pesanti (yt-dlp, updater, clipboard) caricati dopo il primo disegno
+        self.after_idle(self.after, PERFORMANCE_CONFIG.PRELOAD_DELAY_MS, self._preload_modules)
 
         # Focus sull'input URL
         try:
@@ -120,6 +146,8 @@ class VideoDownloaderGUI(ctk.CTk):
         self.path_var = ctk.StringVar(value=DEFAULT_DOWNLOAD_PATH)
         self.status_var = ctk.StringVar(value=UI_MSG.STATUS_READY)
         self.details_var = ctk.StringVar(value="")
+        self.log_level_var = ctk.StringVar(value=LOG_CONFIG.LOG_VIEW_DEFAULT_LEVEL)
+        self.log_job_var = ctk.StringVar(value=UI_MSG.LBL_LOG_ALL_JOBS)
 
     # ========================================================================
     # UI BUILDING
@@ -332,7 +360,7 @@ class VideoDownloaderGUI(ctk.CTk):
         self.btn_choose_folder.pack(side="right", padx=12)
 
     def _build_actions(self) -> None:
-        """Costruisce frame azioni: Download, Annulla, Progress bar."""
+        """Costruisce frame azioni: Download, Annulla, Pausa/Riprendi, Progress bar."""
         frame = self._create_frame(
             corner_radius=UI_STYLE.FRAME_RADIUS,
             pady=12,
@@ -340,7 +368,7 @@ class VideoDownloaderGUI(ctk.CTk):
             fill="x"
         )
 
-        # Bottoni Download e Annulla
+        # Bottoni Download, Annulla, Pausa e Riprendi
         btn_frame = ctk.CTkFrame(frame, fg_color="transparent")
         btn_frame.pack(pady=(UI_LAYOUT.SECTION_PADDING_Y, 8))
 
@@ -368,6 +396,27 @@ class VideoDownloaderGUI(ctk.CTk):
         )
         self.btn_cancel.pack(side="left", padx=UI_LAYOUT.BUTTON_SPACING)
 
+        # Pausa/ripresa del singolo job (i file parziali restano su disco)
+        self.btn_pause = self._mk_btn(
+            btn_frame,
+            text=UI_MSG.BTN_PAUSE,
+            width=120,
+            height=UI_STYLE.BTN_HEIGHT_BIG,
+            radius=UI_STYLE.BTN_RADIUS_BIG,
+            command=self.pause_download,
+        )
+        self.btn_pause.pack(side="left", padx=UI_LAYOUT.BUTTON_SPACING)
+
+        self.btn_resume = self._mk_btn(
+            btn_frame,
+            text=UI_MSG.BTN_RESUME,
+            width=120,
+            height=UI_STYLE.BTN_HEIGHT_BIG,
+            radius=UI_STYLE.BTN_RADIUS_BIG,
+            command=self.resume_downloads,
+        )
+        self.btn_resume.pack(side="left", padx=UI_LAYOUT.BUTTON_SPACING)
+
         # Progress bar
         self.progress = ctk.CTkProgressBar(
             frame,
@@ -467,12 +516,38 @@ class VideoDownloaderGUI(ctk.CTk):
             expand=True
         )
 
+        log_header = ctk.CTkFrame(right, fg_color="transparent")
+        log_header.pack(padx=10, pady=(10, 6), fill="x")
+
         ctk.CTkLabel(
-            right,
+            log_header,
             text=UI_MSG.LBL_LOG,
             font=("Segoe UI", UI_LAYOUT.FONT_LABEL, "bold"),
             text_color=COLORS.TEXT_PRIMARY
-        ).pack(anchor="w", padx=10, pady=(10, 6))
+        ).pack(side="left")
+
+        # Filtri log: job e livello minimo
+        self.log_job_box = ctk.CTkComboBox(
+            log_header,
+            values=[UI_MSG.LBL_LOG_ALL_JOBS],
+            variable=self.log_job_var,
+            width=160,
+            state="readonly",
+            command=lambda _: self._on_log_filter_changed(),
+            font=("Segoe UI", UI_LAYOUT.FONT_LOG)
+        )
+        self.log_job_box.pack(side="right")
+
+        self.log_level_box = ctk.CTkComboBox(
+            log_header,
+            values=list(LOG_CONFIG.LOG_VIEW_LEVELS),
+            variable=self.log_level_var,
+            width=100,
+            state="readonly",
+            command=lambda _: self._on_log_filter_changed(),
+            font=("Segoe UI", UI_LAYOUT.FONT_LOG)
+        )
+        self.log_level_box.pack(side="right", padx=(0, UI_LAYOUT.BUTTON_SPACING))
 
         self.log_box = ctk.CTkTextbox(
             right,
@@ -608,6 +683,7 @@ class VideoDownloaderGUI(ctk.CTk):
         self.bind(KEYBOARD.CANCEL, lambda _: self.cancel_download())
         self.bind(KEYBOARD.COPY_LOG, lambda _: self.copy_log())
         self.bind(KEYBOARD.REFRESH, lambda _: self._render_queue())
+        self.bind(KEYBOARD.TOGGLE_UI_MONITOR, lambda _: self.toggle_ui_monitor_overlay())
 
         logging.info("Keyboard shortcuts configured")
 
@@ -615,18 +691,104 @@ class VideoDownloaderGUI(ctk.CTk):
     # RENDERING & DISPLAY
     # ========================================================================
 
-    def _log(self, msg: str) -> None:
+    @UI_MONITOR.timed("log")
+    def _log(
+        self,
+        msg: str,
+        level: int = logging.INFO,
+        job: Optional[str] = None,
+        job_label: Optional[str] = None,
+    ) -> None:
         """
         Aggiunge messaggio al log box.
 
+        Il messaggio viene registrato nel ring buffer e, se passa i filtri
+        correnti, aggiunto al widget. Il widget viene accorciato a blocchi
+        di LOG_VIEW_TRIM_BATCH righe e lo scroll avviene una volta sola
+        per ciclo idle, non a ogni riga.
+
         Args:
             msg: Messaggio da loggare
+            level: Livello logging della riga
+            job: Id del job a cui appartiene la riga (None se globale)
+            job_label: Etichetta del job per il filtro
 
         Thread safety: Safe da chiamare da main thread
         """
-        self.log_box.insert("end", f"{msg}\n")
+        known_job = job is None or job in self._log_job_labels
+        entry = self._log_buffer.append(msg, level=level, job=job, job_label=job_label)
+
+        if self._log_buffer.matches(entry):
+            self.log_box.insert("end", f"{msg}\n")
+            self._log_box_lines += text_lines(msg)
+            self._trim_log_box()
+            self._schedule_log_scroll()
+
+        # Dopo l'insert: se il filtro job si azzera la vista viene ridisegnata
+        # dal buffer, che contiene già la riga
+        if not known_job:
+            self._refresh_log_job_filter()
+
+    def _trim_log_box(self) -> None:
+        """
+        Elimina le righe più vecchie dal widget quando supera il limite.
+
+        Il conteggio è in righe Tk: un messaggio multi-riga ne occupa più
+        di una.
+        """
+        limit = self._log_buffer.max_lines
+        if self._log_box_lines <= limit + LOG_CONFIG.LOG_VIEW_TRIM_BATCH:
+            return
+
+        excess = self._log_box_lines - limit
+        self.log_box.delete("1.0", f"{excess + 1}.0")
+        self._log_box_lines = limit
+
+    def _schedule_log_scroll(self) -> None:
+        """Schedula un solo see("end") per ciclo idle."""
+        if self._log_scroll_pending:
+            return
+
+        self._log_scroll_pending = True
+
+        def scroll() -> None:
+            self._log_scroll_pending = False
+            self.log_box.see("end")
+
+        self.after_idle(scroll)
+
+    def _refresh_log_view(self) -> None:
+        """Ridisegna il log box dal ring buffer applicando i filtri."""
+        entries = self._log_buffer.visible()
+        self.log_box.delete("1.0", "end")
+        self.log_box.insert("end", format_entries(entries))
+        self._log_box_lines = sum(text_lines(entry.text) for entry in entries)
         self.log_box.see("end")
 
+    def _refresh_log_job_filter(self) -> None:
+        """Aggiorna le voci del filtro job dai job presenti nel buffer."""
+        self._log_job_labels = self._log_buffer.jobs()
+        values = [UI_MSG.LBL_LOG_ALL_JOBS] + list(self._log_job_labels.values())
+        self.log_job_box.configure(values=values)
+
+        # Job selezionato uscito dal buffer: torna a "tutti"
+        if self._log_buffer.job_filter not in (None, *self._log_job_labels):
+            self.log_job_var.set(UI_MSG.LBL_LOG_ALL_JOBS)
+            self._on_log_filter_changed()
+
+    def _on_log_filter_changed(self) -> None:
+        """Callback quando cambia il filtro livello o job del log."""
+        self._log_buffer.min_level = level_from_name(self.log_level_var.get())
+
+        selected = self.log_job_var.get()
+        self._log_buffer.job_filter = next(
+            (job for job, label in self._log_job_labels.items() if label == selected),
+            None
+        )
+
+        self._refresh_log_view()
+
+    @UI_MONITOR.timed("render_queue")
     def _render_queue(self) -> None:
         """
         Renderizza la download queue nella UI.
@@ -636,27 +798,28 @@ class VideoDownloaderGUI(ctk.CTk):
         self.queue_box.configure(state="normal")
         self.queue_box.delete("1.0", "end")
 
-        # Lock per accesso thread-safe
-        with self._queue_lock:
-            queue_copy = self._download_queue.copy()
+        # Snapshot thread-safe (solo la testa della coda), render fuori dal lock
+        limit = PERFORMANCE_CONFIG.QUEUE_RENDER_LIMIT
+        jobs = self._queue.snapshot(limit=limit)
+        total = len(self._queue)
 
-        # Render queue (fuori dal lock)
-        for i, item in enumerate(queue_copy, start=1):
-            title = item.get("title") or UI_MSG.TITLE_UNTITLED
-            # Emoji numbers per visual appeal
-            number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+        # Emoji numbers per visual appeal
+        number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+        lines = []
+        for i, job in enumerate(jobs, start=1):
+            title = job.title or UI_MSG.TITLE_UNTITLED
             emoji = number_emojis[i-1] if i <= 10 else f"{i}."
-            self.queue_box.insert("end", f"{emoji} {title}\n")
+            lines.append(f"{emoji} {title}\n")
 
-        self.queue_box.configure(state="disabled")
+        if total > len(jobs):
+            lines.append(UI_MSG.QUEUE_MORE_ITEMS.format(total - len(jobs)))
 
-    def _render_queue_safe(self) -> None:
-        """
-        Render queue in modo thread-safe (da worker thread).
+        # Job in pausa in fondo, riprendibili con "Riprendi"
+        for job in self._queue.paused_snapshot():
+            lines.append(f"⏸️ {job.title or UI_MSG.TITLE_UNTITLED}\n")
 
-        Schedula render sul main thread usando after().
-        """
-        self.after(0, self._render_queue)
+        self.queue_box.insert("end", "".join(lines))
+        self.queue_box.configure(state="disabled")
 
     # ========================================================================
     # STATE MANAGEMENT
@@ -691,6 +854,7 @@ class VideoDownloaderGUI(ctk.CTk):
         # Bottoni azione
         self.btn_start.configure(state=state_start)
         self.btn_cancel.configure(state=state_cancel)
+        self.btn_pause.configure(state=state_cancel)
         self.btn_clear_queue.configure(state=state_inputs)
         self.btn_remove_last.configure(state=state_inputs)
 
@@ -751,13 +915,7 @@ class VideoDownloaderGUI(ctk.CTk):
             >>> self._quality_to_ydl_format()
             'bestvideo+bestaudio/best'
         """
-        preset = self.quality_preset_var.get()
-        height = get_resolution_height(preset)
-
-        if height:
-            return f"bestvideo[height<={height}]+bestaudio/best/best"
-        else:
-            return "bestvideo+bestaudio/best"
+        return quality_to_ydl_format(self.quality_preset_var.get())
 
     def _on_format_changed(self) -> None:
         """Callback quando formato (Video/Audio) cambia."""
@@ -773,15 +931,22 @@ class VideoDownloaderGUI(ctk.CTk):
     # UI QUEUE DRAIN
     # ========================================================================
 
+    @UI_MONITOR.timed("ui_drain")
+    @profiled("ui_drain")
     def _drain_ui_queue(self) -> None:
         """
         Drena UI queue e processa messaggi da worker thread.
 
         Chiamato periodicamente via after() per aggiornamenti thread-safe.
         """
+        tick_span = TRACER.begin("ui_drain", cat="ui")
+        handled = 0
+        queue_changed = False
+
         try:
             while True:
                 kind, payload = self._uiq.get_nowait()
+                handled += 1
 
                 if kind == "status":
                     self._update_status(payload, log=False)
@@ -793,29 +958,95 @@ class VideoDownloaderGUI(ctk.CTk):
                     self._update_download_progress(payload)
 
                 elif kind == "log":
-                    self._log(payload)
+                    if isinstance(payload, tuple):
+                        self._log(*payload)
+                    else:
+                        self._log(payload)
+
+                elif kind == "queue_changed":
+                    # Coalescing: un solo render per tick
+                    queue_changed = True
 
                 elif kind == "done":
                     self.progress.set(0)
                     self.details_var.set("")
                     self._set_busy(False)
+                    UI_MONITOR.log_summary()
 
                 elif kind == "show_error":
                     title, msg = payload
                     messagebox.showerror(title, msg)
 
+                elif kind == "external_urls":
+                    self._add_external_urls(payload)
+
         except queue.Empty:
             pass
 
+        if queue_changed:
+            self._render_queue()
+
+        TRACER.end(tick_span, messages=handled)
+
         # Re-schedule
         self.after(PERFORMANCE_CONFIG.UI_POLL_INTERVAL_MS, self._drain_ui_queue)
 
+    def _preload_modules(self) -> None:
+        """Avvia il caricamento in background dei moduli importati in modo differito."""
+        preload_modules(PERFORMANCE_CONFIG.PRELOAD_MODULES)
+
+    # ========================================================================
+    # UI MONITOR OVERLAY
+    # ========================================================================
+
+    def toggle_ui_monitor_overlay(self) -> None:
+        """Mostra/nasconde l'overlay con le statistiche di lag e frame-time."""
+        # Flag esplicito: winfo_ismapped() resta 0 fino al primo ciclo idle
+        # dopo place(), quindi non dice se l'overlay è stato appena mostrato
+        if self._monitor_overlay_visible:
+            self._monitor_overlay_visible = False
+            if self._monitor_overlay_after is not None:
+                self.after_cancel(self._monitor_overlay_after)
+                self._monitor_overlay_after = None
+            if self._monitor_overlay is not None:
+                self._monitor_overlay.place_forget()
+            return
+
+        if self._monitor_overlay is None:
+            self._monitor_overlay = ctk.CTkLabel(
+                self,
+                text="",
+                justify="left",
+                anchor="w",
+                corner_radius=UI_STYLE.ENTRY_RADIUS,
+                fg_color=COLORS.BG_LIGHT,
+                text_color=COLORS.TEXT_PRIMARY,
+                font=("Consolas", UI_LAYOUT.FONT_LOG)
+            )
+
+        self._monitor_overlay.place(relx=1.0, rely=1.0, x=-12, y=-12, anchor="se")
+        self._monitor_overlay_visible = True
+        self._refresh_ui_monitor_overlay()
+
+    def _refresh_ui_monitor_overlay(self) -> None:
+        """Aggiorna il testo dell'overlay finché resta visibile (un solo ciclo after attivo)."""
+        self._monitor_overlay_after = None
+        if self._monitor_overlay is None or not self._monitor_overlay_visible:
+            return
+
+        self._monitor_overlay.configure(text=UI_MONITOR.summary() or "UI monitor: no samples")
+        self._monitor_overlay_after = self.after(
+            UI_MONITOR_CONFIG.OVERLAY_REFRESH_MS, self._refresh_ui_monitor_overlay
+        )
+
     # ========================================================================
     # EVENT HANDLERS
     # ========================================================================
 
     def paste_clipboard(self) -> None:
         """Incolla URL dalla clipboard nell'entry."""
+        import pyperclip
+
         try:
             text = pyperclip.paste().strip()
             if text:
@@ -843,8 +1074,10 @@ class VideoDownloaderGUI(ctk.CTk):
 
     def copy_log(self) -> None:
         """Copia contenuto log in clipboard."""
+        import pyperclip
+
         try:
-            text = self.log_box.get("1.0", "end").strip()
+            text = format_entries(self._log_buffer.visible()).strip()
             if text:
                 pyperclip.copy(text)
                 self._log(UI_MSG.LOG_LOG_COPIED)
@@ -858,8 +1091,11 @@ class VideoDownloaderGUI(ctk.CTk):
             self._log(f"Errore: {e}")
 
     def clear_log(self) -> None:
-        """Pulisce log box."""
+        """Pulisce log box (il file di log non viene toccato)."""
+        self._log_buffer.clear()
         self.log_box.delete("1.0", "end")
+        self._log_box_lines = 0
+        self._refresh_log_job_filter()
         logging.info("Log cleared")
 
     # ========================================================================
@@ -887,41 +1123,83 @@ class VideoDownloaderGUI(ctk.CTk):
             messagebox.showerror(UI_MSG.ERR_INVALID_URL, UI_MSG.ERR_INVALID_URL_MSG)
             return
 
-        # Aggiungi alla queue (thread-safe)
-        item = {"url": url, "title": UI_MSG.TITLE_LOADING}
+        # Già scaricato: nessun job, nessun fetch del titolo
+        if self._queue.is_archived(url):
+            self.url_var.set("")
+            self._uiq.put(("log", UI_MSG.LOG_ALREADY_ARCHIVED.format(url)))
+            return
 
-        with self._queue_lock:
-            self._download_queue.append(item)
+        # Aggiungi alla queue e recupera il titolo in background (un altro
+        # URL dello stesso video confluisce sul job esistente)
+        job, created = self._queue.add_or_get(url)
+        self.url_var.set("")
+        if not created:
+            self._uiq.put(("log", UI_MSG.LOG_ALREADY_QUEUED.format(job.title)))
+            return
 
         self._render_queue()
-        self.url_var.set("")
         self._uiq.put(("log", UI_MSG.LOG_ADDED_TO_QUEUE))
 
-        # Fetch titolo in background
-        threading.Thread(
-            target=self._fetch_title_worker,
-            args=(item,),
-            daemon=True,
-            name="TitleFetchThread"
-        ).start()
+        self._queue.fetch_title_async(job)
 
-        logging.info(f"Added to queue: {url}")
+    def _restore_jobs(self) -> None:
+        """Ripristina i job non completati nella sessione precedente."""
+        restored = self._queue.restore()
+        if not restored:
+            return
+
+        self._render_queue()
+        self._uiq.put(("log", UI_MSG.LOG_JOBS_RESTORED.format(len(restored))))
+        for job in restored:
+            if job.title == UI_MSG.TITLE_LOADING:
+                self._queue.fetch_title_async(job)
+
+    def submit_external_urls(self, urls: List[str]) -> None:
+        """
+        Accoda URL arrivati da fuori (riga di comando, altra istanza).
+
+        Thread-safe: può essere chiamato dal thread di InstanceServer, il
+        lavoro vero lo fa _add_external_urls nel main thread.
+        """
+        self._uiq.put(("external_urls", list(urls)))
+
+    def _add_external_urls(self, urls: List[str]) -> None:
+        """Valida e accoda gli URL e porta la finestra in primo piano."""
+        added = 0
+        for url in urls:
+            url = url.strip()
+            if not is_valid_url(url):
+                self._log(f"{UI_MSG.ERR_INVALID_URL}: {url}", logging.WARNING)
+                continue
+            if self._queue.is_archived(url):
+                self._log(UI_MSG.LOG_ALREADY_ARCHIVED.format(url))
+                continue
+            # Anche durante un download: il worker prende i job aggiunti dopo start()
+            job, created = self._queue.add_or_get(url)
+            if not created:
+                self._log(UI_MSG.LOG_ALREADY_QUEUED.format(job.title))
+                continue
+            self._queue.fetch_title_async(job)
+            added += 1
+
+        if added:
+            self._render_queue()
+            self._log(UI_MSG.LOG_EXTERNAL_URLS.format(added))
+
+        self.deiconify()
+        self.lift()
+        self.focus_force()
 
     def clear_queue(self) -> None:
         """Svuota la download queue (thread-safe)."""
-        with self._queue_lock:
-            self._download_queue.clear()
+        self._queue.clear()
 
         self._render_queue()
         self._uiq.put(("log", UI_MSG.LOG_QUEUE_CLEARED))
-        logging.info("Queue cleared")
 
     def remove_last(self) -> None:
         """Rimuove ultimo elemento dalla queue (thread-safe)."""
-        with self._queue_lock:
-            if self._download_queue:
-                removed = self._download_queue.pop()
-                logging.info(f"Removed from queue: {removed.get('url', 'unknown')}")
+        self._queue.remove_last()
 
         self._render_queue()
         self._uiq.put(("log", UI_MSG.LOG_REMOVED_LAST))
@@ -936,160 +1214,45 @@ class VideoDownloaderGUI(ctk.CTk):
             return
 
         # Se queue vuota ma c'è URL nell'entry, aggiungilo
-        with self._queue_lock:
-            queue_empty = len(self._download_queue) == 0
-
-        if queue_empty:
+        if len(self._queue) == 0:
             if (self.url_var.get() or "").strip():
                 self.add_to_queue()
             else:
                 messagebox.showinfo(UI_MSG.INFO_NOTHING_TO_DO, UI_MSG.INFO_NOTHING_TO_DO_MSG)
                 return
 
-        # Reset cancel event e imposta busy
-        self._cancel_event.clear()
+        # Imposta busy e avvia il worker della queue
         self._set_busy(True)
         self._uiq.put(("status", UI_MSG.STATUS_READY))
         self._uiq.put(("details", ""))
 
-        # Spawna worker thread
-        threading.Thread(
-            target=self._queue_worker,
-            daemon=True,
-            name="DownloadWorkerThread"
-        ).start()
-
-        logging.info("Download queue started")
+        self._queue.start(
+            mode=self.format_var.get(),
+            quality=self._quality_to_ydl_format(),
+            output_path=self.path_var.get(),
+        )
 
     def cancel_download(self) -> None:
         """Richiede cancellazione download corrente."""
-        if self._is_downloading:
-            self._cancel_event.set()
+        if self._is_downloading and self._queue.cancel():
             self._uiq.put(("log", UI_MSG.LOG_CANCEL_REQUESTED))
-            logging.info("Download cancellation requested")
 
-    # ========================================================================
-    # BACKGROUND WORKERS
-    # ========================================================================
-
-    def _fetch_title_worker(self, item: Dict[str, str]) -> None:
-        """
-        Worker thread per fetch titolo video.
-
-        Args:
-            item: Dict con "url" key, verrà aggiornato con "title"
-
-        Note:
-            Aggiorna item dict in-place e triggera UI re-render
-        """
-        try:
-            import yt_dlp
-
-            url = item["url"]
-
-            ydl_opts = {
-                "quiet": True,
-                "no_warnings": True,
-                "noplaylist": True,
-                "skip_download": True,
-                "socket_timeout": PERFORMANCE_CONFIG.TITLE_FETCH_TIMEOUT,
-            }
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-
-            title = info.get("title") or url
-            item["title"] = title
-            self.after(0, self._render_queue)
-
-            logging.info(f"Fetched title: {title}")
-
-        except yt_dlp.utils.DownloadError as e:
-            logging.warning(f"Failed to fetch title for {item['url']}: {e}")
-            item["title"] = item.get("title") or item["url"]
-            self.after(0, self._render_queue)
+    def pause_download(self) -> None:
+        """Mette in pausa il job corrente; il worker passa al successivo."""
+        if self._is_downloading and self._queue.pause():
+            self._uiq.put(("log", UI_MSG.LOG_PAUSE_REQUESTED))
 
-        except Exception as e:
-            logging.exception(f"Unexpected error fetching title for {item['url']}")
-            item["title"] = item.get("title") or item["url"]
-            self.after(0, self._render_queue)
-
-    def _queue_worker(self) -> None:
-        """
-        Worker thread principale per processare download queue.
-
-        Itera sulla queue e scarica ogni elemento sequenzialmente.
-        Comunica con UI via UI queue (thread-safe).
-        """
-        try:
-            while True:
-                # Check cancellazione
-                if self._cancel_event.is_set():
-                    break
-
-                # Pop item dalla queue (thread-safe)
-                with self._queue_lock:
-                    if not self._download_queue:
-                        break
-                    item = self._download_queue.pop(0)
-
-                # Estrai info
-                url = item["url"]
-                title = item.get("title", url)
-                self._uiq.put(("log", UI_MSG.LOG_DOWNLOADING.format(title)))
-                self._render_queue_safe()
-
-                # Parametri download
-                mode = self.format_var.get()
-                out_dir = self.path_var.get()
-                ydl_format = self._quality_to_ydl_format()
-
-                # Callbacks
-                def on_progress(data: Dict[str, Any]) -> None:
-                    self._uiq.put(("progress", data))
-
-                def on_status(msg: str) -> None:
-                    self._uiq.put(("status", msg))
-                    self._uiq.put(("log", msg))
-
-                # Download
-                try:
-                    download_video(
-                        url=url,
-                        mode=mode,
-                        quality=ydl_format,
-                        output_path=out_dir,
-                        progress_cb=on_progress,
-                        status_cb=on_status,
-                        cancel_event=self._cancel_event,
-                    )
-                except DownloadCancelledError:
-                    # Cancellazione: esci dal loop
-                    logging.info("Download cancelled, exiting worker")
-                    break
-                except Exception as e:
-                    # Errore: logga e continua con prossimo
-                    logging.exception(f"Error downloading {url}")
-                    self._uiq.put(("log", f"❌ Errore: {e}"))
-                    continue
-
-            # Fine queue
-            if self._cancel_event.is_set():
-                self._uiq.put(("status", UI_MSG.STATUS_CANCELLED))
-                self._uiq.put(("log", UI_MSG.LOG_QUEUE_CANCELLED))
-            else:
-                self._uiq.put(("status", UI_MSG.STATUS_COMPLETE))
-                self._uiq.put(("log", UI_MSG.LOG_ALL_COMPLETE))
-
-        except Exception as e:
-            logging.exception("Unexpected error in queue worker")
-            self._uiq.put(("status", UI_MSG.STATUS_ERROR.format(str(e))))
-            self._uiq.put(("log", f"❌ Errore fatale: {e}"))
-            self._uiq.put(("show_error", ("Errore", str(e))))
+    def resume_downloads(self) -> None:
+        """Rimette in testa alla coda i job in pausa (e avvia la coda se ferma)."""
+        resumed = self._queue.resume()
+        if not resumed:
+            self._uiq.put(("log", UI_MSG.LOG_NOTHING_PAUSED))
+            return
 
-        finally:
-            self._uiq.put(("done", None))
-            logging.info("Queue worker terminated")
+        self._render_queue()
+        self._uiq.put(("log", UI_MSG.LOG_JOBS_RESUMED.format(len(resumed))))
+        if not self._is_downloading:
+            self.start_queue()
 
     # ========================================================================
     # AUTO-UPDATE SYSTEM
@@ -1102,6 +1265,8 @@ class VideoDownloaderGUI(ctk.CTk):
         Eseguito in background thread per non bloccare UI.
         """
         def check_worker():
+            from . import updater
+
             try:
                 logging.info("Checking for updates...")
                 update_info = updater.check_for_updates()
@@ -1235,6 +1400,8 @@ class VideoDownloaderGUI(ctk.CTk):
             update_info: Dictionary con info update
         """
         def download_worker():
+            from . import updater
+
             try:
                 # Progress dialog
                 progress_dialog = None
@@ -0,0 +1,281 @@
+"""
+Salute degli host: circuit breaker e limite adattivo per sito.
+
+Quando un sito inizia a rispondere con 429 o timeout, ogni job in coda per
+quell'host ci riproverebbe a turno, consumando RETRIES e FRAGMENT_RETRIES
+di yt-dlp e ritardando tutti i job dietro. HostHealthTracker tiene per
+ogni host (dalla forma canonica dell'URL, vedi mvd.canonical):
+- un circuit breaker: dopo FAILURE_THRESHOLD errori di rete consecutivi il
+  circuito si apre e per OPEN_COOLDOWN secondi nessun job di quell'host
+  parte (le code servono intanto gli altri host); allo scadere passa
+  un solo job di prova (half-open): se riesce il circuito si richiude,
+  altrimenti si riapre con cooldown raddoppiato
+- un limite di job contemporanei: dimezzato a ogni 429 (RateLimitedError)
+  e rialzato di 1 ogni RECOVERY_SUCCESSES successi consecutivi
+- il numero di retry di yt-dlp: ridotto a DEGRADED_RETRIES finché l'host
+  ha errori recenti, così il job di prova fallisce in fretta
+
+Solo gli errori di rete contano: un video privato o rimosso non dice
+nulla sulla salute del sito, e cancellazioni e pause sono neutre. Lo
+stato del circuito aperto o half-open cambia solo con l'esito del job di
+prova, riconosciuto dal suo HostSlot: i job partiti prima dell'apertura
+liberano il posto senza decidere nulla.
+
+Examples:
+    >>> hosts = HostHealthTracker(clock=lambda: 0.0)
+    >>> for _ in range(3):
+    ...     slot = hosts.try_acquire("example.com")
+    ...     hosts.release(slot, NetworkError("timeout"))
+    >>> hosts.try_acquire("example.com") is None
+    True
+    >>> hosts.retry_after("example.com")
+    30.0
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from .canonical import canonicalize_url
+from .config import HOST_HEALTH_CONFIG, YTDLP_CONFIG
+from .exceptions import NetworkError, RateLimitedError
+
+# Stati del circuito
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+def host_for_url(url: str) -> str:
+    """
+    Host di un URL nella forma canonica (senza www., alias unificati).
+
+    Examples:
+        >>> host_for_url("https://youtu.be/dQw4w9WgXcQ")
+        'youtube.com'
+    """
+    host = urlsplit(canonicalize_url(url).url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+@dataclass(frozen=True)
+class HostSlot:
+    """Posto riservato da try_acquire() per un job, da restituire a release()."""
+
+    host: str
+    probe: int = 0  # Numero della prova half-open (0 = job normale)
+
+
+@dataclass
+class _HostState:
+    """Stato di un host (modificato solo con il lock del tracker)."""
+
+    limit: int
+    state: str = CIRCUIT_CLOSED
+    active: int = 0
+    failures: int = 0  # Errori di rete consecutivi
+    successes: int = 0  # Successi consecutivi (recupero del limite)
+    cooldown: float = 0.0
+    open_until: float = 0.0
+    probing: bool = False  # Job di prova in corso (half-open)
+    probe_id: int = 0  # Numero dell'ultima prova avviata
+    rate_limited: int = 0  # 429 ricevuti (statistiche)
+    opened: int = 0  # Aperture del circuito (statistiche)
+
+
+class HostHealthTracker:
+    """
+    Circuit breaker e limite di concorrenza per host, condiviso dai worker.
+
+    Uso: slot = try_acquire(host) prima di avviare un job (None = scegliere
+    un job di un altro host), release(slot, exc) quando il job finisce.
+
+    Args:
+        max_concurrency: Limite iniziale di job contemporanei per host
+        clock: Orologio monotono (per i test)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = HOST_HEALTH_CONFIG.MAX_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self._clock = clock
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(limit=self.max_concurrency)
+        return state
+
+    # ------------------------------------------------------------------
+    # Avvio dei job
+    # ------------------------------------------------------------------
+
+    def _startable(self, state: _HostState, now: float) -> bool:
+        if state.state == CIRCUIT_OPEN:
+            return now >= state.open_until
+        if state.state == CIRCUIT_HALF_OPEN:
+            return not state.probing
+        return state.active < state.limit
+
+    def can_start(self, host: str) -> bool:
+        """True se un job di host potrebbe partire ora (senza riservarlo)."""
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is None or self._startable(state, self._clock())
+
+    def try_acquire(self, host: str) -> Optional[HostSlot]:
+        """
+        Riserva un posto per un job di host.
+
+        A circuito aperto e cooldown scaduto il job diventa la richiesta di
+        prova (half-open): fino al suo esito nessun altro job dell'host parte.
+
+        Returns:
+            Il posto da passare a release(), None se il circuito è aperto,
+            la prova è in corso o l'host ha raggiunto il limite di job
+            contemporanei
+        """
+        with self._lock:
+            state = self._get(host)
+            now = self._clock()
+            if not self._startable(state, now):
+                return None
+            if state.state == CIRCUIT_OPEN:
+                state.state = CIRCUIT_HALF_OPEN
+                logging.info(f"Circuit half-open for {host}: probing with one job")
+            probe = 0
+            if state.state == CIRCUIT_HALF_OPEN:
+                state.probing = True
+                state.probe_id += 1
+                probe = state.probe_id
+            state.active += 1
+            return HostSlot(host, probe)
+
+    def retry_after(self, host: str) -> Optional[float]:
+        """Secondi prima che il circuito di host permetta la prova (None se non è aperto)."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.state != CIRCUIT_OPEN:
+                return None
+            return max(0.0, state.open_until - self._clock())
+
+    def retries_for(self, host: str) -> int:
+        """Retry di yt-dlp per un job di host: pochi se l'host ha errori recenti."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None and (state.failures or state.state != CIRCUIT_CLOSED):
+                return min(HOST_HEALTH_CONFIG.DEGRADED_RETRIES, YTDLP_CONFIG.RETRIES)
+            return YTDLP_CONFIG.RETRIES
+
+    # ------------------------------------------------------------------
+    # Esito dei job
+    # ------------------------------------------------------------------
+
+    def release(self, slot: HostSlot, exc: Optional[BaseException] = None, neutral: bool = False) -> None:
+        """
+        Libera il posto di un job e ne registra l'esito.
+
+        A circuito aperto o half-open conta solo l'esito della prova: un
+        job partito prima dell'apertura libera il posto e basta.
+
+        Args:
+            slot: Posto ritornato da try_acquire() per il job
+            exc: Eccezione del job (None = completato con successo)
+            neutral: Esito che non dice nulla sull'host (cancellazione,
+                pausa, video già scaricato)
+        """
+        host = slot.host
+        with self._lock:
+            state = self._get(host)
+            state.active = max(0, state.active - 1)
+            probe = state.probing and slot.probe == state.probe_id
+            if probe:
+                state.probing = False
+            elif state.state != CIRCUIT_CLOSED:
+                return
+
+            if neutral or (exc is not None and not isinstance(exc, NetworkError)):
+                # Un video non disponibile non dice nulla sul video successivo,
+                # ma una prova che riceve risposta dal sito lo dà per raggiungibile;
+                # una prova neutra lascia il posto al prossimo job
+                if probe and exc is not None and not neutral:
+                    self._close(host, state)
+                return
+
+            if exc is None:
+                self._on_success(host, state)
+            else:
+                self._on_failure(host, state, exc, probe)
+
+    def _close(self, host: str, state: _HostState) -> None:
+        if state.state != CIRCUIT_CLOSED:
+            logging.info(f"Circuit closed for {host}")
+        state.state = CIRCUIT_CLOSED
+        state.failures = 0
+        state.cooldown = 0.0
+
+    def _on_success(self, host: str, state: _HostState) -> None:
+        self._close(host, state)
+        state.successes += 1
+        if state.limit < self.max_concurrency and state.successes >= HOST_HEALTH_CONFIG.RECOVERY_SUCCESSES:
+            state.limit += 1
+            state.successes = 0
+            logging.info(f"Concurrency for {host} raised to {state.limit}")
+
+    def _on_failure(self, host: str, state: _HostState, exc: BaseException, probe: bool) -> None:
+        state.failures += 1
+        state.successes = 0
+
+        if isinstance(exc, RateLimitedError):
+            state.rate_limited += 1
+            limit = max(1, state.limit // 2)
+            if limit != state.limit:
+                state.limit = limit
+                logging.warning(f"Rate limited by {host}: concurrency lowered to {limit}")
+
+        if probe:
+            # Prova fallita: di nuovo aperto, con cooldown raddoppiato
+            cooldown = min(state.cooldown * 2, HOST_HEALTH_CONFIG.MAX_COOLDOWN)
+        elif state.state == CIRCUIT_CLOSED and state.failures >= HOST_HEALTH_CONFIG.FAILURE_THRESHOLD:
+            cooldown = HOST_HEALTH_CONFIG.OPEN_COOLDOWN
+        else:
+            return
+
+        state.state = CIRCUIT_OPEN
+        state.cooldown = cooldown
+        state.open_until = self._clock() + cooldown
+        state.opened += 1
+        logging.warning(
+            f"Circuit open for {host} for {cooldown:.0f}s after {state.failures} consecutive failures: {exc}",
+            extra={"phase": "circuit_open", "exc_class": type(exc).__name__}
+        )
+
+    # ------------------------------------------------------------------
+    # Statistiche
+    # ------------------------------------------------------------------
+
+    def snapshot(self, unhealthy_only: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Stato per host (es. per GET /health del daemon)."""
+        with self._lock:
+            now = self._clock()
+            return {
+                host: {
+                    "state": state.state,
+                    "active": state.active,
+                    "limit": state.limit,
+                    "failures": state.failures,
+                    "rate_limited": state.rate_limited,
+                    "opened": state.opened,
+                    "retry_after": round(max(0.0, state.open_until - now), 1) if state.state == CIRCUIT_OPEN else None,
+                }
+                for host, state in self._hosts.items()
+                if not unhealthy_only or state.state != CIRCUIT_CLOSED or state.failures or state.limit < self.max_concurrency
+            }
@@ -0,0 +1,313 @@
+"""
+Esecuzione dei job di download, comune a DownloadQueue e daemon.
+
+La coda della GUI (un worker, ordine di arrivo) e lo scheduler del daemon
+(N worker, priorità) scelgono in modo diverso il prossimo job, ma le
+regole per eseguirlo sono le stesse e stanno qui:
+- DownloadJob: il job, con chiave canonica (duplicati) e host (circuit breaker)
+- JobIndex: indice dei duplicati per chiave canonica (vedi mvd.canonical)
+- JobRunner.run(): un tentativo di download, dall'archivio all'esito:
+  video già scaricati saltati senza rete, retry di yt-dlp ridotti per gli
+  host degradati, esito registrato nel circuit breaker (vedi
+  mvd.host_health) e nel JobStore, decisione della RetryPolicy
+
+I chiamanti scelgono il job riservandone l'host (job.slot =
+hosts.try_acquire(job.host)), chiamano run() e in base all'esito lo rimettono in coda (ripartibile da
+job.retry_at), lo tengono tra quelli in pausa o lo concludono.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from .archive import DownloadArchive
+from .canonical import dedup_key
+from .config import UI_MSG
+from .downloader import download_video
+from .exceptions import AlreadyDownloadedError, DownloadCancelledError, DownloadPausedError
+from .host_health import HostHealthTracker, HostSlot, host_for_url
+from .job_store import (
+    STATE_CANCELLED,
+    STATE_COMPLETE,
+    STATE_ERROR,
+    STATE_PAUSED,
+    STATE_QUEUED,
+    STATE_RUNNING,
+    STATE_SKIPPED,
+    JobStore,
+)
+from .log_pipeline import job_context
+from .metrics import JobMetrics
+from .retry import RETRY_POLICY, RetryDecision, RetryPolicy
+from .tracing import TRACER
+from .utils import new_job_id
+
+# Esiti di un tentativo: gli stati del JobStore più "retry"
+OUTCOME_COMPLETE = STATE_COMPLETE
+OUTCOME_SKIPPED = STATE_SKIPPED  # Già nell'archivio dei download
+OUTCOME_PAUSED = STATE_PAUSED
+OUTCOME_CANCELLED = STATE_CANCELLED
+OUTCOME_ERROR = STATE_ERROR
+OUTCOME_RETRY = "retry"  # Di nuovo in coda, ripartibile da job.retry_at
+
+
+# ============================================================================
+# JOB
+# ============================================================================
+
+@dataclass
+class DownloadJob:
+    """
+    Elemento della download queue.
+
+    I parametri mode/quality/output_path a None usano quelli passati a
+    DownloadQueue.start().
+    """
+
+    url: str
+    id: str = field(default_factory=new_job_id)
+    title: str = UI_MSG.TITLE_LOADING
+    queued_at: float = field(default_factory=time.monotonic)
+    mode: Optional[str] = None
+    quality: Optional[str] = None
+    output_path: Optional[str] = None
+    key: str = field(default="", repr=False)  # Chiave canonica (indice dei duplicati)
+    host: str = field(default="", repr=False)  # Host canonico (circuit breaker)
+    attempts: int = 0  # Tentativi di download eseguiti
+    retry_at: float = field(default=0.0, repr=False)  # time.monotonic() minimo per il prossimo tentativo
+    slot: Optional[HostSlot] = field(default=None, repr=False)  # Posto nel circuit breaker durante un tentativo
+
+    def __post_init__(self) -> None:
+        if not self.key:
+            self.key = dedup_key(self.url)
+        if not self.host:
+            self.host = host_for_url(self.url)
+
+    @property
+    def label(self) -> str:
+        """Etichetta breve per log e filtri (id · titolo)."""
+        return f"{self.id} · {self.title[:40]}"
+
+
+@dataclass(frozen=True)
+class JobOutcome:
+    """Esito di un tentativo (exc per errori e retry, decision per i retry)."""
+
+    status: str
+    exc: Optional[BaseException] = None
+    decision: Optional[RetryDecision] = None
+
+
+# ============================================================================
+# INDICE DEI DUPLICATI
+# ============================================================================
+
+class JobIndex:
+    """
+    Chiave canonica dell'URL -> job non ancora concluso.
+
+    Non ha un lock proprio: va usato con il lock della coda che lo
+    contiene, così indice e lista dei job cambiano insieme.
+
+    Examples:
+        >>> index = JobIndex()
+        >>> job = DownloadJob("https://youtu.be/dQw4w9WgXcQ")
+        >>> index.claim(job) is None
+        True
+        >>> index.claim(DownloadJob("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30")) is job
+        True
+        >>> index.discard(job)
+        >>> index.get(job.key) is None
+        True
+    """
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, DownloadJob] = {}
+
+    def get(self, key: str) -> Optional[DownloadJob]:
+        return self._jobs.get(key)
+
+    def claim(self, job: DownloadJob) -> Optional[DownloadJob]:
+        """
+        Registra job se nessun altro job ha la stessa chiave.
+
+        Returns:
+            None se registrato, altrimenti il job già presente
+        """
+        existing = self._jobs.get(job.key)
+        if existing is None:
+            self._jobs[job.key] = job
+        return existing
+
+    def discard(self, job: DownloadJob) -> None:
+        """Toglie job dall'indice (se è ancora lui a occupare la chiave)."""
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+
+    def clear(self, keep: Optional[DownloadJob] = None) -> None:
+        """Svuota l'indice, tenendo eventualmente un job (quello in corso)."""
+        self._jobs = {keep.key: keep} if keep is not None else {}
+
+
+# ============================================================================
+# ESECUZIONE
+# ============================================================================
+
+class JobRunner:
+    """
+    Esegue i tentativi di download con archivio, circuit breaker, JobStore
+    e RetryPolicy condivisi. Thread-safe: più worker possono usarlo insieme.
+
+    Args:
+        archive: Archivio dei download completati (None = nessun controllo
+            dei duplicati)
+        store: Persistenza dei job (None = solo in memoria)
+        retry_policy: Policy dei nuovi tentativi (None = nessun retry)
+        host_health: Circuit breaker per host (None = uno nuovo)
+        trace_cat: Categoria degli span "job" nel trace (coda o daemon)
+    """
+
+    def __init__(
+        self,
+        archive: Optional[DownloadArchive] = None,
+        store: Optional[JobStore] = None,
+        retry_policy: Optional[RetryPolicy] = RETRY_POLICY,
+        host_health: Optional[HostHealthTracker] = None,
+        trace_cat: str = "queue",
+    ) -> None:
+        self.archive = archive
+        self.store = store
+        self.retry_policy = retry_policy
+        self.hosts = host_health if host_health is not None else HostHealthTracker()
+        self.trace_cat = trace_cat
+
+    def is_archived(self, url: str) -> bool:
+        """True se l'URL punta a un video già nell'archivio (senza rete)."""
+        return self.archive is not None and self.archive.contains_url(url)
+
+    def run(
+        self,
+        job: DownloadJob,
+        progress_cb: Optional[Callable[[Dict[str, Any]], None]] = None,
+        status_cb: Optional[Callable[[str], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        pause_event: Optional[threading.Event] = None,
+        metrics: Optional[JobMetrics] = None,
+    ) -> JobOutcome:
+        """
+        Esegue un tentativo di download del job.
+
+        L'host del job deve essere già riservato in job.slot con
+        hosts.try_acquire(): il posto viene liberato qui con l'esito del tentativo (neutro per
+        pausa, cancellazione e video già scaricato). mode, quality e
+        output_path del job devono essere già fissati.
+
+        Returns:
+            JobOutcome; con OUTCOME_RETRY job.retry_at indica quando il job
+            può ripartire
+        """
+        store = self.store
+
+        # Video scaricato da un altro job dopo l'aggiunta: niente rete
+        if self.is_archived(job.url):
+            self.release(job, neutral=True)
+            return self._skipped(job)
+
+        job.attempts += 1
+        if store is not None:
+            store.transition(
+                job.id, STATE_RUNNING, mode=job.mode, quality=job.quality, output_path=job.output_path
+            )
+
+        # Esito per il circuit breaker: eccezione del job, neutro per pausa,
+        # cancellazione e video già scaricato
+        host_exc: Optional[BaseException] = None
+        neutral = False
+
+        # Download (righe di log correlate al job)
+        with (
+            job_context(job_id=job.id, url=job.url),
+            TRACER.span("job", cat=self.trace_cat, job=job.id, url=job.url),
+        ):
+            logging.info(f"Dequeued job: {job.url}", extra={"phase": "dequeue"})
+            try:
+                download_video(
+                    url=job.url,
+                    mode=job.mode,
+                    quality=job.quality,
+                    output_path=job.output_path,
+                    progress_cb=progress_cb,
+                    status_cb=status_cb,
+                    cancel_event=cancel_event,
+                    metrics=metrics,
+                    pause_event=pause_event,
+                    archive=self.archive,
+                    retries=self.hosts.retries_for(job.host),
+                )
+            except AlreadyDownloadedError:
+                neutral = True
+                outcome = self._skipped(job)
+            except DownloadPausedError:
+                neutral = True
+                if store is not None:
+                    store.transition(job.id, STATE_PAUSED)
+                outcome = JobOutcome(OUTCOME_PAUSED)
+            except DownloadCancelledError:
+                neutral = True
+                if store is not None:
+                    store.transition(job.id, STATE_CANCELLED)
+                outcome = JobOutcome(OUTCOME_CANCELLED)
+            except Exception as e:
+                # download_video ha già loggato l'errore (con il traceback se inatteso)
+                host_exc = e
+                outcome = self._failed(job, e)
+            else:
+                if store is not None:
+                    store.transition(job.id, STATE_COMPLETE)
+                outcome = JobOutcome(OUTCOME_COMPLETE)
+            finally:
+                self.release(job, host_exc, neutral=neutral)
+
+        return outcome
+
+    def release(self, job: DownloadJob, exc: Optional[BaseException] = None, neutral: bool = False) -> None:
+        """Libera il posto del job nel circuit breaker (senza esito se neutral)."""
+        slot, job.slot = job.slot, None
+        if slot is not None:
+            self.hosts.release(slot, exc, neutral=neutral)
+
+    def _skipped(self, job: DownloadJob) -> JobOutcome:
+        """Conclude un job il cui video è già nell'archivio."""
+        logging.info(f"Skipping archived video: {job.url}", extra={"job_id": job.id, "phase": "archived"})
+        if self.store is not None:
+            self.store.transition(job.id, STATE_SKIPPED)
+        return JobOutcome(OUTCOME_SKIPPED)
+
+    def _failed(self, job: DownloadJob, exc: BaseException) -> JobOutcome:
+        """Errore del job: nuovo tentativo dopo il backoff o errore definitivo."""
+        decision = self.retry_policy.decide(exc, job.attempts) if self.retry_policy else None
+
+        if decision is not None and decision.retry:
+            now = time.monotonic()
+            job.queued_at = now
+            job.retry_at = now + decision.delay
+            logging.warning(
+                f"Attempt {job.attempts}/{decision.max_attempts} failed, retrying in {decision.delay:.1f}s: {exc}",
+                extra={"phase": "retry", "exc_class": type(exc).__name__}
+            )
+            if self.store is not None:
+                self.store.transition(
+                    job.id, STATE_QUEUED, error=str(exc),
+                    detail=f"retry {job.attempts + 1}/{decision.max_attempts} in {decision.delay:.1f}s",
+                )
+            return JobOutcome(OUTCOME_RETRY, exc, decision)
+
+        logging.error(
+            f"Error downloading {job.url} (attempt {job.attempts}): {exc}",
+            extra={"phase": "error", "exc_class": type(exc).__name__}
+        )
+        if self.store is not None:
+            self.store.transition(job.id, STATE_ERROR, error=str(exc))
+        return JobOutcome(OUTCOME_ERROR, exc)
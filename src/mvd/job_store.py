@@ -0,0 +1,315 @@
+"""
+Coda persistente dei job per Modern Video Downloader.
+
+Salva i job della DownloadQueue in un database SQLite (modalità WAL) nella
+cartella dati dell'applicazione, così un crash o una chiusura a metà coda
+non fanno perdere né i job in attesa né quelli in corso:
+- tabella jobs: stato corrente di ogni job (queued, running, paused,
+  complete, error, cancelled, skipped) con le opzioni effettive del download
+- tabella journal: ogni transizione di stato, scritta nella stessa
+  transazione dell'aggiornamento
+
+All'avvio restore() della DownloadQueue rimette in coda i job queued e
+running (e ripristina in pausa quelli paused); per quelli interrotti a metà yt-dlp riprende dal file .part
+(continuedl), perché vengono riusate le stesse opzioni di output. Il
+daemon fa lo stesso con un proprio database (DAEMON_CONFIG.JOB_STORE_FILE_NAME),
+salvando anche la priorità dei job.
+
+Le scritture sono brevi transazioni con synchronous=NORMAL: in WAL
+sopravvivono al crash del processo senza un fsync per ogni job. Un
+errore SQLite viene loggato e non interrompe mai i download.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import JOB_STORE_CONFIG
+from .utils import get_app_data_dir
+
+# Stati persistiti
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_PAUSED = "paused"
+STATE_COMPLETE = "complete"
+STATE_ERROR = "error"
+STATE_CANCELLED = "cancelled"
+STATE_SKIPPED = "skipped"  # Già nell'archivio dei download
+
+PENDING_STATES: tuple[str, ...] = (STATE_QUEUED, STATE_RUNNING, STATE_PAUSED)
+FINISHED_STATES: tuple[str, ...] = (STATE_COMPLETE, STATE_ERROR, STATE_CANCELLED, STATE_SKIPPED)
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    url         TEXT NOT NULL,
+    title       TEXT,
+    mode        TEXT,
+    quality     TEXT,
+    output_path TEXT,
+    priority    INTEGER NOT NULL DEFAULT 0,
+    state       TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state_position ON jobs (state, position);
+CREATE TABLE IF NOT EXISTS journal (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id  TEXT NOT NULL,
+    state   TEXT NOT NULL,
+    ts      REAL NOT NULL,
+    detail  TEXT
+);
+CREATE INDEX IF NOT EXISTS journal_job ON journal (job_id);
+"""
+
+
+# Migrazioni: versione -> statement per arrivarci dalla precedente
+_MIGRATIONS: Dict[int, str] = {
+    2: "ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def default_db_path(file_name: str = JOB_STORE_CONFIG.DB_FILE_NAME) -> str:
+    """Percorso del database nella cartella dati dell'applicazione."""
+    return os.path.join(get_app_data_dir(), file_name)
+
+
+class JobStore:
+    """
+    Stato dei job su SQLite, condiviso tra GUI e worker (thread-safe).
+
+    Args:
+        path: File del database (":memory:" per i test)
+
+    Examples:
+        >>> store = JobStore(":memory:")
+        >>> store.add_job("a1b2c3d4", "https://example.com/v", title="Video")
+        >>> store.transition("a1b2c3d4", STATE_RUNNING, output_path="/tmp/out")
+        >>> [(row["id"], row["state"], row["output_path"]) for row in store.pending()]
+        [('a1b2c3d4', 'running', '/tmp/out')]
+        >>> store.transition("a1b2c3d4", STATE_COMPLETE)
+        >>> store.pending()
+        []
+        >>> [state for state, _, _ in store.history("a1b2c3d4")]
+        ['queued', 'running', 'complete']
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=JOB_STORE_CONFIG.BUSY_TIMEOUT,
+            check_same_thread=False,
+            isolation_level=None,  # transazioni esplicite
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        row = self._conn.execute("SELECT COALESCE(MAX(position), 0) FROM jobs").fetchone()
+        self._next_position = row[0] + 1
+        self.prune()
+
+    def _migrate(self) -> None:
+        """Aggiorna un database creato da una versione precedente."""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'jobs'").fetchone()
+        if not exists:
+            return
+        for target in range(max(version, 1) + 1, SCHEMA_VERSION + 1):
+            self._conn.execute(_MIGRATIONS[target])
+
+    @classmethod
+    def open_default(cls, file_name: str = JOB_STORE_CONFIG.DB_FILE_NAME) -> Optional["JobStore"]:
+        """
+        Apre il database nella cartella dati dell'applicazione.
+
+        Args:
+            file_name: Nome del file (la GUI e il daemon usano database separati)
+
+        Returns:
+            None se disattivato da config o se il database non è utilizzabile
+            (la coda funziona comunque, solo in memoria)
+        """
+        if not JOB_STORE_CONFIG.ENABLED:
+            return None
+        path = default_db_path(file_name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return cls(path)
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Job store not available ({path}): {e}")
+            return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Scritture
+    # ------------------------------------------------------------------
+
+    def _write(self, statements: Iterable[tuple]) -> None:
+        """
+        Esegue più statement in una transazione; gli errori vengono solo loggati.
+
+        Ogni statement è (sql, params): params tupla per execute, lista di
+        tuple per executemany.
+        """
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        self._conn.executemany(sql, params)
+                    else:
+                        self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                logging.warning(f"Job store write failed: {e}")
+                try:
+                    self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+
+    def add_job(
+        self,
+        job_id: str,
+        url: str,
+        title: Optional[str] = None,
+        mode: Optional[str] = None,
+        quality: Optional[str] = None,
+        output_path: Optional[str] = None,
+        priority: int = 0,
+    ) -> None:
+        """Registra un job appena accodato (in fondo alla coda)."""
+        self.add_jobs([{
+            "id": job_id, "url": url, "title": title, "mode": mode,
+            "quality": quality, "output_path": output_path, "priority": priority,
+        }])
+
+    def add_jobs(self, jobs: Iterable[Dict[str, Any]]) -> None:
+        """
+        Registra più job in una transazione, nell'ordine dato.
+
+        Args:
+            jobs: Dict con id e url, più title, mode, quality, output_path,
+                priority opzionali
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        now = time.time()
+        with self._lock:
+            first = self._next_position
+            self._next_position += len(jobs)
+        self._write((
+            (
+                "INSERT OR REPLACE INTO jobs (id, url, title, mode, quality, output_path, priority, state, "
+                "position, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        job["id"], job["url"], job.get("title"), job.get("mode"), job.get("quality"),
+                        job.get("output_path"), job.get("priority", 0), STATE_QUEUED, first + i, now, now,
+                    )
+                    for i, job in enumerate(jobs)
+                ],
+            ),
+            (
+                "INSERT INTO journal (job_id, state, ts) VALUES (?, ?, ?)",
+                [(job["id"], STATE_QUEUED, now) for job in jobs],
+            ),
+        ))
+
+    def set_title(self, job_id: str, title: str) -> None:
+        self._write((("UPDATE jobs SET title = ? WHERE id = ?", (title, job_id)),))
+
+    def set_priority(self, job_id: str, priority: int) -> None:
+        self._write((("UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id)),))
+
+    def transition(
+        self,
+        job_id: str,
+        state: str,
+        error: Optional[str] = None,
+        detail: Optional[str] = None,
+        **options: Optional[str],
+    ) -> None:
+        """
+        Cambia lo stato di un job e lo annota nel journal.
+
+        Args:
+            job_id: Id del job
+            state: Nuovo stato
+            error: Messaggio d'errore (stato error)
+            detail: Nota per il journal (default: l'errore)
+            **options: mode/quality/output_path effettivi da salvare (es. al
+                passaggio a running, per riprendere il .part dopo un crash)
+        """
+        now = time.time()
+        assignments = ["state = ?", "updated_at = ?", "error = ?"]
+        params: List[Any] = [state, now, error]
+        for column in ("mode", "quality", "output_path"):
+            if options.get(column) is not None:
+                assignments.append(f"{column} = ?")
+                params.append(options[column])
+        params.append(job_id)
+
+        self._write((
+            (f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", tuple(params)),
+            ("INSERT INTO journal (job_id, state, ts, detail) VALUES (?, ?, ?, ?)", (job_id, state, now, detail or error)),
+        ))
+
+    def remove(self, job_ids: Iterable[str]) -> None:
+        """Elimina job (e journal) rimossi dalla coda dall'utente."""
+        ids = [(job_id,) for job_id in job_ids]
+        if ids:
+            self._write((
+                ("DELETE FROM jobs WHERE id = ?", ids),
+                ("DELETE FROM journal WHERE job_id = ?", ids),
+            ))
+
+    def prune(self, keep: int = JOB_STORE_CONFIG.MAX_FINISHED_JOBS) -> None:
+        """Mantiene solo gli ultimi `keep` job conclusi."""
+        placeholders = ", ".join("?" for _ in FINISHED_STATES)
+        stale = (
+            f"SELECT id FROM jobs WHERE state IN ({placeholders}) "
+            "ORDER BY updated_at DESC LIMIT -1 OFFSET ?"
+        )
+        params = (*FINISHED_STATES, keep)
+        self._write((
+            (f"DELETE FROM journal WHERE job_id IN ({stale})", params),
+            (f"DELETE FROM jobs WHERE id IN ({stale})", params),
+        ))
+
+    # ------------------------------------------------------------------
+    # Letture
+    # ------------------------------------------------------------------
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Job queued, running o paused, nell'ordine di accodamento."""
+        placeholders = ", ".join("?" for _ in PENDING_STATES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE state IN ({placeholders}) ORDER BY position", PENDING_STATES
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def history(self, job_id: str) -> List[tuple]:
+        """Transizioni del job: (stato, timestamp, dettaglio)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, ts, detail FROM journal WHERE job_id = ? ORDER BY seq", (job_id,)
+            ).fetchall()
+        return [tuple(row) for row in rows]
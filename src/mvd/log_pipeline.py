@@ -0,0 +1,281 @@
+"""
+Pipeline di logging asincrona per Modern Video Downloader.
+
+I thread di download e progress non scrivono mai direttamente su file:
+accodano il record in una queue (QueueHandler) e un thread listener
+dedicato si occupa di formattazione, I/O e rotazione. Opzionalmente i
+file ruotati vengono compressi in gzip da un thread in background.
+
+Fornisce inoltre il contesto per-job (job_id, url) propagato ai record
+e un formatter JSON-lines per log interrogabili senza regex.
+"""
+
+import atexit
+import contextvars
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# ============================================================================
+# CONTESTO PER-JOB
+# ============================================================================
+
+# Campi strutturati riconosciuti nei record (passati via extra={...})
+STRUCTURED_FIELDS: tuple[str, ...] = ("job_id", "url", "phase", "bytes", "duration", "exc_class")
+
+_job_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "mvd_job_context", default={}
+)
+
+
+@contextmanager
+def job_context(**fields: Any) -> Iterator[None]:
+    """
+    Associa job_id/url ai record di log emessi nel blocco.
+
+    I campi si sommano a quelli di un eventuale contesto esterno, così
+    download_video() può aggiungere l'URL al job_id impostato dal worker.
+    Il contesto è per-thread (contextvars): i thread creati nel blocco
+    non lo ereditano.
+
+    Args:
+        **fields: Campi da associare (tipicamente job_id e url)
+
+    Examples:
+        >>> with job_context(job_id="a1b2c3d4", url="https://example.com/v"):
+        ...     logging.info("Starting download")
+    """
+    token = _job_context.set({**_job_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _job_context.reset(token)
+
+
+def current_job_context() -> Dict[str, Any]:
+    """Campi del contesto job corrente (dict vuoto se nessuno)."""
+    return dict(_job_context.get())
+
+
+class JobContextFilter(logging.Filter):
+    """
+    Copia il contesto job corrente nel record.
+
+    Va installato sull'handler che riceve i record nel thread chiamante
+    (il QueueHandler in modalità asincrona), perché il contesto non
+    attraversa la queue verso il listener. I campi passati esplicitamente
+    con extra={...} hanno precedenza.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _job_context.get().items():
+            if getattr(record, key, None) is None:
+                setattr(record, key, value)
+        return True
+
+
+# ============================================================================
+# JSON FORMATTER
+# ============================================================================
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatter JSON-lines: un oggetto JSON per riga.
+
+    Ogni riga contiene sempre ts, level, msg, thread e i campi
+    strutturati (job_id, url, phase, bytes, duration, exc_class),
+    a null se assenti, più exc con il traceback quando presente.
+
+    Examples:
+        {"ts": "2026-02-01T12:00:00.123+01:00", "level": "INFO",
+         "msg": "Download completed", "thread": "DownloadWorkerThread",
+         "job_id": "a1b2c3d4", "url": "https://...", "phase": "complete",
+         "bytes": 52428800, "duration": 12.4, "exc_class": null}
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+            "logger": record.name,
+            "thread": record.threadName,
+        }
+
+        for key in STRUCTURED_FIELDS:
+            data[key] = getattr(record, key, None)
+
+        if record.exc_info and record.exc_info[0] is not None:
+            if data["exc_class"] is None:
+                data["exc_class"] = record.exc_info[0].__name__
+            data["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+# ============================================================================
+# QUEUE HANDLER
+# ============================================================================
+
+class FastQueueHandler(QueueHandler):
+    """
+    QueueHandler che rimanda la formattazione al thread listener.
+
+    Il QueueHandler standard formatta il record nel thread chiamante;
+    qui il chiamante si limita a risolvere message % args (così eventuali
+    oggetti mutabili non cambiano prima della scrittura) e ad accodare.
+    Timestamp, formatter e traceback vengono elaborati dal listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Copia il record con il messaggio già risolto."""
+        record = logging.makeLogRecord(record.__dict__)
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+# ============================================================================
+# ROTAZIONE CON COMPRESSIONE
+# ============================================================================
+
+def _gzip_file(source: str, dest: str) -> None:
+    """Comprime source in dest (gzip) e rimuove source."""
+    try:
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+    except OSError as e:
+        # Il listener di logging non deve mai morire per un backup
+        print(f"Warning: Could not compress rotated log {source}: {e}", file=sys.stderr)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler che comprime i backup in un thread separato.
+
+    I backup si chiamano app.log.1.gz, app.log.2.gz, ... La rotazione si
+    limita a rinominare il file corrente; la compressione avviene in
+    background così il listener torna subito a scrivere.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._compress_thread: Optional[threading.Thread] = None
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._rotate_and_compress
+
+    def doRollover(self) -> None:
+        # Una sola compressione alla volta: la rotazione deve trovare il .gz
+        # precedente già scritto prima di shiftare app.log.N.gz -> N+1
+        self.wait_for_compression()
+        super().doRollover()
+
+    def _rotate_and_compress(self, source: str, dest: str) -> None:
+        """Rinomina source e avvia la compressione verso dest."""
+        if not os.path.exists(source):
+            return
+
+        pending = f"{source}.{time.time_ns()}.tmp"
+        os.replace(source, pending)
+
+        self._compress_thread = threading.Thread(
+            target=_gzip_file,
+            args=(pending, dest),
+            daemon=True,
+            name="LogCompressThread"
+        )
+        self._compress_thread.start()
+
+    def wait_for_compression(self, timeout: Optional[float] = None) -> None:
+        """Attende la fine della compressione in corso (se presente)."""
+        if self._compress_thread is not None:
+            self._compress_thread.join(timeout)
+            self._compress_thread = None
+
+    def close(self) -> None:
+        self.wait_for_compression()
+        super().close()
+
+
+# ============================================================================
+# LISTENER LIFECYCLE
+# ============================================================================
+
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def start_logging_pipeline(handlers: List[logging.Handler]) -> QueueHandler:
+    """
+    Avvia il thread listener che scrive sugli handler indicati.
+
+    Se una pipeline è già attiva viene fermata (e svuotata) prima di
+    avviarne una nuova, così setup_logger() resta idempotente.
+
+    Args:
+        handlers: Handler reali (file, console) gestiti dal listener
+
+    Returns:
+        QueueHandler da agganciare al root logger
+
+    Examples:
+        >>> handler = start_logging_pipeline([logging.StreamHandler()])
+        >>> logging.getLogger().addHandler(handler)
+    """
+    global _listener
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    with _listener_lock:
+        if _listener is not None:
+            _stop_listener_locked()
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        if _listener._thread is not None:
+            _listener._thread.name = "LogListenerThread"
+
+    return FastQueueHandler(log_queue)
+
+
+def stop_logging_pipeline() -> None:
+    """
+    Svuota la queue, ferma il listener e chiude gli handler.
+
+    Registrata con atexit: i record accodati prima della chiusura
+    dell'applicazione vengono comunque scritti su file.
+    """
+    with _listener_lock:
+        _stop_listener_locked()
+
+
+def _stop_listener_locked() -> None:
+    """Ferma il listener corrente (chiamare con _listener_lock acquisito)."""
+    global _listener
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        try:
+            handler.close()
+        except Exception:
+            pass
+    _listener = None
+
+
+atexit.register(stop_logging_pipeline)
@@ -0,0 +1,167 @@
+"""
+Modello del log visualizzato nella GUI.
+
+Il log box mostra solo le ultime righe: questo modulo mantiene un ring
+buffer limitato con livello e job di ogni riga, così la GUI può filtrare
+e ridisegnare la vista senza crescere all'infinito. Lo storico completo
+resta nel file di log rotante configurato da setup_logger().
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, List, Optional
+
+from .config import LOG_CONFIG
+
+
+# ============================================================================
+# LOG ENTRY
+# ============================================================================
+
+@dataclass(frozen=True)
+class LogEntry:
+    """Singola riga del log GUI."""
+
+    text: str
+    level: int = logging.INFO
+    job: Optional[str] = None
+
+
+# ============================================================================
+# RING BUFFER
+# ============================================================================
+
+class LogBuffer:
+    """
+    Ring buffer delle righe di log mostrate nella GUI.
+
+    Le righe più vecchie vengono scartate automaticamente quando si supera
+    max_lines. I filtri (livello minimo e job) sono applicati in lettura,
+    quindi cambiarli non perde righe già registrate.
+
+    Examples:
+        >>> buf = LogBuffer(max_lines=2)
+        >>> _ = buf.append("uno")
+        >>> _ = buf.append("due", level=logging.ERROR, job="a1b2c3d4")
+        >>> _ = buf.append("tre")
+        >>> [e.text for e in buf.visible()]
+        ['due', 'tre']
+        >>> buf.min_level = logging.ERROR
+        >>> [e.text for e in buf.visible()]
+        ['due']
+
+    Note:
+        Non è thread-safe: va usato solo dal main thread Tk.
+    """
+
+    def __init__(self, max_lines: int = LOG_CONFIG.LOG_VIEW_MAX_LINES) -> None:
+        self._entries: Deque[LogEntry] = deque(maxlen=max(1, max_lines))
+        self._job_labels: Dict[str, str] = {}
+        self.min_level: int = logging.DEBUG
+        self.job_filter: Optional[str] = None
+
+    @property
+    def max_lines(self) -> int:
+        """Numero massimo di righe mantenute in memoria."""
+        return self._entries.maxlen or 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(
+        self,
+        text: str,
+        level: int = logging.INFO,
+        job: Optional[str] = None,
+        job_label: Optional[str] = None,
+    ) -> LogEntry:
+        """
+        Aggiunge una riga al buffer.
+
+        Args:
+            text: Testo della riga
+            level: Livello logging (logging.INFO, logging.ERROR, ...)
+            job: Id del job a cui appartiene la riga (None se globale)
+            job_label: Etichetta leggibile del job per il filtro
+
+        Returns:
+            LogEntry registrata
+        """
+        entry = LogEntry(text=text, level=level, job=job)
+        self._entries.append(entry)
+        if job is not None and (job_label or job not in self._job_labels):
+            self._job_labels[job] = job_label or job
+        return entry
+
+    def matches(self, entry: LogEntry) -> bool:
+        """True se la riga passa i filtri correnti."""
+        if entry.level < self.min_level:
+            return False
+        if self.job_filter is not None and entry.job != self.job_filter:
+            return False
+        return True
+
+    def visible(self) -> List[LogEntry]:
+        """Righe che passano i filtri correnti, dalla più vecchia."""
+        return [entry for entry in self._entries if self.matches(entry)]
+
+    def jobs(self) -> Dict[str, str]:
+        """
+        Job presenti nel buffer, in ordine di prima apparizione.
+
+        Returns:
+            Dict {job_id: etichetta}. Le etichette dei job ormai usciti
+            dal buffer vengono eliminate.
+        """
+        seen: Dict[str, str] = {}
+        for entry in self._entries:
+            if entry.job is not None and entry.job not in seen:
+                seen[entry.job] = self._job_labels.get(entry.job, entry.job)
+        self._job_labels = dict(seen)
+        return seen
+
+    def clear(self) -> None:
+        """Svuota il buffer (i filtri restano invariati)."""
+        self._entries.clear()
+        self._job_labels.clear()
+
+
+def format_entries(entries: Iterable[LogEntry]) -> str:
+    """
+    Concatena le righe in un unico testo (una riga per entry).
+
+    Args:
+        entries: Righe da formattare
+
+    Returns:
+        Testo con newline finale, o stringa vuota
+    """
+    return "".join(f"{entry.text}\n" for entry in entries)
+
+
+def text_lines(text: str) -> int:
+    """
+    Righe occupate da un messaggio nel log box (i newline interni contano).
+
+    Examples:
+        >>> text_lines("uno")
+        1
+        >>> text_lines("Traceback:\\n  File x\\nValueError")
+        3
+    """
+    return text.count("\n") + 1
+
+
+def level_from_name(name: str) -> int:
+    """
+    Converte il nome di un livello ("INFO", "ERROR", ...) nel valore numerico.
+
+    Args:
+        name: Nome livello
+
+    Returns:
+        Valore logging corrispondente (logging.INFO se sconosciuto)
+    """
+    value = logging.getLevelName(name.upper())
+    return value if isinstance(value, int) else logging.INFO
@@ -1,16 +1,61 @@
+import sys
+
 from .utils import setup_ffmpeg, setup_logger
-from .gui import VideoDownloaderGUI
 
 
 def main():
     """
     Entry point dell'applicazione
+
+    Con "cli" come primo argomento avvia la modalità batch senza GUI
+    (vedi mvd.cli), con "daemon" l'API HTTP locale (vedi mvd.daemon), con
+    "archive" la gestione dell'archivio dei download (vedi mvd.archive);
+    la GUI e le sue dipendenze vengono importate solo quando servono.
+
+    Altrimenti gli argomenti sono URL da accodare: se la GUI è già aperta
+    vengono inoltrati all'istanza attiva (vedi mvd.single_instance) e il
+    processo termina senza caricare customtkinter e yt-dlp.
     """
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == "cli":
+        from .cli import main as cli_main
+        sys.exit(cli_main(sys.argv[2:]))
+
+    if command == "daemon":
+        from .daemon import main as daemon_main
+        sys.exit(daemon_main(sys.argv[2:]))
+
+    if command == "archive":
+        from .archive import main as archive_main
+        sys.exit(archive_main(sys.argv[2:]))
+
+    from .single_instance import InstanceServer, forward_to_running_instance, single_instance_enabled
+
+    urls = sys.argv[1:]
+    single_instance = single_instance_enabled()
+    if single_instance and forward_to_running_instance(urls):
+        sys.exit(0)
+
+    from .gui import VideoDownloaderGUI
+
     setup_logger()
     setup_ffmpeg()
 
     app = VideoDownloaderGUI()
-    app.mainloop()
+    if urls:
+        app.submit_external_urls(urls)
+
+    server = None
+    if single_instance:
+        server = InstanceServer(app.submit_external_urls)
+        server.start()
+
+    try:
+        app.mainloop()
+    finally:
+        if server is not None:
+            server.close()
 
 
 if __name__ == "__main__":
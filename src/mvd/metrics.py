@@ -0,0 +1,367 @@
+"""
+Metriche di performance per-job per Modern Video Downloader.
+
+Misura separatamente le fasi di ogni download (attesa in coda,
+estrazione, trasferimento, post-processing FFmpeg, finalizzazione),
+i byte scaricati, il throughput medio e i retry. Gli aggregati
+(istogrammi e totali) vengono esportati in:
+- un file JSON leggibile
+- un file di testo Prometheus per il textfile collector di node_exporter
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from .config import METRICS_CONFIG
+from .utils import get_app_data_dir
+
+
+# ============================================================================
+# FASI
+# ============================================================================
+
+PHASE_QUEUE_WAIT = "queue_wait"
+PHASE_EXTRACT = "extract"
+PHASE_TRANSFER = "transfer"
+PHASE_POSTPROCESS = "postprocess"
+PHASE_FINALIZE = "finalize"
+
+PHASES: tuple[str, ...] = (
+    PHASE_QUEUE_WAIT,
+    PHASE_EXTRACT,
+    PHASE_TRANSFER,
+    PHASE_POSTPROCESS,
+    PHASE_FINALIZE,
+)
+
+
+# ============================================================================
+# METRICHE DEL SINGOLO JOB
+# ============================================================================
+
+@dataclass
+class JobMetrics:
+    """
+    Metriche di un singolo job di download.
+
+    Le fasi sono sequenziali: enter() chiude la fase corrente e ne apre
+    un'altra. Una fase può ripetersi (es. transfer video + transfer audio)
+    e le durate si sommano.
+
+    Examples:
+        >>> m = JobMetrics(job_id="a1b2c3d4", url="https://example.com/v")
+        >>> m.enter(PHASE_EXTRACT)
+        >>> m.enter(PHASE_TRANSFER)
+        >>> m.finish("complete")
+        >>> sorted(m.phases)
+        ['extract', 'transfer']
+    """
+
+    job_id: Optional[str] = None
+    url: str = ""
+    phases: Dict[str, float] = field(default_factory=dict)
+    bytes: int = 0
+    retries: int = 0
+    outcome: str = "running"
+    _phase: Optional[str] = field(default=None, repr=False)
+    _phase_started: float = field(default=0.0, repr=False)
+    _started: float = field(default_factory=time.monotonic, repr=False)
+    _finished: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def host(self) -> str:
+        """Host dell'URL (label per le metriche)."""
+        return (urlparse(self.url).hostname or "").lower()
+
+    @property
+    def current_phase(self) -> Optional[str]:
+        """Fase in corso (None se nessuna)."""
+        return self._phase
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        """Somma una durata misurata esternamente (es. attesa in coda)."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(0.0, seconds)
+
+    def enter(self, phase: str) -> None:
+        """Chiude la fase corrente e avvia phase (no-op se già attiva)."""
+        if phase == self._phase:
+            return
+        now = time.monotonic()
+        self._close_phase(now)
+        self._phase = phase
+        self._phase_started = now
+
+    def finish(self, outcome: str) -> None:
+        """Chiude l'ultima fase e registra l'esito del job."""
+        now = time.monotonic()
+        self._close_phase(now)
+        self._phase = None
+        self._finished = now
+        self.outcome = outcome
+
+    def _close_phase(self, now: float) -> None:
+        if self._phase is not None:
+            self.add_phase(self._phase, now - self._phase_started)
+
+    @property
+    def duration(self) -> float:
+        """Durata complessiva del job (esclusa l'attesa in coda)."""
+        end = self._finished if self._finished is not None else time.monotonic()
+        return end - self._started
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Throughput medio in byte/s durante la fase transfer."""
+        transfer = self.phases.get(PHASE_TRANSFER, 0.0)
+        if transfer <= 0 or self.bytes <= 0:
+            return None
+        return self.bytes / transfer
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Riepilogo serializzabile in JSON."""
+        return {
+            "job_id": self.job_id,
+            "url": self.url,
+            "host": self.host,
+            "outcome": self.outcome,
+            "duration": round(self.duration, 3),
+            "phases": {k: round(v, 3) for k, v in self.phases.items()},
+            "bytes": self.bytes,
+            "throughput": round(self.throughput, 1) if self.throughput else None,
+            "retries": self.retries,
+        }
+
+
+# ============================================================================
+# ISTOGRAMMA
+# ============================================================================
+
+class Histogram:
+    """
+    Istogramma a bucket fissi in stile Prometheus.
+
+    Args:
+        buckets: Limiti superiori (crescenti) dei bucket; +Inf implicito
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """Registra un valore."""
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[tuple[str, int]]:
+        """Coppie (le, conteggio cumulativo) incluso +Inf."""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((_fmt_float(bound), total))
+        result.append(("+Inf", total + self.counts[-1]))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "avg": round(self.sum / self.count, 3) if self.count else None,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+def _fmt_float(value: float) -> str:
+    """Formatta un limite di bucket senza zeri inutili (1.0 -> "1")."""
+    return f"{value:g}"
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class MetricsRegistry:
+    """
+    Aggregati delle metriche di tutti i job (thread-safe).
+
+    Examples:
+        >>> registry = MetricsRegistry()
+        >>> job = JobMetrics(url="https://example.com/v")
+        >>> job.finish("complete")
+        >>> registry.record(job)
+        >>> "mvd_jobs_total" in registry.to_prometheus()
+        True
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._phase_hist: Dict[str, Histogram] = {
+            phase: Histogram(METRICS_CONFIG.DURATION_BUCKETS) for phase in PHASES
+        }
+        self._duration_hist = Histogram(METRICS_CONFIG.DURATION_BUCKETS)
+        self._throughput_hist = Histogram(METRICS_CONFIG.THROUGHPUT_BUCKETS)
+        self._jobs_total: Dict[str, int] = {}
+        self._bytes_total: int = 0
+        self._retries_total: int = 0
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=METRICS_CONFIG.RECENT_JOBS)
+        self._last_export: float = 0.0
+
+    def record(self, job: JobMetrics) -> None:
+        """Aggiunge un job concluso agli aggregati."""
+        summary = job.to_dict()
+        with self._lock:
+            for phase, seconds in job.phases.items():
+                hist = self._phase_hist.get(phase)
+                if hist is None:
+                    hist = self._phase_hist[phase] = Histogram(METRICS_CONFIG.DURATION_BUCKETS)
+                hist.observe(seconds)
+            self._duration_hist.observe(job.duration)
+            if job.throughput:
+                self._throughput_hist.observe(job.throughput)
+            self._jobs_total[job.outcome] = self._jobs_total.get(job.outcome, 0) + 1
+            self._bytes_total += job.bytes
+            self._retries_total += job.retries
+            self._recent.append(summary)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot degli aggregati in formato JSON."""
+        with self._lock:
+            return {
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "totals": {
+                    "jobs": dict(self._jobs_total),
+                    "bytes": self._bytes_total,
+                    "retries": self._retries_total,
+                },
+                "phases": {p: h.to_dict() for p, h in self._phase_hist.items()},
+                "job_duration": self._duration_hist.to_dict(),
+                "throughput": self._throughput_hist.to_dict(),
+                "recent_jobs": list(self._recent),
+            }
+
+    def to_prometheus(self) -> str:
+        """Aggregati in formato Prometheus text exposition (v0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                "# HELP mvd_job_phase_seconds Time spent by download jobs in each phase.",
+                "# TYPE mvd_job_phase_seconds histogram",
+            ]
+            for phase, hist in self._phase_hist.items():
+                lines += _prom_histogram("mvd_job_phase_seconds", hist, f'phase="{phase}"')
+
+            lines += [
+                "# HELP mvd_job_duration_seconds Total duration of download jobs.",
+                "# TYPE mvd_job_duration_seconds histogram",
+            ]
+            lines += _prom_histogram("mvd_job_duration_seconds", self._duration_hist)
+
+            lines += [
+                "# HELP mvd_job_throughput_bytes_per_second Average transfer throughput per job.",
+                "# TYPE mvd_job_throughput_bytes_per_second histogram",
+            ]
+            lines += _prom_histogram("mvd_job_throughput_bytes_per_second", self._throughput_hist)
+
+            lines += [
+                "# HELP mvd_jobs_total Download jobs finished, by outcome.",
+                "# TYPE mvd_jobs_total counter",
+            ]
+            for outcome, count in sorted(self._jobs_total.items()):
+                lines.append(f'mvd_jobs_total{{outcome="{outcome}"}} {count}')
+
+            lines += [
+                "# HELP mvd_downloaded_bytes_total Bytes downloaded by finished jobs.",
+                "# TYPE mvd_downloaded_bytes_total counter",
+                f"mvd_downloaded_bytes_total {self._bytes_total}",
+                "# HELP mvd_retries_total Retries reported by yt-dlp.",
+                "# TYPE mvd_retries_total counter",
+                f"mvd_retries_total {self._retries_total}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path: Optional[str] = None, prom_path: Optional[str] = None) -> None:
+        """
+        Scrive JSON e testo Prometheus in modo atomico (tmp + rename).
+
+        Args:
+            json_path: Path del file JSON (default da get_metrics_paths())
+            prom_path: Path del file .prom (default da get_metrics_paths())
+        """
+        default_json, default_prom = get_metrics_paths()
+        json_path = json_path or default_json
+        prom_path = prom_path or default_prom
+
+        try:
+            _atomic_write(json_path, json.dumps(self.to_dict(), indent=2, ensure_ascii=False))
+            _atomic_write(prom_path, self.to_prometheus())
+        except OSError as e:
+            logging.warning(f"Could not export metrics: {e}")
+
+        with self._lock:
+            self._last_export = time.monotonic()
+
+    def maybe_export(self) -> None:
+        """Esporta solo se è passato METRICS_EXPORT_INTERVAL dall'ultimo export."""
+        with self._lock:
+            due = time.monotonic() - self._last_export >= METRICS_CONFIG.EXPORT_INTERVAL
+        if due:
+            self.export()
+
+
+def _prom_histogram(name: str, hist: Histogram, labels: str = "") -> List[str]:
+    """Righe Prometheus (_bucket, _sum, _count) per un istogramma."""
+    prefix = f"{labels}," if labels else ""
+    suffix = f"{{{labels}}}" if labels else ""
+    lines = [
+        f'{name}_bucket{{{prefix}le="{le}"}} {count}'
+        for le, count in hist.cumulative()
+    ]
+    lines.append(f"{name}_sum{suffix} {hist.sum:.6f}")
+    lines.append(f"{name}_count{suffix} {hist.count}")
+    return lines
+
+
+def _atomic_write(path: str, content: str) -> None:
+    """Scrive un file in modo atomico (il collector non legge mai file parziali)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def get_metrics_paths() -> tuple[str, str]:
+    """
+    Path dei file di export metriche.
+
+    Returns:
+        Tupla (json_path, prom_path). Il file .prom va nella directory
+        indicata da MVD_METRICS_TEXTFILE_DIR (textfile collector di
+        node_exporter) se impostata, altrimenti accanto al JSON.
+    """
+    metrics_dir = os.path.join(get_app_data_dir(), METRICS_CONFIG.METRICS_DIR_NAME)
+    prom_dir = os.getenv("MVD_METRICS_TEXTFILE_DIR") or metrics_dir
+    return (
+        os.path.join(metrics_dir, METRICS_CONFIG.JSON_FILE_NAME),
+        os.path.join(prom_dir, METRICS_CONFIG.PROM_FILE_NAME),
+    )
+
+
+# Registry globale dell'applicazione
+METRICS = MetricsRegistry()
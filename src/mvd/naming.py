@@ -0,0 +1,313 @@
+"""
+Nomi dei file di output senza collisioni per Modern Video Downloader.
+
+Il nome finale viene dal titolo (%(title)s.%(ext)s). Con più job in
+parallelo e titoli uguali due download finirebbero sullo stesso file, e
+cercare "nome (1)", "nome (2)", ... con un os.path.exists per candidato
+non riserva nulla tra il controllo e la scrittura. Qui:
+- NameIndex tiene, per cartella, i nomi già presenti su disco (una
+  scansione os.scandir, ripetuta solo se la cartella è cambiata da più di
+  NAMING_CONFIG.RESCAN_INTERVAL secondi) e quelli riservati dai job attivi
+- reserve() assegna sotto lock il primo nome libero, in O(1) ammortizzato
+  grazie a un contatore per nome base
+- OutputName è la prenotazione di un job: la stessa chiave (owner) riceve
+  sempre lo stesso nome, così pausa e ripresa continuano dal .part
+
+Il nome riservato è la parte comune a tutti i file del job (video, audio,
+.part, temporanei FFmpeg): download_video lo passa a yt-dlp con un
+pre-processor che lo scrive nel campo mvd_stem dell'info_dict, usato da
+OUTPUT_TEMPLATE al posto del titolo.
+
+Un nome presente su disco solo con file incompleti (.part di una sessione
+interrotta) viene assegnato al primo job con lo stesso titolo, che riprende
+il download come faceva yt-dlp prima dell'indice.
+"""
+
+import glob
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .config import NAMING_CONFIG
+
+# Campo dell'info_dict con il nome riservato (fallback: il titolo)
+STEM_FIELD = "mvd_stem"
+OUTPUT_TEMPLATE = f"%({STEM_FIELD},title)s.%(ext)s"
+
+# File system che non distinguono maiuscole e minuscole
+_CASE_INSENSITIVE = os.name == "nt" or sys.platform == "darwin"
+
+
+def _key(stem: str) -> str:
+    return stem.casefold() if _CASE_INSENSITIVE else stem
+
+
+def _is_partial(name: str) -> bool:
+    return name.endswith(NAMING_CONFIG.PARTIAL_SUFFIXES) or any(
+        marker in name for marker in NAMING_CONFIG.PARTIAL_INFIXES
+    )
+
+
+# Suffissi aggiunti da yt-dlp e FFmpeg al nome base, dall'ultimo al primo
+_PARTIAL_SUFFIX = re.compile(r"\.(?:part(?:-Frag\d+)?|ytdl)$")
+_EXTENSION = re.compile(r"\.([0-9A-Za-z]{1,5})$")
+_SIDECAR_QUALIFIER = re.compile(r"\.(?:info|live_chat|annotations|[a-z]{2,3}(?:-[0-9A-Za-z]+)*)$")
+_TEMP_SUFFIX = re.compile(r"\.temp$")
+_FORMAT_SUFFIX = re.compile(r"\.f(?:\d[\w-]*|(?:hls|dash|http)-[\w-]+)$")
+
+
+def _stem(name: str) -> str:
+    """
+    Nome base che un file occupa: il nome senza i suffissi di yt-dlp.
+
+    Il titolo può contenere punti, quindi si tolgono solo suffissi noti:
+    .part/.ytdl, l'estensione (media o file accessorio: miniatura,
+    sottotitoli con la lingua, .info.json), .temp di FFmpeg e l'id del
+    formato (.f137). Un file di altro tipo perde solo un'estensione breve.
+
+    Examples:
+        >>> _stem("Mr. Robot.f137.mp4.part-Frag3")
+        'Mr. Robot'
+        >>> _stem("Mr. Robot.en.vtt")
+        'Mr. Robot'
+        >>> _stem("v1.2 notes.txt")
+        'v1.2 notes'
+    """
+    name = _PARTIAL_SUFFIX.sub("", name)
+    match = _EXTENSION.search(name)
+    if match is None:
+        return name
+    ext = match.group(1).lower()
+    stem = name[:match.start()]
+    if ext in NAMING_CONFIG.SIDECAR_EXTENSIONS:
+        return _SIDECAR_QUALIFIER.sub("", stem) or stem
+    if ext in NAMING_CONFIG.MEDIA_EXTENSIONS:
+        return _FORMAT_SUFFIX.sub("", _TEMP_SUFFIX.sub("", stem)) or stem
+    return stem or name
+
+
+# ============================================================================
+# INDICE PER CARTELLA
+# ============================================================================
+
+class NameIndex:
+    """
+    Nomi occupati in una cartella di output, condivisi tra i worker.
+
+    Args:
+        directory: Cartella di output (scansionata al primo utilizzo)
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._final: Set[str] = set()  # Nomi con almeno un file completo
+        self._partial: Set[str] = set()  # Nomi con soli file incompleti
+        self._reserved: Dict[str, str] = {}  # Nome -> owner
+        self._owned: Dict[str, str] = {}  # Owner -> nome riservato
+        self._next: Dict[str, int] = {}  # Nome base -> prossimo suffisso da provare
+        self._mtime: Optional[int] = None
+        self._scanned_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Scansione
+    # ------------------------------------------------------------------
+
+    def _scan(self) -> None:
+        """Rilegge la cartella (chiamato con il lock)."""
+        final: Set[str] = set()
+        partial: Set[str] = set()
+        try:
+            self._mtime = os.stat(self.directory).st_mtime_ns
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    target = partial if _is_partial(entry.name) else final
+                    target.add(_key(_stem(entry.name)))
+        except FileNotFoundError:
+            self._mtime = None
+        except OSError as e:
+            logging.warning(f"Cannot scan output directory {self.directory}: {e}")
+
+        self._final = final
+        self._partial = partial - final
+        self._next.clear()
+        self._scanned_at = time.monotonic()
+        logging.debug(f"Scanned {self.directory}: {len(final)} names in use, {len(self._partial)} partial")
+
+    def _refresh(self) -> None:
+        """Nuova scansione se la cartella è cambiata e l'ultima è abbastanza vecchia."""
+        if self._scanned_at and time.monotonic() - self._scanned_at < NAMING_CONFIG.RESCAN_INTERVAL:
+            return
+        try:
+            mtime: Optional[int] = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            mtime = None
+        if not self._scanned_at or mtime != self._mtime:
+            self._scan()
+        else:
+            self._scanned_at = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Prenotazioni
+    # ------------------------------------------------------------------
+
+    def reserve(self, stem: str, owner: Optional[str] = None) -> str:
+        """
+        Riserva il primo nome libero tra stem, "stem (1)", "stem (2)", ...
+
+        Args:
+            stem: Nome desiderato, senza estensione
+            owner: Chi riserva (es. la chiave del video): se ha già un nome
+                in questa cartella riceve di nuovo quello
+
+        Returns:
+            Il nome riservato, senza estensione
+        """
+        with self._lock:
+            if owner is not None and owner in self._owned:
+                return self._owned[owner]
+            self._refresh()
+
+            base = _key(stem)
+            candidate, key = stem, base
+            counter = self._next.get(base, 1)
+            if key in self._final or key in self._reserved:
+                while True:
+                    candidate = f"{stem} ({counter})"
+                    key = _key(candidate)
+                    counter += 1
+                    if key not in self._final and key not in self._reserved:
+                        break
+                self._next[base] = counter
+                logging.info(f"Output name {stem!r} already in use, using {candidate!r}")
+            elif key in self._partial:
+                logging.info(f"Resuming partial files of {candidate!r}")
+
+            self._partial.discard(key)
+            self._reserved[key] = owner or ""
+            if owner is not None:
+                self._owned[owner] = candidate
+            return candidate
+
+    def commit(self, stem: str) -> None:
+        """Il job è completato: il nome resta occupato dai suoi file."""
+        with self._lock:
+            key = _key(stem)
+            self._drop(key)
+            self._final.add(key)
+
+    def release(self, stem: str) -> None:
+        """
+        Libera un nome (job annullato o fallito).
+
+        Se sul disco restano file con quel nome, il nome resta occupato
+        (file completi) o riprendibile (solo file incompleti).
+        """
+        pattern = os.path.join(glob.escape(self.directory), f"{glob.escape(stem)}.*")
+        names = [os.path.basename(path) for path in glob.glob(pattern)]
+        with self._lock:
+            key = _key(stem)
+            self._drop(key)
+            if any(not _is_partial(name) for name in names):
+                self._final.add(key)
+            elif names:
+                self._partial.add(key)
+
+    def _drop(self, key: str) -> None:
+        owner = self._reserved.pop(key, None)
+        if owner:
+            self._owned.pop(owner, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_use": len(self._final), "partial": len(self._partial), "reserved": len(self._reserved)}
+
+
+_indexes: Dict[str, NameIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def name_index(directory: str) -> NameIndex:
+    """Indice condiviso della cartella (uno per percorso assoluto)."""
+    path = os.path.normcase(os.path.abspath(directory))
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = NameIndex(path)
+        return index
+
+
+def reserve_filename(directory: str, filename: str) -> str:
+    """
+    Riserva un nome file libero nella cartella ("video.mp4" -> "video (1).mp4").
+
+    Il nome resta riservato per la sessione: due chiamate concorrenti non
+    ricevono mai lo stesso nome.
+    """
+    stem, ext = os.path.splitext(filename)
+    return name_index(directory).reserve(stem) + ext
+
+
+# ============================================================================
+# PRENOTAZIONE DI UN JOB
+# ============================================================================
+
+class OutputName:
+    """
+    Nome di output di un job, riservato quando il titolo è noto.
+
+    Args:
+        directory: Cartella di output
+        owner: Identità del job (es. chiave canonica dell'URL): la ripresa
+            dopo una pausa ottiene lo stesso nome
+    """
+
+    def __init__(self, directory: str, owner: str) -> None:
+        self.index = name_index(directory)
+        self.owner = owner
+        self.stem: Optional[str] = None
+
+    def reserve(self, title: str) -> str:
+        self.stem = self.index.reserve(title, self.owner)
+        return self.stem
+
+    def commit(self) -> None:
+        if self.stem is not None:
+            self.index.commit(self.stem)
+
+    def release(self) -> None:
+        if self.stem is not None:
+            self.index.release(self.stem)
+
+    def preprocessor(self) -> Any:
+        """Pre-processor yt-dlp (fase "after_filter") che riserva il nome."""
+        return _preprocessor_class()(self)
+
+
+@lru_cache(maxsize=None)
+def _preprocessor_class() -> type:
+    # Import differito come in downloader: yt-dlp viene caricato solo al download
+    from yt_dlp.postprocessor.common import PostProcessor
+
+    from .utils import sanitize_filename
+
+    class ReserveOutputNamePP(PostProcessor):
+        """Scrive in STEM_FIELD il nome riservato per il titolo sanificato e troncato."""
+
+        def __init__(self, output: OutputName) -> None:
+            super().__init__()
+            self._output = output
+
+        def run(self, info: Dict[str, Any]) -> Tuple[list, Dict[str, Any]]:
+            # Sanificazione di yt-dlp per %(title)s, poi NFC, nomi riservati
+            # e limite in byte (titoli lunghi non latini superano i 255 byte)
+            title = self._downloader.evaluate_outtmpl("%(title)s", info, True)
+            info[STEM_FIELD] = self._output.reserve(sanitize_filename(title, NAMING_CONFIG.MAX_STEM_BYTES))
+            return [], info
+
+    return ReserveOutputNamePP
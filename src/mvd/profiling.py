@@ -0,0 +1,213 @@
+"""
+Profiling opzionale (cProfile + tracemalloc) per Modern Video Downloader.
+
+Avvolge i punti caldi (download_video, fetch titolo, drain della UI queue)
+in sessioni di cattura che producono, nella directory dati dell'app:
+- un file .prof (cProfile, apribile con snakeviz o pstats)
+- un report .txt con le funzioni più costose e le top-N allocazioni
+
+Attivazione: MVD_PROFILE=1 (tutti i target) oppure MVD_PROFILE=download_video,ui_drain
+(solo i target indicati), o PROFILE_CONFIG.PROFILE_ENABLED.
+
+L'overhead resta limitato: si cattura una chiamata ogni N per target,
+al massimo MAX_SESSIONS catture per processo e una sola alla volta.
+"""
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+from .config import PROFILE_CONFIG
+from .utils import get_app_data_dir
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+# ============================================================================
+# PROFILER
+# ============================================================================
+
+class Profiler:
+    """
+    Gestisce le sessioni di cattura cProfile + tracemalloc.
+
+    Args:
+        targets: Target abilitati; None = tutti, set vuoto = profiling spento
+
+    Examples:
+        >>> profiler = Profiler(targets=None)
+        >>> with profiler.capture("download_video", label="https://example.com/v"):
+        ...     pass  # codice da profilare
+
+    Note:
+        cProfile misura solo il thread che apre la sessione: i thread dei
+        frammenti yt-dlp non compaiono nel .prof, le loro allocazioni sì
+        (tracemalloc è globale).
+    """
+
+    def __init__(self, targets: Optional[frozenset[str]] = frozenset()) -> None:
+        self._targets = targets
+        self._sample_every: Dict[str, int] = dict(PROFILE_CONFIG.SAMPLE_EVERY)
+        self._calls: Dict[str, int] = {}
+        self._sessions = 0
+        self._counter_lock = threading.Lock()
+        self._active = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """True se almeno un target è abilitato."""
+        return self._targets is None or bool(self._targets)
+
+    def _next_session(self, target: str) -> Optional[int]:
+        """
+        Applica filtro target, campionamento 1-su-N e limite sessioni.
+
+        Returns:
+            Numero progressivo della sessione, oppure None se non va catturata
+        """
+        if self._targets is not None and target not in self._targets:
+            return None
+
+        with self._counter_lock:
+            calls = self._calls.get(target, 0)
+            self._calls[target] = calls + 1
+            if calls % max(1, self._sample_every.get(target, 1)) != 0:
+                return None
+            if self._sessions >= PROFILE_CONFIG.MAX_SESSIONS:
+                return None
+            self._sessions += 1
+            return self._sessions
+
+    @contextmanager
+    def capture(self, target: str, label: str = "") -> Iterator[None]:
+        """
+        Cattura profilo CPU e allocazioni del blocco (se campionato).
+
+        Args:
+            target: Nome del punto profilato (es. "download_video")
+            label: Informazione extra nel report (es. URL)
+        """
+        session = self._next_session(target) if self.enabled else None
+        if session is None:
+            yield
+            return
+
+        # Una sola sessione alla volta: cProfile e tracemalloc non si annidano bene
+        if not self._active.acquire(blocking=False):
+            yield
+            return
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        try:
+            if started_tracemalloc:
+                tracemalloc.start(PROFILE_CONFIG.TRACEMALLOC_FRAMES)
+            before = tracemalloc.take_snapshot()
+            profile = cProfile.Profile()
+            started = time.perf_counter()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - started
+                self._write_results(session, target, label, profile, before, elapsed)
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self._active.release()
+
+    def _write_results(
+        self,
+        session: int,
+        target: str,
+        label: str,
+        profile: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        elapsed: float,
+    ) -> None:
+        """Scrive .prof e report testuale (errori solo loggati)."""
+        try:
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+
+            profile_dir = os.path.join(get_app_data_dir(), PROFILE_CONFIG.PROFILE_DIR_NAME)
+            os.makedirs(profile_dir, exist_ok=True)
+            base = os.path.join(
+                profile_dir,
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{session:03d}-{target}"
+            )
+
+            profile.dump_stats(f"{base}.prof")
+
+            report = io.StringIO()
+            report.write(f"Target: {target}\n")
+            if label:
+                report.write(f"Label: {label}\n")
+            report.write(f"Elapsed: {elapsed:.3f}s\n")
+            report.write(f"Traced memory peak: {peak / 1024 / 1024:.1f} MB\n\n")
+
+            report.write(f"Top {PROFILE_CONFIG.TOP_N} allocations (delta vs start):\n")
+            for stat in after.compare_to(before, "lineno")[:PROFILE_CONFIG.TOP_N]:
+                report.write(f"  {stat}\n")
+
+            report.write(f"\nTop {PROFILE_CONFIG.TOP_N} functions by cumulative time:\n")
+            stats = pstats.Stats(profile, stream=report)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_CONFIG.TOP_N)
+
+            with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                f.write(report.getvalue())
+
+            logging.info(f"Profile captured for {target}: {base}.prof ({elapsed:.2f}s)")
+
+        except Exception as e:
+            logging.warning(f"Could not write profile for {target}: {e}")
+
+
+def profiled(target: str) -> Callable[[F], F]:
+    """
+    Decoratore: esegue la funzione dentro PROFILER.capture(target).
+
+    Args:
+        target: Nome del punto profilato
+
+    Examples:
+        >>> @profiled("download_video")
+        ... def download_video(url, *args, **kwargs): ...
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            label = kwargs.get("url") or (args[0] if args and isinstance(args[0], str) else "")
+            with PROFILER.capture(target, label=label):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def _targets_from_env() -> Optional[frozenset[str]]:
+    """
+    Legge MVD_PROFILE: "1" = tutti i target, "a,b" = solo quelli elencati.
+
+    Returns:
+        None per tutti i target, frozenset dei target, o frozenset vuoto (spento)
+    """
+    value = os.getenv("MVD_PROFILE", "").strip()
+    if value == "1" or (not value and PROFILE_CONFIG.PROFILE_ENABLED):
+        return None
+    if not value or value == "0":
+        return frozenset()
+    return frozenset(t.strip() for t in value.split(",") if t.strip())
+
+
+# Profiler globale dell'applicazione
+PROFILER = Profiler(targets=_targets_from_env())
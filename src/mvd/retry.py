@@ -0,0 +1,148 @@
+"""
+Nuovi tentativi dei job falliti per Modern Video Downloader.
+
+Un errore transitorio (rete, server sovraccarico) non deve far perdere il
+job, uno permanente (video privato, sito non supportato) non deve occupare
+di nuovo un worker. RetryPolicy decide in base alla classe dell'eccezione
+MVD (la regola più specifica nella gerarchia di exceptions.py):
+- quanti tentativi in totale (max_attempts, 1 = nessun retry)
+- dove rimettere il job: in fondo alla coda subito (REQUEUE_BACK) oppure
+  in fondo alla coda ma non prima del ritardo (REQUEUE_DELAY)
+- il ritardo: backoff esponenziale con jitter, limitato a max_delay
+
+Le code non dormono durante il ritardo: il job torna in coda con un
+istante minimo di ripartenza e il worker intanto scarica gli altri.
+
+Examples:
+    >>> policy = RetryPolicy({NetworkError: RetryRule(max_attempts=3)}, jitter=0)
+    >>> policy.decide(NetworkError("timeout"), attempt=1)
+    RetryDecision(retry=True, delay=5.0, max_attempts=3)
+    >>> policy.decide(NetworkError("timeout"), attempt=3).retry
+    False
+    >>> policy.decide(VideoUnavailableError("private"), attempt=1).retry
+    False
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+
+from .config import RETRY_CONFIG
+from .exceptions import (
+    ConfigurationError,
+    DownloadError,
+    FileSystemError,
+    NetworkError,
+    UnsupportedSiteError,
+    ValidationError,
+    VideoUnavailableError,
+)
+
+# Dove rimettere un job da ritentare
+REQUEUE_BACK = "back"  # In fondo alla coda, subito disponibile
+REQUEUE_DELAY = "delay"  # In fondo alla coda, dopo il ritardo di backoff
+
+
+@dataclass(frozen=True)
+class RetryRule:
+    """Regola di retry per una classe di eccezioni."""
+
+    max_attempts: int = 1
+    requeue: str = REQUEUE_DELAY
+    base_delay: float = RETRY_CONFIG.BASE_DELAY
+    factor: float = RETRY_CONFIG.BACKOFF_FACTOR
+    max_delay: float = RETRY_CONFIG.MAX_DELAY
+
+    def backoff(self, attempt: int) -> float:
+        """Ritardo (senza jitter) dopo il tentativo numero attempt (da 1)."""
+        if self.requeue == REQUEUE_BACK:
+            return 0.0
+        return min(self.max_delay, self.base_delay * self.factor ** (attempt - 1))
+
+
+# Errori permanenti: il job fallisce subito
+NO_RETRY = RetryRule(max_attempts=1)
+
+
+@dataclass(frozen=True)
+class RetryDecision:
+    """Esito di RetryPolicy.decide()."""
+
+    retry: bool
+    delay: float = 0.0
+    max_attempts: int = 1
+
+
+class RetryPolicy:
+    """
+    Regole di retry indicizzate per classe di eccezione.
+
+    Args:
+        rules: Classe -> regola; vale quella della classe più specifica
+            nella MRO dell'eccezione
+        default: Regola per le eccezioni senza regola (default: nessun retry)
+        jitter: Frazione del ritardo resa casuale: il ritardo effettivo è
+            tra backoff * (1 - jitter) e backoff
+        rng: Generatore casuale (per test riproducibili)
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[type, RetryRule],
+        default: RetryRule = NO_RETRY,
+        jitter: float = RETRY_CONFIG.JITTER,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self._rules: Dict[type, RetryRule] = dict(rules)
+        self._default = default
+        self._jitter = min(max(jitter, 0.0), 1.0)
+        self._rng = rng or random.Random()
+        self._cache: Dict[type, RetryRule] = {}
+
+    def rule_for(self, exc: BaseException) -> RetryRule:
+        """Regola della classe più specifica dell'eccezione."""
+        cls = type(exc)
+        rule = self._cache.get(cls)
+        if rule is None:
+            rule = next((self._rules[base] for base in cls.__mro__ if base in self._rules), self._default)
+            self._cache[cls] = rule
+        return rule
+
+    def decide(self, exc: BaseException, attempt: int) -> RetryDecision:
+        """
+        Decide se ritentare un job.
+
+        Args:
+            exc: Eccezione del tentativo appena fallito
+            attempt: Tentativi già eseguiti, compreso quello fallito (da 1)
+
+        Returns:
+            RetryDecision con il ritardo prima del prossimo tentativo
+        """
+        rule = self.rule_for(exc)
+        if attempt >= rule.max_attempts:
+            return RetryDecision(retry=False, max_attempts=rule.max_attempts)
+
+        delay = rule.backoff(attempt)
+        if delay and self._jitter:
+            delay *= 1.0 - self._jitter * self._rng.random()
+        return RetryDecision(retry=True, delay=delay, max_attempts=rule.max_attempts)
+
+
+def default_policy() -> RetryPolicy:
+    """Policy usata dalla DownloadQueue e dal daemon (vedi RETRY_CONFIG)."""
+    return RetryPolicy({
+        # Transitori: rete, timeout, HTTP 429/5xx (vedi wrap_ytdlp_exception)
+        NetworkError: RetryRule(max_attempts=RETRY_CONFIG.NETWORK_MAX_ATTEMPTS),
+        # Errori yt-dlp non classificati: un solo nuovo tentativo, in fondo alla coda
+        DownloadError: RetryRule(max_attempts=RETRY_CONFIG.OTHER_MAX_ATTEMPTS, requeue=REQUEUE_BACK),
+        # Permanenti
+        VideoUnavailableError: NO_RETRY,
+        UnsupportedSiteError: NO_RETRY,
+        ConfigurationError: NO_RETRY,
+        ValidationError: NO_RETRY,
+        FileSystemError: NO_RETRY,
+    })
+
+
+RETRY_POLICY = default_policy()
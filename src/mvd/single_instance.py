@@ -0,0 +1,209 @@
+"""
+Istanza singola della GUI per Modern Video Downloader.
+
+La prima istanza apre un socket TCP su loopback (porta scelta dal sistema)
+e scrive porta, token e PID in instance.json nella cartella dati
+dell'applicazione. Un secondo avvio legge il file, invia gli URL della riga
+di comando all'istanza attiva e termina subito, prima di importare
+customtkinter e yt-dlp.
+
+Protocollo: una riga JSON per connessione.
+    -> {"token": ..., "urls": [...]}
+    <- {"ok": true} oppure {"ok": false, "error": ...}
+
+Il modulo usa solo la libreria standard, così l'inoltro costa pochi
+millisecondi oltre all'avvio dell'interprete.
+"""
+
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import SINGLE_INSTANCE_CONFIG
+from .utils import get_app_data_dir
+
+# Callback dell'istanza attiva: riceve gli URL inoltrati (da thread del server)
+URLCallback = Callable[[List[str]], None]
+
+
+def instance_file_path() -> str:
+    """Percorso del file con porta e token dell'istanza attiva."""
+    return os.path.join(get_app_data_dir(), SINGLE_INSTANCE_CONFIG.INSTANCE_FILE_NAME)
+
+
+def single_instance_enabled() -> bool:
+    """False se disattivata da config o da MVD_MULTI_INSTANCE=1."""
+    if os.getenv(SINGLE_INSTANCE_CONFIG.DISABLE_ENV, "").strip().lower() in ("1", "true", "yes", "on"):
+        return False
+    return SINGLE_INSTANCE_CONFIG.ENABLED
+
+
+def _read_instance_file() -> Optional[Dict[str, Any]]:
+    try:
+        with open(instance_file_path(), encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(info, dict) or not isinstance(info.get("port"), int) or not info.get("token"):
+        return None
+    return info
+
+
+def _recv_line(conn: socket.socket, limit: int) -> bytes:
+    """Legge fino a newline (esclusa); ValueError oltre limit byte."""
+    data = bytearray()
+    while b"\n" not in data:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > limit:
+            raise ValueError("message too large")
+    return bytes(data).split(b"\n", 1)[0]
+
+
+# ============================================================================
+# CLIENT (SECONDO AVVIO)
+# ============================================================================
+
+def forward_to_running_instance(urls: List[str]) -> bool:
+    """
+    Inoltra gli URL all'istanza attiva, se c'è.
+
+    Args:
+        urls: URL da accodare (anche vuota: porta solo in primo piano la finestra)
+
+    Returns:
+        True se l'istanza attiva ha confermato, False se non ce n'è una
+        raggiungibile (file assente, processo terminato, token errato)
+    """
+    info = _read_instance_file()
+    if info is None:
+        return False
+
+    message = json.dumps({"token": info["token"], "urls": urls}).encode("utf-8") + b"\n"
+    try:
+        with socket.create_connection(
+            (SINGLE_INSTANCE_CONFIG.HOST, info["port"]),
+            timeout=SINGLE_INSTANCE_CONFIG.CONNECT_TIMEOUT,
+        ) as conn:
+            conn.settimeout(SINGLE_INSTANCE_CONFIG.IO_TIMEOUT)
+            conn.sendall(message)
+            reply = json.loads(_recv_line(conn, SINGLE_INSTANCE_CONFIG.MAX_MESSAGE_BYTES) or b"{}")
+    except (OSError, ValueError) as e:
+        # File rimasto da un'istanza chiusa male: la nuova istanza lo sovrascrive
+        logging.debug(f"No running instance reachable: {e}")
+        return False
+
+    return bool(isinstance(reply, dict) and reply.get("ok"))
+
+
+# ============================================================================
+# SERVER (ISTANZA ATTIVA)
+# ============================================================================
+
+class InstanceServer:
+    """
+    Riceve gli URL inoltrati dai nuovi avvii.
+
+    Args:
+        on_urls: Callback chiamato dal thread del server con la lista di URL;
+            deve solo accodare il lavoro (es. nella UI queue della GUI)
+
+    Examples:
+        >>> server = InstanceServer(lambda urls: print(urls))  # doctest: +SKIP
+        >>> server.start()  # doctest: +SKIP
+        >>> forward_to_running_instance(["https://example.com/v"])  # doctest: +SKIP
+        ['https://example.com/v']
+        True
+        >>> server.close()  # doctest: +SKIP
+    """
+
+    def __init__(self, on_urls: URLCallback) -> None:
+        self._on_urls = on_urls
+        self._token = secrets.token_hex(16)
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    @property
+    def port(self) -> Optional[int]:
+        return self._sock.getsockname()[1] if self._sock is not None else None
+
+    def start(self) -> bool:
+        """
+        Apre il socket e pubblica instance.json.
+
+        Returns:
+            False se il socket o il file non sono disponibili (la GUI parte
+            comunque, senza istanza singola)
+        """
+        try:
+            self._sock = socket.create_server((SINGLE_INSTANCE_CONFIG.HOST, 0))
+            self._write_instance_file()
+        except OSError as e:
+            logging.warning(f"Single-instance server not available: {e}")
+            self.close()
+            return False
+
+        self._thread = threading.Thread(target=self._serve, daemon=True, name="InstanceServer")
+        self._thread.start()
+        logging.info(f"Single-instance server listening on port {self.port}")
+        return True
+
+    def close(self) -> None:
+        """Chiude il socket e rimuove instance.json se è ancora il nostro."""
+        self._closed.set()
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+
+        info = _read_instance_file()
+        if info is not None and info.get("pid") == os.getpid() and info.get("token") == self._token:
+            try:
+                os.remove(instance_file_path())
+            except OSError:
+                pass
+
+    def _write_instance_file(self) -> None:
+        """Scrittura atomica (file temporaneo + replace), leggibile solo dall'utente."""
+        path = instance_file_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"port": self.port, "token": self._token, "pid": os.getpid()}, f)
+        os.replace(tmp, path)
+
+    def _serve(self) -> None:
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break  # socket chiuso da close()
+            with conn:
+                self._handle(conn)
+
+    def _handle(self, conn: socket.socket) -> None:
+        conn.settimeout(SINGLE_INSTANCE_CONFIG.IO_TIMEOUT)
+        try:
+            message = json.loads(_recv_line(conn, SINGLE_INSTANCE_CONFIG.MAX_MESSAGE_BYTES))
+            token = str(message.get("token", ""))
+            urls = message.get("urls", [])
+            if not hmac.compare_digest(token.encode(), self._token.encode()):
+                reply = {"ok": False, "error": "invalid token"}
+            elif not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+                reply = {"ok": False, "error": "urls must be a list of strings"}
+            else:
+                self._on_urls(urls)
+                reply = {"ok": True}
+            conn.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"Invalid single-instance request: {e}")
@@ -0,0 +1,243 @@
+"""
+Tracer opzionale in formato Chrome trace-event per Modern Video Downloader.
+
+Registra span (estrazione, fasi del download, frammenti, post-processing
+FFmpeg, tick di drain della UI, attese in coda) etichettati con thread e
+job. Una sessione copre un'intera esecuzione della coda e viene salvata
+come JSON apribile in Perfetto (ui.perfetto.dev) o chrome://tracing.
+
+Attivazione: variabile d'ambiente MVD_TRACE=1 oppure TRACE_CONFIG.TRACE_ENABLED.
+Quando il tracer è disattivato ogni chiamata è un no-op.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .config import TRACE_CONFIG
+from .utils import get_app_data_dir
+
+
+# ============================================================================
+# SPAN
+# ============================================================================
+
+@dataclass
+class Span:
+    """Span aperto (chiuso da Tracer.end())."""
+
+    name: str
+    cat: str
+    start_us: int
+    tid: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+def _now_us() -> int:
+    """Timestamp monotono in microsecondi."""
+    return time.perf_counter_ns() // 1000
+
+
+# ============================================================================
+# TRACER
+# ============================================================================
+
+class Tracer:
+    """
+    Raccoglie eventi trace-event ("X" complete, "i" instant) in memoria.
+
+    Il numero di eventi per sessione è limitato da TRACE_CONFIG.MAX_EVENTS:
+    oltre il limite gli eventi vengono scartati e contati.
+
+    Examples:
+        >>> tracer = Tracer(enabled=True)
+        >>> tracer.start_session()
+        >>> with tracer.span("extract", cat="download", job="a1b2c3d4"):
+        ...     pass
+        >>> len(tracer.events())
+        1
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._dropped = 0
+        self._pid = os.getpid()
+
+    # ----------------------------------------------------------------------
+    # Sessione
+    # ----------------------------------------------------------------------
+
+    def start_session(self) -> None:
+        """Azzera gli eventi raccolti (inizio di un'esecuzione della coda)."""
+        with self._lock:
+            self._events = []
+            self._threads = {}
+            self._dropped = 0
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Copia degli eventi raccolti nella sessione corrente."""
+        with self._lock:
+            return list(self._events)
+
+    # ----------------------------------------------------------------------
+    # Registrazione
+    # ----------------------------------------------------------------------
+
+    def begin(self, name: str, cat: str, job: Optional[str] = None, **args: Any) -> Optional[Span]:
+        """
+        Apre uno span sul thread corrente.
+
+        Returns:
+            Span da passare a end(), oppure None se il tracer è spento
+        """
+        if not self.enabled:
+            return None
+        if job is not None:
+            args["job"] = job
+        return Span(name=name, cat=cat, start_us=_now_us(), tid=threading.get_native_id(), args=args)
+
+    def end(self, span: Optional[Span], **args: Any) -> None:
+        """Chiude uno span aperto con begin() (None viene ignorato)."""
+        if span is None or not self.enabled:
+            return
+        span.args.update(args)
+        self._add({
+            "name": span.name,
+            "cat": span.cat,
+            "ph": "X",
+            "ts": span.start_us,
+            "dur": max(0, _now_us() - span.start_us),
+            "pid": self._pid,
+            "tid": span.tid,
+            "args": span.args,
+        })
+
+    @contextmanager
+    def span(self, name: str, cat: str, job: Optional[str] = None, **args: Any) -> Iterator[Optional[Span]]:
+        """Context manager: span che copre il blocco."""
+        opened = self.begin(name, cat, job=job, **args)
+        try:
+            yield opened
+        finally:
+            self.end(opened)
+
+    def complete(
+        self,
+        name: str,
+        cat: str,
+        duration: float,
+        job: Optional[str] = None,
+        **args: Any,
+    ) -> None:
+        """
+        Registra uno span già concluso che termina adesso.
+
+        Args:
+            name: Nome span
+            cat: Categoria
+            duration: Durata in secondi (es. attesa in coda misurata altrove)
+            job: Id job
+        """
+        if not self.enabled:
+            return
+        if job is not None:
+            args["job"] = job
+        dur_us = max(0, int(duration * 1_000_000))
+        self._add({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": _now_us() - dur_us,
+            "dur": dur_us,
+            "pid": self._pid,
+            "tid": threading.get_native_id(),
+            "args": args,
+        })
+
+    def instant(self, name: str, cat: str, job: Optional[str] = None, **args: Any) -> None:
+        """Registra un evento istantaneo sul thread corrente."""
+        if not self.enabled:
+            return
+        if job is not None:
+            args["job"] = job
+        self._add({
+            "name": name,
+            "cat": cat,
+            "ph": "i",
+            "s": "t",
+            "ts": _now_us(),
+            "pid": self._pid,
+            "tid": threading.get_native_id(),
+            "args": args,
+        })
+
+    def _add(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self._events) >= TRACE_CONFIG.MAX_EVENTS:
+                self._dropped += 1
+                return
+            self._events.append(event)
+            tid = threading.get_native_id()
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+
+    # ----------------------------------------------------------------------
+    # Export
+    # ----------------------------------------------------------------------
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Documento trace-event (Object Format) con metadati dei thread."""
+        with self._lock:
+            metadata = [
+                {"name": "process_name", "ph": "M", "pid": self._pid, "args": {"name": "ModernVideoDownloader"}}
+            ]
+            metadata += [
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self._threads.items()
+            ]
+            return {
+                "traceEvents": metadata + list(self._events),
+                "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self._dropped},
+            }
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """
+        Salva la sessione corrente come JSON trace-event.
+
+        Args:
+            path: File di destinazione (default: traces/trace-YYYYmmdd-HHMMSS.json
+                nella directory dati dell'app)
+
+        Returns:
+            Path scritto, oppure None se il tracer è spento o la scrittura fallisce
+        """
+        if not self.enabled:
+            return None
+
+        if path is None:
+            trace_dir = os.path.join(get_app_data_dir(), TRACE_CONFIG.TRACE_DIR_NAME)
+            path = os.path.join(trace_dir, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        except OSError as e:
+            logging.warning(f"Could not write trace file {path}: {e}")
+            return None
+
+        logging.info(f"Trace written: {path}")
+        return path
+
+
+# Tracer globale dell'applicazione
+TRACER = Tracer(enabled=TRACE_CONFIG.TRACE_ENABLED or os.getenv("MVD_TRACE", "") == "1")
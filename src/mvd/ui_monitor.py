@@ -0,0 +1,199 @@
+"""
+Monitor della reattività UI (event loop Tk) per Modern Video Downloader.
+
+Misura:
+- after_lag: ritardo tra l'istante schedulato e quello effettivo di un
+  heartbeat after() (quanto l'event loop è rimasto bloccato)
+- ui_drain / render_queue / log: tempo speso nei rispettivi metodi GUI
+
+Per ogni metrica mantiene gli ultimi N campioni e calcola p50/p95/p99.
+Un heartbeat oltre soglia genera un warning nel log (al massimo uno
+ogni LAG_WARN_INTERVAL secondi). L'overlay a schermo si attiva con F12
+oppure all'avvio con MVD_UI_MONITOR=1.
+"""
+
+import functools
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, TypeVar
+
+from .config import UI_MONITOR_CONFIG
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+# ============================================================================
+# STATISTICHE
+# ============================================================================
+
+class LatencyStats:
+    """
+    Finestra scorrevole di campioni (ms) con percentili nearest-rank.
+
+    Args:
+        max_samples: Numero massimo di campioni mantenuti
+
+    Examples:
+        >>> stats = LatencyStats(max_samples=100)
+        >>> for ms in range(1, 101):
+        ...     stats.add(float(ms))
+        >>> stats.percentiles()["p95"]
+        95.0
+    """
+
+    def __init__(self, max_samples: int = UI_MONITOR_CONFIG.MAX_SAMPLES) -> None:
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self.total = 0
+
+    def add(self, value_ms: float) -> None:
+        """Registra un campione in millisecondi."""
+        self._samples.append(value_ms)
+        self.total += 1
+
+    def percentiles(self) -> Dict[str, float]:
+        """
+        Percentili della finestra corrente.
+
+        Returns:
+            Dict con p50, p95, p99, max (ms) e count (campioni nella finestra)
+        """
+        ordered = sorted(self._samples)
+        if not ordered:
+            return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "count": 0}
+
+        def rank(p: float) -> float:
+            index = max(0, -(-len(ordered) * p // 100) - 1)  # ceil(n*p/100) - 1
+            return ordered[int(index)]
+
+        return {
+            "p50": rank(50),
+            "p95": rank(95),
+            "p99": rank(99),
+            "max": ordered[-1],
+            "count": len(ordered),
+        }
+
+
+# ============================================================================
+# MONITOR
+# ============================================================================
+
+class UIMonitor:
+    """
+    Raccoglie le statistiche di latenza dell'event loop e dei metodi GUI.
+
+    Va usato solo dal main thread Tk: nessun lock sulle finestre.
+
+    Examples:
+        >>> monitor = UIMonitor()
+        >>> with monitor.measure("render_queue"):
+        ...     pass
+        >>> monitor.stats["render_queue"].total
+        1
+    """
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, LatencyStats] = {}
+        self._widget: Optional[Any] = None
+        self._expected: float = 0.0
+        self._last_warning: float = 0.0
+
+    def _stats_for(self, name: str) -> LatencyStats:
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = LatencyStats()
+        return stats
+
+    # ----------------------------------------------------------------------
+    # Misure
+    # ----------------------------------------------------------------------
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Misura il tempo speso nel blocco sotto il nome indicato."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stats_for(name).add((time.perf_counter() - started) * 1000)
+
+    def timed(self, name: str) -> Callable[[F], F]:
+        """Decoratore: misura ogni chiamata del metodo sotto il nome indicato."""
+        def decorator(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._stats_for(name).add((time.perf_counter() - started) * 1000)
+            return wrapper  # type: ignore[return-value]
+        return decorator
+
+    # ----------------------------------------------------------------------
+    # Heartbeat
+    # ----------------------------------------------------------------------
+
+    def start(self, widget: Any) -> None:
+        """
+        Avvia l'heartbeat after() sulla finestra Tk.
+
+        Args:
+            widget: Widget Tk (tipicamente la finestra principale)
+        """
+        self._widget = widget
+        self._schedule()
+
+    def _schedule(self) -> None:
+        interval = UI_MONITOR_CONFIG.HEARTBEAT_MS
+        self._expected = time.perf_counter() + interval / 1000
+        self._widget.after(interval, self._beat)
+
+    def _beat(self) -> None:
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self._expected) * 1000)
+        self._stats_for("after_lag").add(lag_ms)
+
+        if (
+            lag_ms > UI_MONITOR_CONFIG.LAG_WARN_MS
+            and now - self._last_warning >= UI_MONITOR_CONFIG.LAG_WARN_INTERVAL
+        ):
+            self._last_warning = now
+            logging.warning(f"UI event loop lag {lag_ms:.0f} ms ({self.summary(compact=True)})")
+
+        self._schedule()
+
+    # ----------------------------------------------------------------------
+    # Report
+    # ----------------------------------------------------------------------
+
+    def summary(self, compact: bool = False) -> str:
+        """
+        Riepilogo testuale dei percentili per metrica.
+
+        Args:
+            compact: True = una sola riga (per i log), False = una riga per metrica
+        """
+        lines = []
+        for name in sorted(self.stats):
+            p = self.stats[name].percentiles()
+            lines.append(
+                f"{name}: p50 {p['p50']:.1f} p95 {p['p95']:.1f} "
+                f"p99 {p['p99']:.1f} max {p['max']:.1f} ms"
+            )
+        return "; ".join(lines) if compact else "\n".join(lines)
+
+    def log_summary(self) -> None:
+        """Scrive il riepilogo nel log (livello INFO)."""
+        if self.stats:
+            logging.info(f"UI frame-time stats: {self.summary(compact=True)}")
+
+
+# Monitor globale dell'applicazione
+UI_MONITOR = UIMonitor()
+
+# Overlay visibile all'avvio
+OVERLAY_ON_START: bool = UI_MONITOR_CONFIG.OVERLAY_ENABLED or os.getenv("MVD_UI_MONITOR", "") == "1"
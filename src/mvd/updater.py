@@ -15,8 +15,11 @@ from typing import Optional, Dict, Any, Tuple
 from urllib.request import urlopen, urlretrieve
 from urllib.error import URLError, HTTPError
 import platform
+import time
 
 from . import __version__
+from .log_pipeline import job_context
+from .utils import new_job_id
 
 
 # ============================================================================
@@ -69,59 +72,60 @@ def check_for_updates() -> Optional[Dict[str, Any]]:
         >>> if update:
         ...     print(f"Nuova versione: {update['version']}")
     """
-    try:
-        logging.info(f"Checking for updates at {RELEASES_URL}")
-
-        # Chiamata API GitHub
-        with urlopen(RELEASES_URL, timeout=REQUEST_TIMEOUT) as response:
-            data = json.loads(response.read().decode())
-
-        # Estrai versione (rimuovi 'v' se presente)
-        latest_version = data['tag_name'].lstrip('v')
-        current_version = get_current_version()
-
-        logging.info(f"Current version: {current_version}, Latest: {latest_version}")
-
-        # Confronta versioni
-        if _is_newer_version(latest_version, current_version):
-            # Trova asset appropriato per la piattaforma
-            asset = _find_platform_asset(data.get('assets', []))
-
-            if not asset:
-                logging.warning("No compatible asset found for this platform")
+    with job_context(job_id=new_job_id(), url=RELEASES_URL):
+        try:
+            logging.info(f"Checking for updates at {RELEASES_URL}", extra={"phase": "update_check"})
+
+            # Chiamata API GitHub
+            with urlopen(RELEASES_URL, timeout=REQUEST_TIMEOUT) as response:
+                data = json.loads(response.read().decode())
+
+            # Estrai versione (rimuovi 'v' se presente)
+            latest_version = data['tag_name'].lstrip('v')
+            current_version = get_current_version()
+
+            logging.info(f"Current version: {current_version}, Latest: {latest_version}", extra={"phase": "update_check"})
+
+            # Confronta versioni
+            if _is_newer_version(latest_version, current_version):
+                # Trova asset appropriato per la piattaforma
+                asset = _find_platform_asset(data.get('assets', []))
+
+                if not asset:
+                    logging.warning("No compatible asset found for this platform", extra={"phase": "update_check"})
+                    return None
+
+                return {
+                    'version': latest_version,
+                    'download_url': asset['browser_download_url'],
+                    'changelog': data.get('body', 'No changelog available'),
+                    'published_at': data.get('published_at', ''),
+                    'asset_name': asset['name'],
+                    'asset_size': asset.get('size', 0)
+                }
+            else:
+                logging.info("App is up to date", extra={"phase": "update_check"})
                 return None
 
-            return {
-                'version': latest_version,
-                'download_url': asset['browser_download_url'],
-                'changelog': data.get('body', 'No changelog available'),
-                'published_at': data.get('published_at', ''),
-                'asset_name': asset['name'],
-                'asset_size': asset.get('size', 0)
-            }
-        else:
-            logging.info("App is up to date")
-            return None
+        except HTTPError as e:
+            if e.code == 404:
+                logging.error("Repository or releases not found (404)", extra=_error_extra("update_check", e))
+                raise UpdateCheckError("Repository non trovato. Verifica GITHUB_REPO_OWNER e GITHUB_REPO_NAME.")
+            else:
+                logging.error(f"HTTP error checking updates: {e}", extra=_error_extra("update_check", e))
+                raise UpdateCheckError(f"Errore HTTP: {e.code}")
 
-    except HTTPError as e:
-        if e.code == 404:
-            logging.error("Repository or releases not found (404)")
-            raise UpdateCheckError("Repository non trovato. Verifica GITHUB_REPO_OWNER e GITHUB_REPO_NAME.")
-        else:
-            logging.error(f"HTTP error checking updates: {e}")
-            raise UpdateCheckError(f"Errore HTTP: {e.code}")
+        except URLError as e:
+            logging.error(f"Network error checking updates: {e}", extra=_error_extra("update_check", e))
+            raise UpdateCheckError("Errore di rete. Verifica la connessione internet.")
 
-    except URLError as e:
-        logging.error(f"Network error checking updates: {e}")
-        raise UpdateCheckError("Errore di rete. Verifica la connessione internet.")
+        except json.JSONDecodeError as e:
+            logging.error(f"Invalid JSON response: {e}", extra=_error_extra("update_check", e))
+            raise UpdateCheckError("Risposta non valida dal server.")
 
-    except json.JSONDecodeError as e:
-        logging.error(f"Invalid JSON response: {e}")
-        raise UpdateCheckError("Risposta non valida dal server.")
-
-    except Exception as e:
-        logging.error(f"Unexpected error checking updates: {e}")
-        raise UpdateCheckError(f"Errore imprevisto: {str(e)}")
+        except Exception as e:
+            logging.error(f"Unexpected error checking updates: {e}", extra=_error_extra("update_check", e))
+            raise UpdateCheckError(f"Errore imprevisto: {str(e)}")
 
 
 def download_update(
@@ -147,29 +151,38 @@ def download_update(
         ...     print(f"{current}/{total} bytes")
         >>> path = download_update(url, "app.exe", on_progress)
     """
-    try:
-        # Directory temporanea per il download
-        temp_dir = tempfile.gettempdir()
-        output_path = os.path.join(temp_dir, asset_name)
-
-        logging.info(f"Downloading update to {output_path}")
-
-        # Download con progress tracking
-        if progress_callback:
-            def _report_hook(block_num, block_size, total_size):
-                downloaded = block_num * block_size
-                progress_callback(downloaded, total_size)
-
-            urlretrieve(download_url, output_path, reporthook=_report_hook)
-        else:
-            urlretrieve(download_url, output_path)
-
-        logging.info(f"Update downloaded successfully to {output_path}")
-        return output_path
-
-    except Exception as e:
-        logging.error(f"Error downloading update: {e}")
-        raise UpdateDownloadError(f"Download fallito: {str(e)}")
+    with job_context(job_id=new_job_id(), url=download_url):
+        try:
+            # Directory temporanea per il download
+            temp_dir = tempfile.gettempdir()
+            output_path = os.path.join(temp_dir, asset_name)
+
+            logging.info(f"Downloading update to {output_path}", extra={"phase": "update_download"})
+            started_at = time.monotonic()
+
+            # Download con progress tracking
+            if progress_callback:
+                def _report_hook(block_num, block_size, total_size):
+                    downloaded = block_num * block_size
+                    progress_callback(downloaded, total_size)
+
+                urlretrieve(download_url, output_path, reporthook=_report_hook)
+            else:
+                urlretrieve(download_url, output_path)
+
+            logging.info(
+                f"Update downloaded successfully to {output_path}",
+                extra={
+                    "phase": "update_download",
+                    "bytes": os.path.getsize(output_path),
+                    "duration": round(time.monotonic() - started_at, 3),
+                }
+            )
+            return output_path
+
+        except Exception as e:
+            logging.error(f"Error downloading update: {e}", extra=_error_extra("update_download", e))
+            raise UpdateDownloadError(f"Download fallito: {str(e)}")
 
 
 def apply_update(installer_path: str) -> None:
@@ -199,7 +212,7 @@ def apply_update(installer_path: str) -> None:
             raise UpdateApplyError(f"Tipo file non supportato: {file_ext}")
 
     except Exception as e:
-        logging.error(f"Error applying update: {e}")
+        logging.error(f"Error applying update: {e}", extra=_error_extra("update_apply", e))
         raise UpdateApplyError(f"Applicazione update fallita: {str(e)}")
 
 
@@ -207,6 +220,11 @@ def apply_update(installer_path: str) -> None:
 # FUNZIONI HELPER PRIVATE
 # ============================================================================
 
+def _error_extra(phase: str, exc: BaseException) -> Dict[str, Any]:
+    """Campi strutturati per le righe di log di errore dell'updater."""
+    return {"phase": phase, "exc_class": type(exc).__name__}
+
+
 def _is_newer_version(latest: str, current: str) -> bool:
     """Confronta due versioni in formato semantic versioning.
 
@@ -270,7 +288,7 @@ def _apply_exe_update(installer_path: str) -> None:
 
     Lancia l'installer e termina l'applicazione corrente.
     """
-    logging.info(f"Launching installer: {installer_path}")
+    logging.info(f"Launching installer: {installer_path}", extra={"phase": "update_apply"})
 
     if platform.system() == 'Windows':
         # Windows: usa subprocess.Popen per non bloccare
@@ -5,15 +5,28 @@ Questo modulo fornisce funzioni helper per path management, logging,
 validazione input, e formattazione dati.
 """
 
+import importlib
 import os
 import sys
+import threading
+import time
+import unicodedata
+import uuid
 import logging
 from logging.handlers import RotatingFileHandler
 from urllib.parse import urlparse
-from typing import Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
 
 from .config import LOG_CONFIG
 from .exceptions import InvalidPathError, InvalidURLError
+from .naming import reserve_filename
+from .log_pipeline import (
+    CompressingRotatingFileHandler,
+    JobContextFilter,
+    JsonFormatter,
+    start_logging_pipeline,
+    stop_logging_pipeline,
+)
 
 
 # ============================================================================
@@ -104,14 +117,80 @@ def setup_ffmpeg() -> bool:
     return False
 
 
+# ============================================================================
+# PRELOAD MODULI
+# ============================================================================
+
+def preload_modules(names: Iterable[str]) -> threading.Thread:
+    """
+    Importa moduli pesanti in un thread in background.
+
+    La GUI importa yt-dlp, l'updater e pyperclip solo dove servono; chiamata
+    dopo il primo disegno della finestra, questa funzione li carica mentre
+    l'utente incolla il primo URL. Un modulo mancante viene solo loggato:
+    l'errore vero emergerà (e verrà gestito) al primo uso.
+
+    Args:
+        names: Nomi assoluti dei moduli (es. "yt_dlp", "mvd.updater")
+
+    Returns:
+        Thread avviato (daemon)
+    """
+    names = tuple(names)
+
+    def worker() -> None:
+        for name in names:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                logging.warning(f"Preload of {name} failed: {e}")
+                continue
+            logging.debug(f"Preloaded {name} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    thread = threading.Thread(target=worker, daemon=True, name="ModulePreload")
+    thread.start()
+    return thread
+
+
 # ============================================================================
 # LOGGER CONFIGURATION
 # ============================================================================
 
+def get_app_data_dir() -> str:
+    """
+    Restituisce la directory dati dell'applicazione (log, metriche, stato).
+
+    Returns:
+        %APPDATA%\\ModernVideoDownloader su Windows, ~/ModernVideoDownloader
+        su altri sistemi. La directory non viene creata.
+    """
+    appdata = os.getenv("APPDATA") or os.path.expanduser("~")
+    return os.path.join(appdata, LOG_CONFIG.LOG_DIR_NAME)
+
+
+# Handler agganciati al root logger dall'ultima chiamata a setup_logger()
+_root_handlers: List[logging.Handler] = []
+
+
+def _remove_root_handlers(logger: logging.Logger) -> None:
+    """Stacca dal root logger gli handler installati da setup_logger() e li chiude."""
+    for handler in _root_handlers:
+        logger.removeHandler(handler)
+        handler.close()
+    _root_handlers.clear()
+
+    # Svuota la queue del listener precedente (se in modalità asincrona)
+    stop_logging_pipeline()
+
+
 def setup_logger(
     log_file: str = LOG_CONFIG.LOG_FILE_NAME,
     max_bytes: int = LOG_CONFIG.LOG_MAX_BYTES,
-    backup_count: int = LOG_CONFIG.LOG_BACKUP_COUNT
+    backup_count: int = LOG_CONFIG.LOG_BACKUP_COUNT,
+    async_logging: bool = LOG_CONFIG.LOG_ASYNC,
+    compress_rotated: bool = LOG_CONFIG.LOG_COMPRESS_ROTATED,
+    json_format: Optional[bool] = None,
 ) -> None:
     """
     Configura il logger dell'applicazione con rotating file handler.
@@ -120,10 +199,19 @@ def setup_logger(
     raggiunge la dimensione massima. I file di log vengono salvati in
     %APPDATA%\\ModernVideoDownloader su Windows, o ~/ su altri sistemi.
 
+    Con async_logging il root logger riceve solo un QueueHandler: i thread
+    di download accodano il record e un thread listener esegue
+    formattazione, scrittura e rotazione.
+
     Args:
         log_file: Nome del file di log (default da config)
         max_bytes: Dimensione massima del file prima della rotazione (default 10MB)
         backup_count: Numero di file di backup da mantenere (default 3)
+        async_logging: Usa la pipeline QueueHandler + listener (default da config)
+        compress_rotated: Comprimi in gzip i file ruotati in background
+        json_format: Scrivi il file in formato JSON-lines (app.jsonl) con
+            campi job_id, url, phase, bytes, duration, exc_class.
+            None = LOG_CONFIG.LOG_JSON o variabile d'ambiente MVD_LOG_JSON=1
 
     Examples:
         >>> setup_logger()
@@ -132,34 +220,47 @@ def setup_logger(
         >>> setup_logger("debug.log", max_bytes=5*1024*1024, backup_count=5)
         # Crea debug.log con max 5MB e 5 backup
 
+        >>> setup_logger(json_format=True)
+        # Crea app.jsonl: una riga JSON per record, filtrabile per job_id
+
     Note:
         - In modalità sviluppo (non _MEIPASS), logga anche su console
         - Usa encoding UTF-8 per supportare caratteri speciali
         - Formato: "YYYY-MM-DD HH:MM:SS | LEVEL | Message"
+        - La pipeline asincrona viene svuotata all'uscita (atexit)
+        - La console resta sempre in formato testuale
+        - Richiamarla sostituisce gli handler installati in precedenza
     """
     # Determina directory di log
-    appdata = os.getenv("APPDATA") or os.path.expanduser("~")
-    log_dir = os.path.join(appdata, LOG_CONFIG.LOG_DIR_NAME)
+    log_dir = get_app_data_dir()
 
     # Crea directory se non esiste
     try:
         os.makedirs(log_dir, exist_ok=True)
     except OSError as e:
-        print(f"Warning: Could not create log directory: {e}")
+        print(f"Warning: Could not create log directory: {e}", file=sys.stderr)
         return
 
+    if json_format is None:
+        json_format = LOG_CONFIG.LOG_JSON or os.getenv("MVD_LOG_JSON", "") == "1"
+
+    # File JSON dedicato se si usa il nome di default
+    if json_format and log_file == LOG_CONFIG.LOG_FILE_NAME:
+        log_file = LOG_CONFIG.LOG_JSON_FILE_NAME
+
     log_path = os.path.join(log_dir, log_file)
 
     # Crea rotating file handler
+    handler_cls = CompressingRotatingFileHandler if compress_rotated else RotatingFileHandler
     try:
-        file_handler = RotatingFileHandler(
+        file_handler = handler_cls(
             log_path,
             maxBytes=max_bytes,
             backupCount=backup_count,
             encoding="utf-8"
         )
     except Exception as e:
-        print(f"Warning: Could not create log file handler: {e}")
+        print(f"Warning: Could not create log file handler: {e}", file=sys.stderr)
         return
 
     # Formato log
@@ -167,18 +268,40 @@ def setup_logger(
         LOG_CONFIG.LOG_FORMAT,
         datefmt=LOG_CONFIG.LOG_DATE_FORMAT
     )
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter() if json_format else formatter)
 
-    # Configura root logger
-    logger = logging.getLogger()
-    logger.setLevel(getattr(logging, LOG_CONFIG.LOG_LEVEL))
-    logger.addHandler(file_handler)
+    handlers: list[logging.Handler] = [file_handler]
 
     # In modalità sviluppo, aggiungi anche console handler
-    if not hasattr(sys, '_MEIPASS'):
+    dev_mode = not hasattr(sys, '_MEIPASS')
+    if dev_mode:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    # Configura root logger
+    logger = logging.getLogger()
+    logger.setLevel(getattr(logging, LOG_CONFIG.LOG_LEVEL))
+
+    # Una seconda chiamata sostituisce gli handler della prima invece di
+    # sommarli (altrimenti ogni record verrebbe scritto due volte)
+    _remove_root_handlers(logger)
+
+    # Il contesto job va letto nel thread chiamante: il filtro sta
+    # sull'handler che riceve il record per primo
+    if async_logging:
+        queue_handler = start_logging_pipeline(handlers)
+        queue_handler.addFilter(JobContextFilter())
+        _root_handlers.append(queue_handler)
+    else:
+        for handler in handlers:
+            handler.addFilter(JobContextFilter())
+            _root_handlers.append(handler)
+
+    for handler in _root_handlers:
+        logger.addHandler(handler)
+
+    if dev_mode:
         logging.info("Logger initialized (development mode with console output)")
     else:
         logging.info("Logger initialized (production mode)")
@@ -281,16 +404,47 @@ def validate_output_path(path: str) -> Tuple[bool, Optional[str]]:
     return True, None
 
 
+# Caratteri vietati da Windows e caratteri di controllo (ASCII 0-31) -> "_",
+# in un solo passaggio str.translate
+_FILENAME_TABLE = str.maketrans({char: "_" for char in '<>:"/\\|?*' + "".join(map(chr, range(32)))})
+
+# Nomi di dispositivo riservati da Windows, anche con estensione (es. "con.mp4")
+_RESERVED_NAMES = frozenset(
+    ("CON", "PRN", "AUX", "NUL")
+    + tuple(f"COM{i}" for i in range(1, 10))
+    + tuple(f"LPT{i}" for i in range(1, 10))
+)
+
+
+def _truncate_utf8(text: str, max_bytes: int) -> str:
+    """Tronca a max_bytes in UTF-8 senza spezzare caratteri o lasciare accenti isolati."""
+    if len(text) * 4 <= max_bytes:
+        return text
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    text = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    # Un carattere combinante rimasto senza il successivo appartiene al
+    # grafema troncato: va tolto con la sua base
+    while text and unicodedata.combining(text[-1]):
+        text = text[:-1]
+    return text
+
+
 def sanitize_filename(filename: str, max_length: int = 200) -> str:
     """
     Pulisce il nome del file per compatibilità Windows.
 
-    Rimuove caratteri non permessi da Windows, limita la lunghezza,
-    e gestisce casi edge (es. nomi che iniziano/finiscono con spazio o punto).
+    Rimuove caratteri non permessi da Windows, normalizza l'Unicode in NFC,
+    evita i nomi di dispositivo riservati, limita la lunghezza in byte
+    UTF-8 e gestisce casi edge (es. nomi che iniziano/finiscono con spazio
+    o punto).
 
     Args:
         filename: Nome file originale
-        max_length: Lunghezza massima del nome file (default 200)
+        max_length: Lunghezza massima del nome file in byte UTF-8 (default
+            200, sotto il limite di 255 byte di NTFS/ext4 per lasciare
+            spazio a suffissi come ".part" e " (1)")
 
     Returns:
         Nome file sanitizzato e sicuro per Windows
@@ -305,41 +459,59 @@ def sanitize_filename(filename: str, max_length: int = 200) -> str:
         >>> sanitize_filename('   .leadingdot.mp4   ')
         'leadingdot.mp4'
 
-        >>> sanitize_filename('a' * 300 + '.mp4')
-        'aaa...aaa.mp4'  # Troncato a max_length
+        >>> sanitize_filename('con.mp4')
+        'con_.mp4'
+
+        >>> len(sanitize_filename('東京' * 100 + '.mp4').encode('utf-8'))
+        199
 
     Note:
         Caratteri Windows vietati: < > : " / \\ | ? *
         Rimuove anche spazi e punti leading/trailing
+        Troncando viene mantenuta l'estensione
     """
     if not filename:
         return "untitled"
 
-    # Caratteri vietati da Windows
-    forbidden_chars = '<>:"/\\|?*'
-    for char in forbidden_chars:
-        filename = filename.replace(char, '_')
-
-    # Rimuovi caratteri di controllo (ASCII 0-31)
-    filename = ''.join(char if ord(char) >= 32 else '_' for char in filename)
+    # NFC: "e" + accento combinante diventa "é" (nomi confrontabili tra
+    # sistemi e un carattere in meno da troncare)
+    if not filename.isascii():
+        filename = unicodedata.normalize("NFC", filename)
 
-    # Rimuovi leading/trailing spaces e dots
-    filename = filename.strip('. ')
+    # Caratteri vietati e di controllo, poi spazi e punti leading/trailing
+    filename = filename.translate(_FILENAME_TABLE).strip(". ")
 
     # Se vuoto dopo cleanup, usa default
     if not filename:
         return "untitled"
 
+    # Nomi riservati (CON, NUL, COM1, ...): contano solo fino al primo punto
+    base, dot, rest = filename.partition(".")
+    if base.rstrip(" ").upper() in _RESERVED_NAMES:
+        filename = f"{base}_{dot}{rest}"
+
     # Tronca se troppo lungo (mantieni estensione)
-    if len(filename) > max_length:
+    if len(filename) > max_length // 4 and len(filename.encode("utf-8")) > max_length:
         name, ext = os.path.splitext(filename)
-        max_name_length = max_length - len(ext)
-        if max_name_length > 0:
-            filename = name[:max_name_length] + ext
+        ext_bytes = len(ext.encode("utf-8"))
+        if ext_bytes < max_length:
+            filename = _truncate_utf8(name, max_length - ext_bytes) + ext
         else:
-            filename = name[:max_length]
+            filename = _truncate_utf8(name, max_length).rstrip(". ")
+
+    return filename or "untitled"
+
 
-    return filename
+def sanitize_filenames(filenames: Iterable[str], max_length: int = 200) -> List[str]:
+    """
+    Versione batch di sanitize_filename (es. tutti i titoli di una playlist).
+
+    Examples:
+        >>> sanitize_filenames(['a/b.mp4', 'NUL', ''])
+        ['a_b.mp4', 'NUL_', 'untitled']
+    """
+    sanitize = sanitize_filename
+    return [sanitize(name, max_length) for name in filenames]
 
 
 # ============================================================================
@@ -434,13 +606,33 @@ def format_time(seconds: int) -> str:
     return f"{minutes:02d}:{secs:02d}"
 
 
+# ============================================================================
+# JOB HELPERS
+# ============================================================================
+
+def new_job_id() -> str:
+    """
+    Genera un id breve per un job di download.
+
+    Usato per correlare righe di log, eventi e metriche dello stesso job.
+
+    Returns:
+        Stringa esadecimale di 8 caratteri
+
+    Examples:
+        >>> len(new_job_id())
+        8
+    """
+    return uuid.uuid4().hex[:8]
+
+
 # ============================================================================
 # FILE SYSTEM HELPERS
 # ============================================================================
 
 def get_available_filename(directory: str, filename: str) -> str:
     """
-    Trova un nome file disponibile aggiungendo (1), (2), etc. se necessario.
+    Trova e riserva un nome file disponibile aggiungendo (1), (2), etc. se necessario.
 
     Args:
         directory: Directory dove salvare il file
@@ -460,32 +652,13 @@ def get_available_filename(directory: str, filename: str) -> str:
         'video (2).mp4'  # Se video.mp4 e video (1).mp4 esistono
 
     Note:
-        Utile per evitare sovrascritture accidentali
+        Usa l'indice dei nomi della cartella (vedi mvd.naming): nessun
+        controllo su disco per candidato, e il nome restituito resta
+        riservato, quindi chiamate concorrenti non ricevono lo stesso nome.
+        Un nome è occupato anche da file con la stessa base e un'altra
+        estensione (es. video.webm).
     """
-    base_path = os.path.join(directory, filename)
-
-    if not os.path.exists(base_path):
-        return filename
-
-    # File esiste, trova nome alternativo
-    name, ext = os.path.splitext(filename)
-    counter = 1
-
-    while True:
-        new_filename = f"{name} ({counter}){ext}"
-        new_path = os.path.join(directory, new_filename)
-
-        if not os.path.exists(new_path):
-            return new_filename
-
-        counter += 1
-
-        # Safeguard: non cercare all'infinito
-        if counter > 9999:
-            # Usa timestamp
-            import time
-            timestamp = int(time.time())
-            return f"{name}_{timestamp}{ext}"
+    return reserve_filename(directory, filename)
 
 
 def ensure_directory_exists(path: str) -> bool: